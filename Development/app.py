@@ -0,0 +1,208 @@
+"""
+Application factory with lazy blueprint loading and startup timing
+"""
+import argparse
+import importlib
+import logging
+import os
+import secrets
+import threading
+import time
+
+from flask import Flask
+from flask_login import LoginManager
+
+from utils import get_db_connection, get_db_router, set_db_connection_func
+
+logger = logging.getLogger(__name__)
+
+# (blueprint module, url prefix)
+BLUEPRINTS = (
+    ('auth', '/auth'),
+    ('admin', '/admin'),
+    ('seller', '/seller'),
+    ('customer', '/customer'),
+    ('product', '/products'),
+    ('cart', '/cart'),
+    ('checkout', '/checkout'),
+    ('order', '/orders'),
+    ('payment', '/payment'),
+)
+# (module, init function) run after the blueprints, in order; db_pool
+# first so later hooks can use utils.get_db_connection
+EXTENSIONS = (
+    ('db_pool', 'init_pool'),
+    ('query_profiler', 'init_query_profiler'),
+    ('category_tree', 'init_category_tree'),
+    ('search', 'init_search'),
+    ('product_cache', 'init_product_cache'),
+    ('template_cache', 'init_fragment_cache'),
+    ('cart_store', 'init_cart'),
+    ('inventory', 'init_reservations'),
+    ('sales_rollup', 'init_sales_rollup'),
+    ('jobs', 'init_job_queue'),
+)
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() not in ('0', 'false', 'no', '')
+
+
+class StartupStats:
+    """Where startup time went: create_app(), the deferred load and each import"""
+
+    def __init__(self, lazy):
+        self.lazy = lazy
+        self.create_app_s = 0.0
+        self.load_s = None
+        self.import_times = {}
+
+    def timed_import(self, name):
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        self.import_times.setdefault(name, time.perf_counter() - started)
+        return module
+
+    def to_dict(self):
+        return {
+            'lazy': self.lazy,
+            'create_app_ms': round(self.create_app_s * 1000, 3),
+            'load_ms': None if self.load_s is None else round(self.load_s * 1000, 3),
+            'import_ms': {name: round(seconds * 1000, 3) for name, seconds in
+                          sorted(self.import_times.items(), key=lambda item: -item[1])},
+        }
+
+
+class LazyLoader:
+    """WSGI wrapper that loads blueprints and extensions on the first request.
+
+    Flask only accepts new blueprints and hooks before it handles its
+    first request, so loading happens here, in front of app.wsgi_app,
+    once per process. Under gunicorn that is each worker after the fork;
+    with --preload use APP_LAZY_LOAD=0 so the master imports everything
+    and the workers share it.
+    """
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.loaded:
+            return
+        with self._lock:
+            if not self.loaded:
+                _load(self.app)
+                self.loaded = True
+
+    def __call__(self, environ, start_response):
+        if not self.loaded:
+            self.load()
+        return self.wsgi_app(environ, start_response)
+
+
+def _load(app):
+    """Import and register every blueprint, then initialize the extensions"""
+    stats = app.extensions['startup']
+    started = time.perf_counter()
+    for name, url_prefix in BLUEPRINTS:
+        module = stats.timed_import(f"blueprints.{name}")
+        blueprint = getattr(module, 'bp', None) or getattr(module, f"{name}_bp", None)
+        if blueprint is not None:
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+    for module_name, function in EXTENSIONS:
+        getattr(stats.timed_import(module_name), function)(app)
+        if module_name == 'db_pool' and get_db_router() is None:
+            from db_pool import get_db_connection as pooled_connection, get_replica_connection
+            replica = get_replica_connection if 'db_replica_pool' in app.extensions else None
+            set_db_connection_func(pooled_connection, replica, app.config.get('DB_STICKY_SECONDS', 5.0))
+    stats.load_s = time.perf_counter() - started
+
+
+def ensure_loaded(app):
+    """Load a lazy app now.
+
+    A lazy app has no routes until its first request, so url_for() and
+    test_request_context() need this first (create_app does it for
+    TESTING apps).
+    """
+    loader = app.extensions.get('lazy_loader')
+    if loader is not None:
+        loader.load()
+
+
+def _load_user(user_id):
+    from models import user
+    User = getattr(user, 'User', None)
+    return User.get(int(user_id)) if User is not None else None
+
+
+def create_app(config=None, lazy=None):
+    """Build the Flask app.
+
+    With lazy=True (default, APP_LAZY_LOAD=0 turns it off) blueprint
+    modules and extensions such as the DB pool are imported and set up on
+    the first request instead of here, so importing the app is cheap for
+    freshly forked workers. Apps created with TESTING default to eager
+    loading so url_for() works straight away.
+
+    SECRET_KEY (environment or .env) is required unless TESTING or DEBUG
+    is set: a generated key differs per process, which would log users
+    out and empty session carts across workers and restarts.
+    """
+    from dotenv import load_dotenv
+
+    started = time.perf_counter()
+    load_dotenv()
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config.update(config or {})
+    if not app.config['SECRET_KEY']:
+        if not (app.testing or app.debug or _env_flag('FLASK_DEBUG', '0')):
+            raise RuntimeError("SECRET_KEY is not set; add it to the environment or .env")
+        logger.warning("SECRET_KEY is not set; using a random key for this process")
+        app.config['SECRET_KEY'] = secrets.token_hex(32)
+    if lazy is None:
+        lazy = not app.testing and _env_flag('APP_LAZY_LOAD', '1')
+
+    login_manager = LoginManager(app)
+    login_manager.login_view = 'auth.login'
+    login_manager.user_loader(_load_user)
+
+    stats = app.extensions['startup'] = StartupStats(lazy)
+    if lazy:
+        loader = app.extensions['lazy_loader'] = LazyLoader(app, app.wsgi_app)
+        app.wsgi_app = loader
+    else:
+        _load(app)
+    stats.create_app_s = time.perf_counter() - started
+    return app
+
+
+app = create_app()
+
+
+def main():
+    """Print where startup time goes: python app.py --startup-report [--eager]"""
+    parser = argparse.ArgumentParser(description="Run the development server or report startup timing")
+    parser.add_argument('--startup-report', action='store_true', help="Print startup timings and exit")
+    parser.add_argument('--eager', action='store_true', help="Load everything in create_app()")
+    args = parser.parse_args()
+
+    if not args.startup_report:
+        app.run(debug=_env_flag('FLASK_DEBUG', '0'))
+        return
+
+    report_app = create_app(lazy=not args.eager)
+    ensure_loaded(report_app)
+    report = report_app.extensions['startup'].to_dict()
+    print(f"create_app(): {report['create_app_ms']:.1f} ms ({'lazy' if report['lazy'] else 'eager'})")
+    print(f"blueprints + extensions: {report['load_ms']:.1f} ms")
+    for name, ms in report['import_ms'].items():
+        print(f"  {ms:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
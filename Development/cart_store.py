@@ -0,0 +1,336 @@
+"""
+Session-held shopping cart with write-behind persistence to cart_items
+"""
+import logging
+import time
+from flask import current_app, has_app_context, has_request_context, session
+from flask_login import current_user, user_logged_in
+
+from checkout_pipeline import place_orders
+from jobs import enqueue_post_checkout
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'cart'
+DEFAULT_IDLE_SECONDS = 120
+# Longest wait between flush attempts after failures
+MAX_RETRY_SECONDS = 3600
+
+CART_ID_QUERY = "SELECT id FROM cart WHERE customer_id = %s ORDER BY id LIMIT 1"
+CART_ITEMS_QUERY = "SELECT product_id, quantity FROM cart_items WHERE cart_id = %s"
+UPSERT_SQL = (
+    "INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)"
+)
+
+
+class SessionCart:
+    """The live cart, kept in the session and flushed to MySQL in batches.
+
+    Reads and edits only touch the session mapping. Edited product ids are
+    remembered as dirty; flush() writes their final quantities with one
+    multi-row upsert (plus one DELETE for removed lines), so any number of
+    clicks on the same line collapse into a single row write. The session
+    copy is the source of truth, the cart_items rows trail it.
+
+    store is the Flask session or any dict-like mapping. Product ids are
+    kept as strings so the state survives JSON session serialization.
+    """
+
+    def __init__(self, store, clock=time.time):
+        self._store = store
+        self._clock = clock
+        state = store.get(SESSION_KEY)
+        if state is None:
+            state = {'items': {}, 'dirty': [], 'cart_id': None, 'changed_at': 0}
+        self._state = state
+
+    def _save(self):
+        # Reassign so the Flask session notices the nested change
+        self._store[SESSION_KEY] = self._state
+
+    def _touch(self, key):
+        if key not in self._state['dirty']:
+            self._state['dirty'].append(key)
+        self._state['changed_at'] = self._clock()
+        self._save()
+
+    # Reads
+
+    @property
+    def cart_id(self):
+        return self._state['cart_id']
+
+    def items(self):
+        """[(product_id, quantity)] sorted by product id"""
+        return sorted((int(key), quantity) for key, quantity in self._state['items'].items())
+
+    def quantity(self, product_id):
+        return self._state['items'].get(str(product_id), 0)
+
+    def count(self):
+        """Total number of units, for the cart badge"""
+        return sum(self._state['items'].values())
+
+    def __len__(self):
+        return len(self._state['items'])
+
+    def __contains__(self, product_id):
+        return str(product_id) in self._state['items']
+
+    # Edits
+
+    def add(self, product_id, quantity=1):
+        return self.set(product_id, self.quantity(product_id) + quantity)
+
+    def set(self, product_id, quantity):
+        """Set a line's quantity; zero or less removes the line"""
+        key = str(product_id)
+        if quantity <= 0:
+            if self._state['items'].pop(key, None) is None:
+                return 0
+            quantity = 0
+        elif self._state['items'].get(key) == quantity:
+            return quantity
+        else:
+            self._state['items'][key] = quantity
+        self._touch(key)
+        return quantity
+
+    def remove(self, product_id):
+        self.set(product_id, 0)
+
+    def clear(self):
+        for key in list(self._state['items']):
+            self.set(key, 0)
+
+    # Write-behind
+
+    @property
+    def dirty(self):
+        return bool(self._state['dirty'])
+
+    def needs_flush(self, idle_seconds=DEFAULT_IDLE_SECONDS):
+        """Check if there are unsaved edits, the cart has been idle long enough
+        and no failed flush is still backing off"""
+        now = self._clock()
+        return (self.dirty and now - self._state['changed_at'] >= idle_seconds
+                and now >= self._state.get('retry_at', 0))
+
+    def defer_flush(self, base_seconds=DEFAULT_IDLE_SECONDS, max_seconds=MAX_RETRY_SECONDS):
+        """Back off after a failed flush: base_seconds, doubling per failure, capped"""
+        failures = self._state.get('failures', 0) + 1
+        delay = min(base_seconds * 2 ** (failures - 1), max_seconds)
+        self._state['failures'] = failures
+        self._state['retry_at'] = self._clock() + delay
+        self._save()
+        return delay
+
+    def _ensure_cart_id(self, cursor, customer_id):
+        cart_id = self._state['cart_id']
+        if cart_id is None:
+            cursor.execute(CART_ID_QUERY, (customer_id,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO cart (customer_id) VALUES (%s)", (customer_id,))
+                cart_id = cursor.lastrowid
+            else:
+                cart_id = row[0]
+            self._state['cart_id'] = cart_id
+        return cart_id
+
+    def flush(self, conn, customer_id):
+        """Write pending edits to cart_items and return the cart id.
+
+        Costs nothing when the cart is clean, otherwise at most one upsert
+        batch, one DELETE and the commit (plus the cart row lookup the
+        first time). If the write fails because a product has since been
+        deleted, its line is dropped from the cart and the write retried.
+        """
+        try:
+            return self._write(conn, customer_id)
+        except Exception:
+            if not self._drop_missing_products(conn):
+                raise
+        return self._write(conn, customer_id)
+
+    def _drop_missing_products(self, conn):
+        """Remove dirty lines whose product no longer exists; True if any were removed"""
+        items = self._state['items']
+        keys = [k for k in self._state['dirty'] if k in items]
+        if not keys:
+            return False
+        placeholders = ", ".join(["%s"] * len(keys))
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"SELECT id FROM products WHERE id IN ({placeholders})", [int(k) for k in keys])
+                existing = {str(row[0]) for row in cursor.fetchall()}
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        missing = [k for k in keys if k not in existing]
+        for key in missing:
+            # Still dirty, so the next write deletes any saved row
+            del items[key]
+        if missing:
+            logger.info("dropped deleted products %s from cart", ", ".join(missing))
+            self._save()
+        return bool(missing)
+
+    def _write(self, conn, customer_id):
+        if not self.dirty and self._state['cart_id'] is not None:
+            return self._state['cart_id']
+        items = self._state['items']
+        upserts = [(int(k), items[k]) for k in self._state['dirty'] if k in items]
+        deletes = [int(k) for k in self._state['dirty'] if k not in items]
+        known_cart = self._state['cart_id'] is not None
+        cursor = conn.cursor()
+        try:
+            cart_id = self._ensure_cart_id(cursor, customer_id)
+            if upserts:
+                cursor.executemany(UPSERT_SQL, [(cart_id, pid, qty) for pid, qty in sorted(upserts)])
+            if deletes:
+                placeholders = ", ".join(["%s"] * len(deletes))
+                cursor.execute(
+                    f"DELETE FROM cart_items WHERE cart_id = %s AND product_id IN ({placeholders})",
+                    [cart_id] + sorted(deletes),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if not known_cart:
+                # A cart row inserted by this flush was rolled back too
+                self._state['cart_id'] = None
+            raise
+        finally:
+            cursor.close()
+        self._state['dirty'] = []
+        self._state.pop('failures', None)
+        self._state.pop('retry_at', None)
+        self._save()
+        return cart_id
+
+    def attach(self, conn, customer_id):
+        """Merge the customer's saved cart into the session on login.
+
+        Saved lines fill in products the session does not have; lines the
+        visitor edited before logging in win. The merged result is flushed
+        straight away.
+        """
+        cursor = conn.cursor()
+        try:
+            self._state['cart_id'] = None
+            cart_id = self._ensure_cart_id(cursor, customer_id)
+            cursor.execute(CART_ITEMS_QUERY, (cart_id,))
+            saved = cursor.fetchall()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            self._state['cart_id'] = None
+            raise
+        finally:
+            cursor.close()
+        items = self._state['items']
+        dirty = set(self._state['dirty'])
+        saved = {str(product_id): quantity for product_id, quantity in saved}
+        for key, quantity in saved.items():
+            if key not in items and key not in dirty:
+                items[key] = quantity
+        # Session lines the saved cart does not match must be written
+        for key, quantity in items.items():
+            if saved.get(key) != quantity and key not in dirty:
+                self._state['dirty'].append(key)
+        self._save()
+        return self.flush(conn, customer_id)
+
+    def checkout(self, conn, customer_id, shipping_address_id, queue=None, **kwargs):
+        """Place the orders straight from the session lines.
+
+        Pending edits are not flushed first: place_orders deletes the saved
+        cart_items rows in the same transaction, so writing them just
+        before would be wasted work. On failure the session cart is kept.
+
+        After the commit the post-checkout jobs (invoice, confirmation,
+        sales rollup) go to queue, by default the app's job queue, so the
+        request returns without doing that work. The orders are placed
+        either way; a failure to queue is logged, not raised.
+        """
+        orders = place_orders(conn, customer_id, shipping_address_id, lines=self.items(),
+                              cart_id=self._state['cart_id'], **kwargs)
+        self.reset()
+        if queue is None and has_app_context():
+            queue = current_app.extensions.get('job_queue')
+        if queue is not None:
+            try:
+                enqueue_post_checkout(queue, orders)
+            except Exception:
+                logger.exception("could not queue post-checkout jobs for %s",
+                                  [order['order_number'] for order in orders])
+        return orders
+
+    def reset(self):
+        """Forget every line without scheduling deletes (rows are already gone)"""
+        self._state['items'] = {}
+        self._state['dirty'] = []
+        self._save()
+
+
+def get_cart():
+    """The SessionCart for the current request"""
+    return SessionCart(session)
+
+
+def _customer_id(user):
+    if getattr(user, 'is_authenticated', False) and getattr(user, 'role', None) == 'customer':
+        return user.id
+    return None
+
+
+def init_cart(app, connect=None):
+    """Register the write-behind hooks on app.
+
+    The cart is flushed on login (merged with the saved cart) and on the
+    first request after CART_IDLE_FLUSH_SECONDS without cart edits. connect
+    returns a DB connection and defaults to utils.get_db_connection.
+
+    A failed flush never fails the request: the error is logged, the
+    session keeps the edits and the next attempt backs off (see
+    SessionCart.defer_flush).
+    """
+    if connect is None:
+        from utils import get_db_connection as connect
+    app.config.setdefault('CART_IDLE_FLUSH_SECONDS', DEFAULT_IDLE_SECONDS)
+
+    def run(cart, action, customer_id):
+        try:
+            conn = connect()
+            try:
+                return action(conn, customer_id)
+            finally:
+                conn.close()
+        except Exception:
+            delay = cart.defer_flush(current_app.config['CART_IDLE_FLUSH_SECONDS'])
+            logger.exception("cart %s failed for customer %s; retrying in %ss", action.__name__, customer_id, delay)
+            return None
+
+    @app.before_request
+    def flush_idle_cart():
+        if SESSION_KEY not in session:
+            return
+        customer_id = _customer_id(current_user)
+        if customer_id is None:
+            return
+        cart = get_cart()
+        if cart.needs_flush(current_app.config['CART_IDLE_FLUSH_SECONDS']):
+            run(cart, cart.flush, customer_id)
+
+    def on_login(sender, user, **extra):
+        customer_id = _customer_id(user)
+        if customer_id is not None and has_request_context():
+            cart = get_cart()
+            run(cart, cart.attach, customer_id)
+
+    user_logged_in.connect(on_login, app, weak=False)
+    return app
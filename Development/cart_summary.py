@@ -0,0 +1,231 @@
+"""
+Cached cart summaries (totals, stock status, seller grouping) with on-demand revalidation
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+
+from checkout_pipeline import CENT
+
+PRODUCT_SNAPSHOT_QUERY = (
+    "SELECT p.id, p.seller_id, p.name, p.price, p.is_active, COALESCE(i.quantity, 0) "
+    "FROM products p LEFT JOIN inventory i ON i.product_id = p.id "
+    "WHERE p.id IN ({placeholders})"
+)
+
+
+class ProductVersions:
+    """Per-product version stamps, bumped whenever a product is edited.
+
+    Stamps come from one process-wide counter, so a stamp never repeats
+    even after a product is removed and re-added.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count(1)
+        self._versions = {}
+
+    def get(self, product_id):
+        return self._versions.get(product_id, 0)
+
+    def bump(self, product_id):
+        version = self._versions[product_id] = next(self._counter)
+        return version
+
+
+class CartLine:
+    """One cart line priced from a product snapshot"""
+
+    __slots__ = ('product_id', 'seller_id', 'name', 'price', 'is_active', 'stock',
+                 'version', 'quantity', 'subtotal')
+
+    def __init__(self, row, version, quantity):
+        self.product_id, self.seller_id, self.name, price, is_active, self.stock = row
+        self.price = Decimal(str(price)).quantize(CENT, rounding=ROUND_HALF_UP)
+        self.is_active = bool(is_active)
+        self.version = version
+        self.set_quantity(quantity)
+
+    def set_quantity(self, quantity):
+        self.quantity = quantity
+        self.subtotal = self.price * quantity
+
+    @property
+    def available(self):
+        return self.is_active and self.stock >= self.quantity
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'name': self.name,
+            'price': self.price,
+            'quantity': self.quantity,
+            'subtotal': self.subtotal,
+            'stock': self.stock,
+            'available': self.available,
+        }
+
+
+class CartSummary:
+    """Totals for one cart, kept up to date line by line"""
+
+    def __init__(self):
+        self.lines = {}
+        self.subtotal = Decimal('0.00')
+        self.item_count = 0
+        self.seller_subtotals = {}
+
+    def _account(self, line, sign):
+        self.subtotal += sign * line.subtotal
+        self.item_count += sign * line.quantity
+        total = self.seller_subtotals.get(line.seller_id, Decimal('0.00')) + sign * line.subtotal
+        if sign < 0 and total == 0 and not any(
+                other.seller_id == line.seller_id for other in self.lines.values() if other is not line):
+            self.seller_subtotals.pop(line.seller_id, None)
+        else:
+            self.seller_subtotals[line.seller_id] = total
+
+    def put(self, line):
+        self.remove(line.product_id)
+        self.lines[line.product_id] = line
+        self._account(line, 1)
+
+    def remove(self, product_id):
+        line = self.lines.get(product_id)
+        if line is not None:
+            self._account(line, -1)
+            del self.lines[product_id]
+
+    def set_quantity(self, product_id, quantity):
+        line = self.lines[product_id]
+        self._account(line, -1)
+        line.set_quantity(quantity)
+        self._account(line, 1)
+
+    @property
+    def has_problems(self):
+        """Check if any line is inactive or short on stock (as last seen)"""
+        return any(not line.available for line in self.lines.values())
+
+    def by_seller(self):
+        """[(seller_id, [line dicts], subtotal)] in seller_id order"""
+        groups = {}
+        for line in sorted(self.lines.values(), key=lambda l: l.product_id):
+            groups.setdefault(line.seller_id, []).append(line.to_dict())
+        return [(seller_id, groups[seller_id], self.seller_subtotals[seller_id])
+                for seller_id in sorted(groups)]
+
+
+class CartSummaryCache:
+    """Cart summaries keyed by cart, checked against product version stamps.
+
+    get() reuses the cached summary for every line whose product version
+    is unchanged and fetches only new or stale products in one query, so a
+    cart page re-render after a quantity change costs no DB round trip.
+    Stock shown from the cache can lag behind checkouts by other
+    customers; revalidate() re-reads every line and is meant for checkout
+    entry.
+    """
+
+    def __init__(self, versions=None, max_entries=10000):
+        self.versions = versions or ProductVersions()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._summaries = OrderedDict()
+        self.stats = {'hits': 0, 'fetched': 0}
+
+    def _fetch(self, conn, product_ids):
+        if not product_ids:
+            return {}
+        # Read the stamps before the rows so an edit racing the query leaves
+        # the line stale instead of caching old data under the new stamp
+        versions = {product_id: self.versions.get(product_id) for product_id in product_ids}
+        cursor = conn.cursor()
+        try:
+            placeholders = ", ".join(["%s"] * len(product_ids))
+            cursor.execute(PRODUCT_SNAPSHOT_QUERY.format(placeholders=placeholders), list(product_ids))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.stats['fetched'] += len(product_ids)
+        return {row[0]: (row, versions[row[0]]) for row in rows}
+
+    def get(self, conn, cart_key, lines):
+        """Summary for cart_key holding lines [(product_id, quantity)]"""
+        lines = dict(lines)
+        with self._lock:
+            summary = self._summaries.pop(cart_key, None)
+        if summary is None:
+            summary = CartSummary()
+
+        for product_id in [pid for pid in summary.lines if pid not in lines]:
+            summary.remove(product_id)
+        stale = []
+        for product_id, quantity in lines.items():
+            line = summary.lines.get(product_id)
+            if line is None or line.version != self.versions.get(product_id):
+                stale.append(product_id)
+            elif line.quantity != quantity:
+                summary.set_quantity(product_id, quantity)
+        self.stats['hits'] += len(lines) - len(stale)
+
+        fetched = self._fetch(conn, sorted(stale))
+        for product_id in stale:
+            if product_id in fetched:
+                row, version = fetched[product_id]
+                summary.put(CartLine(row, version, lines[product_id]))
+            else:
+                # The product was deleted
+                summary.remove(product_id)
+        self._store(cart_key, summary)
+        return summary
+
+    def revalidate(self, conn, cart_key, lines):
+        """Re-read price and stock for every line (checkout entry).
+
+        Returns (summary, changes) where changes lists the product ids whose
+        price, availability or stock differ from what the cached summary
+        showed the customer.
+        """
+        lines = dict(lines)
+        with self._lock:
+            previous = self._summaries.pop(cart_key, None)
+        fetched = self._fetch(conn, sorted(lines))
+        summary = CartSummary()
+        changes = []
+        for product_id, quantity in sorted(lines.items()):
+            if product_id not in fetched:
+                changes.append(product_id)
+                continue
+            row, version = fetched[product_id]
+            line = CartLine(row, version, quantity)
+            summary.put(line)
+            old = previous.lines.get(product_id) if previous is not None else None
+            if not line.available or (old is not None and (
+                    old.price != line.price or old.available != line.available)):
+                changes.append(product_id)
+        self._store(cart_key, summary)
+        return summary, changes
+
+    def _store(self, cart_key, summary):
+        with self._lock:
+            self._summaries[cart_key] = summary
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+
+    def invalidate(self, cart_key):
+        with self._lock:
+            self._summaries.pop(cart_key, None)
+
+    def __len__(self):
+        return len(self._summaries)
+
+
+# Shared cache for the cart blueprint; product_cache.on_product_updated bumps its versions
+cart_summaries = CartSummaryCache()
+
+
+def on_product_changed(product_id):
+    """A product's price, name, status or stock was edited"""
+    cart_summaries.versions.bump(product_id)
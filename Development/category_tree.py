@@ -0,0 +1,320 @@
+"""
+In-memory category tree with ancestor/descendant lookups and subtree product counts
+"""
+import threading
+
+CATEGORY_QUERY = "SELECT id, parent_id, name, slug FROM categories ORDER BY name"
+PRODUCT_COUNT_QUERY = (
+    "SELECT category_id, COUNT(*) FROM products WHERE is_active = TRUE GROUP BY category_id"
+)
+
+
+class Category:
+    """One node of the tree"""
+
+    __slots__ = ('id', 'parent_id', 'name', 'slug', 'children', 'product_count', 'subtree_count')
+
+    def __init__(self, id, parent_id, name, slug=None):
+        self.id = id
+        self.parent_id = parent_id
+        self.name = name
+        self.slug = slug
+        self.children = []
+        # Active products directly in this category / in it and all descendants
+        self.product_count = 0
+        self.subtree_count = 0
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'slug': self.slug,
+            'product_count': self.product_count,
+            'subtree_count': self.subtree_count,
+        }
+
+
+class CategoryTree:
+    """The categories table loaded once into memory.
+
+    Ancestor paths (closure-table style) are precomputed per node, descendant
+    sets are computed on first use and cached, and subtree product counts are
+    maintained incrementally. An edit only touches the ancestor path of the
+    changed node (plus the moved subtree for re-parenting); `version` is
+    bumped on every change so rendered menus can be cached against it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._nodes = {}
+        self._roots = []
+        # id -> (root_id, ..., parent_id, id)
+        self._ancestors = {}
+        # id -> frozenset of the node and all its descendants, filled lazily
+        self._descendants = {}
+        self.version = 0
+
+    # Loading
+
+    @classmethod
+    def from_rows(cls, category_rows, count_rows=()):
+        """Build from (id, parent_id, name, slug) and (category_id, count) rows"""
+        tree = cls()
+        for id, parent_id, name, slug in category_rows:
+            tree._nodes[id] = Category(id, parent_id, name, slug)
+        for node in tree._nodes.values():
+            parent = tree._nodes.get(node.parent_id)
+            if parent is None:
+                node.parent_id = None
+                tree._roots.append(node)
+            else:
+                parent.children.append(node)
+        for root in tree._roots:
+            tree._index_paths(root, ())
+        for category_id, count in count_rows:
+            node = tree._nodes.get(category_id)
+            if node is not None:
+                node.product_count = count
+        for root in tree._roots:
+            tree._sum_counts(root)
+        return tree
+
+    @classmethod
+    def load(cls, conn):
+        """Load the tree and product counts with two queries"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(CATEGORY_QUERY)
+            category_rows = cursor.fetchall()
+            cursor.execute(PRODUCT_COUNT_QUERY)
+            count_rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        return cls.from_rows(category_rows, count_rows)
+
+    def _index_paths(self, node, parent_path):
+        """Record ancestor paths for node's subtree (iterative, no recursion limit)"""
+        stack = [(node, parent_path)]
+        while stack:
+            current, path = stack.pop()
+            current_path = path + (current.id,)
+            self._ancestors[current.id] = current_path
+            for child in current.children:
+                stack.append((child, current_path))
+
+    def _sum_counts(self, root):
+        """Post-order pass filling subtree_count"""
+        order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+        for node in reversed(order):
+            node.subtree_count = node.product_count + sum(c.subtree_count for c in node.children)
+
+    # Lookups
+
+    def __contains__(self, category_id):
+        return category_id in self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, category_id):
+        return self._nodes.get(category_id)
+
+    def roots(self):
+        with self._lock:
+            return list(self._roots)
+
+    def ancestor_ids(self, category_id):
+        """Ids from the root down to category_id (inclusive)"""
+        return self._ancestors.get(category_id, ())
+
+    def breadcrumbs(self, category_id):
+        """Ancestor Category nodes from the root down, for breadcrumb navigation"""
+        with self._lock:
+            return [self._nodes[i] for i in self.ancestor_ids(category_id)]
+
+    def is_descendant(self, category_id, ancestor_id):
+        """Check if category_id is ancestor_id or lies below it"""
+        return ancestor_id in self._ancestors.get(category_id, ())
+
+    def descendant_ids(self, category_id):
+        """category_id plus every category below it, for subtree filters"""
+        with self._lock:
+            cached = self._descendants.get(category_id)
+            if cached is None:
+                node = self._nodes.get(category_id)
+                if node is None:
+                    return frozenset()
+                ids = []
+                stack = [node]
+                while stack:
+                    current = stack.pop()
+                    ids.append(current.id)
+                    stack.extend(current.children)
+                cached = self._descendants[category_id] = frozenset(ids)
+            return cached
+
+    def subtree_count(self, category_id):
+        """Active products in the category and all its subcategories"""
+        node = self._nodes.get(category_id)
+        return node.subtree_count if node is not None else 0
+
+    def menu(self, max_depth=None, include_empty=True):
+        """Nested dicts for navigation menus: node fields plus 'children'"""
+        with self._lock:
+            def build(node, depth):
+                item = node.to_dict()
+                children = []
+                if max_depth is None or depth < max_depth:
+                    children = [
+                        build(child, depth + 1)
+                        for child in sorted(node.children, key=lambda c: c.name)
+                        if include_empty or child.subtree_count
+                    ]
+                item['children'] = children
+                return item
+
+            return [
+                build(root, 1)
+                for root in sorted(self._roots, key=lambda c: c.name)
+                if include_empty or root.subtree_count
+            ]
+
+    # Incremental updates
+
+    def _invalidate_path(self, category_id):
+        """Drop cached descendant sets along the ancestor path"""
+        for ancestor_id in self._ancestors.get(category_id, ()):
+            self._descendants.pop(ancestor_id, None)
+
+    def _add_to_path(self, category_id, delta):
+        for ancestor_id in self._ancestors.get(category_id, ()):
+            self._nodes[ancestor_id].subtree_count += delta
+
+    def adjust_product_count(self, category_id, delta):
+        """Record products added (delta > 0) or removed/deactivated (delta < 0)"""
+        with self._lock:
+            node = self._nodes.get(category_id)
+            if node is None or not delta:
+                return
+            node.product_count += delta
+            self._add_to_path(category_id, delta)
+            self.version += 1
+
+    def move_product(self, old_category_id, new_category_id):
+        """An active product changed category"""
+        if old_category_id != new_category_id:
+            with self._lock:
+                self.adjust_product_count(old_category_id, -1)
+                self.adjust_product_count(new_category_id, 1)
+
+    def add_category(self, category_id, parent_id, name, slug=None):
+        with self._lock:
+            node = Category(category_id, parent_id if parent_id in self._nodes else None, name, slug)
+            self._nodes[category_id] = node
+            if node.parent_id is None:
+                self._roots.append(node)
+                self._ancestors[category_id] = (category_id,)
+            else:
+                self._nodes[node.parent_id].children.append(node)
+                self._ancestors[category_id] = self._ancestors[node.parent_id] + (category_id,)
+                self._invalidate_path(node.parent_id)
+            self.version += 1
+            return node
+
+    def update_category(self, category_id, name=None, slug=None, parent_id=...):
+        """Rename and/or re-parent a category (parent_id=None makes it a root)"""
+        with self._lock:
+            node = self._nodes[category_id]
+            if name is not None:
+                node.name = name
+            if slug is not None:
+                node.slug = slug
+            if parent_id is not ... and parent_id != node.parent_id:
+                self._reparent(node, parent_id)
+            self.version += 1
+            return node
+
+    def _reparent(self, node, parent_id):
+        if parent_id is not None:
+            if parent_id not in self._nodes:
+                raise KeyError(parent_id)
+            if self.is_descendant(parent_id, node.id):
+                raise ValueError("a category cannot be moved below itself")
+
+        # Detach: old ancestors lose the subtree's products and descendants
+        self._invalidate_path(node.id)
+        self._add_to_path(node.parent_id, -node.subtree_count)
+        self._detach(node)
+
+        # Attach under the new parent
+        node.parent_id = parent_id
+        if parent_id is None:
+            self._roots.append(node)
+            parent_path = ()
+        else:
+            self._nodes[parent_id].children.append(node)
+            parent_path = self._ancestors[parent_id]
+            self._add_to_path(parent_id, node.subtree_count)
+        self._index_paths(node, parent_path)
+        self._invalidate_path(node.id)
+
+    def _detach(self, node):
+        if node.parent_id is None:
+            self._roots.remove(node)
+        else:
+            self._nodes[node.parent_id].children.remove(node)
+
+    def remove_category(self, category_id):
+        """Delete a category; its children become roots (ON DELETE SET NULL)"""
+        with self._lock:
+            node = self._nodes.get(category_id)
+            if node is None:
+                return
+            for child in list(node.children):
+                self._reparent(child, None)
+            self._invalidate_path(category_id)
+            self._add_to_path(node.parent_id, -node.product_count)
+            self._detach(node)
+            del self._nodes[category_id]
+            del self._ancestors[category_id]
+            self.version += 1
+
+
+# Shared tree for the app; admin category views call the update methods
+category_tree = CategoryTree()
+
+
+def load_category_tree(conn):
+    """(Re)load the shared tree from the database"""
+    global category_tree
+    category_tree = CategoryTree.load(conn)
+    return category_tree
+
+
+def get_category_tree():
+    return category_tree
+
+
+def init_category_tree(app, connect=None):
+    """Load the shared tree on a background thread (an empty tree until then).
+
+    If the load fails, the next request at least CATEGORY_TREE_RETRY_SECONDS
+    later starts it again. connect defaults to utils.get_db_connection.
+    """
+    from utils import BackgroundLoad
+
+    load = BackgroundLoad(app, 'category-tree-load', load_category_tree, connect,
+                          retry_seconds=app.config.get('CATEGORY_TREE_RETRY_SECONDS', 30))
+
+    @app.before_request
+    def retry_category_tree_load():
+        load.retry()
+
+    app.extensions['category_tree_load'] = load
+    return load.start()
@@ -0,0 +1,166 @@
+"""
+Batched cart-to-order conversion for checkout
+"""
+import uuid
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from inventory import reserve_stock_batch
+
+CENT = Decimal('0.01')
+# Statuses go in as parameters: a literal in VALUES (...) stops PyMySQL's
+# executemany from folding the rows into one multi-row INSERT
+ORDER_STATUS = 'placed'
+PAYMENT_STATUS = 'pending'
+
+
+class CheckoutError(Exception):
+    """Raised when the cart cannot be turned into orders"""
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def generate_order_number(now=None):
+    """Unique, sortable order number such as ORD-20240101-3F2A9C1B7D"""
+    now = now or datetime.now()
+    return f"ORD-{now:%Y%m%d}-{uuid.uuid4().hex[:10].upper()}"
+
+
+def _in_clause(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def load_cart_lines(cursor, cart_id):
+    """Read a persisted cart as [(product_id, quantity)]"""
+    cursor.execute("SELECT product_id, quantity FROM cart_items WHERE cart_id = %s", (cart_id,))
+    return list(cursor.fetchall())
+
+
+def build_orders(lines, products, tax_rate=Decimal('0'), shipping_cost=Decimal('0')):
+    """Group cart lines by seller and compute every total in one pass.
+
+    lines: [(product_id, quantity)]; products: {id: (seller_id, price, is_active)}.
+    Returns one order dict per seller, in seller_id order.
+    """
+    tax_rate = Decimal(str(tax_rate))
+    orders = {}
+    for product_id, quantity in lines:
+        product = products.get(product_id)
+        if product is None or not product[2]:
+            raise CheckoutError(f"product {product_id} is not available")
+        if quantity <= 0:
+            raise CheckoutError(f"invalid quantity for product {product_id}")
+        seller_id, price, _ = product
+        price = _money(price)
+        order = orders.get(seller_id)
+        if order is None:
+            order = orders[seller_id] = {
+                'seller_id': seller_id,
+                'order_number': generate_order_number(),
+                'subtotal': Decimal('0'),
+                'items': [],
+            }
+        subtotal = _money(price * quantity)
+        order['items'].append({
+            'product_id': product_id,
+            'quantity': quantity,
+            'price': price,
+            'subtotal': subtotal,
+        })
+        order['subtotal'] += subtotal
+
+    result = []
+    for seller_id in sorted(orders):
+        order = orders[seller_id]
+        order['tax'] = _money(order['subtotal'] * tax_rate)
+        order['shipping_cost'] = _money(shipping_cost)
+        order['total'] = order['subtotal'] + order['tax'] + order['shipping_cost']
+        result.append(order)
+    return result
+
+
+def place_orders(conn, customer_id, shipping_address_id, lines=None, cart_id=None,
+                 payment_method='cash_on_delivery', tax_rate=Decimal('0'),
+                 shipping_cost=Decimal('0'), reserve=True, notes=None):
+    """Turn a cart into one order per seller inside a single transaction.
+
+    Pass the cart as lines [(product_id, quantity)] or as cart_id (the
+    cart_items rows are then read and deleted). The number of statements
+    is fixed regardless of cart size: product lookup, one batched stock
+    reservation, one multi-row insert each for orders, order_items and
+    payments, one id lookup and the cart cleanup. Set reserve=False when
+    the stock was already taken by a ReservationManager hold.
+
+    Returns the created orders as dicts with their ids and items.
+    """
+    cursor = conn.cursor()
+    try:
+        if lines is None:
+            if cart_id is None:
+                raise CheckoutError("either lines or cart_id is required")
+            lines = load_cart_lines(cursor, cart_id)
+        # Merge duplicate product lines
+        merged = {}
+        for product_id, quantity in lines:
+            merged[product_id] = merged.get(product_id, 0) + quantity
+        lines = sorted(merged.items())
+        if not lines:
+            raise CheckoutError("cart is empty")
+
+        product_ids = [product_id for product_id, _ in lines]
+        cursor.execute(
+            f"SELECT id, seller_id, price, is_active FROM products WHERE id IN ({_in_clause(product_ids)})",
+            product_ids,
+        )
+        products = {row[0]: row[1:] for row in cursor.fetchall()}
+        orders = build_orders(lines, products, tax_rate, shipping_cost)
+
+        if reserve:
+            reserve_stock_batch(conn, lines, commit=False)
+
+        cursor.executemany(
+            "INSERT INTO orders (order_number, customer_id, seller_id, shipping_address_id, "
+            "status, subtotal, tax, shipping_cost, total, notes) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            [
+                (o['order_number'], customer_id, o['seller_id'], shipping_address_id, ORDER_STATUS,
+                 o['subtotal'], o['tax'], o['shipping_cost'], o['total'], notes)
+                for o in orders
+            ],
+        )
+        # Auto-increment ids of a multi-row insert are not guaranteed to be
+        # consecutive, so look them up by the unique order_number
+        numbers = [o['order_number'] for o in orders]
+        cursor.execute(
+            f"SELECT id, order_number FROM orders WHERE order_number IN ({_in_clause(numbers)})",
+            numbers,
+        )
+        ids = {number: order_id for order_id, number in cursor.fetchall()}
+        for order in orders:
+            order['id'] = ids[order['order_number']]
+
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price, subtotal) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [
+                (o['id'], item['product_id'], item['quantity'], item['price'], item['subtotal'])
+                for o in orders
+                for item in o['items']
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO payments (order_id, amount, payment_method, status) "
+            "VALUES (%s, %s, %s, %s)",
+            [(o['id'], o['total'], payment_method, PAYMENT_STATUS) for o in orders],
+        )
+        if cart_id is not None:
+            cursor.execute("DELETE FROM cart_items WHERE cart_id = %s", (cart_id,))
+        conn.commit()
+        return orders
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -71,7 +71,12 @@ CREATE TABLE products (
     FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE RESTRICT,
     INDEX idx_seller (seller_id),
     INDEX idx_category (category_id),
-    INDEX idx_sku (sku)
+    INDEX idx_sku (sku),
+    -- Keyset pagination: (sort column, id) within and across categories
+    INDEX idx_category_price (category_id, price),
+    INDEX idx_category_created (category_id, created_at),
+    INDEX idx_price (price),
+    INDEX idx_created (created_at)
 );
 
 -- 5. Inventory table
@@ -144,7 +149,12 @@ CREATE TABLE orders (
     INDEX idx_customer (customer_id),
     INDEX idx_seller (seller_id),
     INDEX idx_status (status),
-    INDEX idx_order_number (order_number)
+    -- Seller order lists filtered by status
+    INDEX idx_seller_status (seller_id, status),
+    INDEX idx_order_number (order_number),
+    -- Sales rollups: recompute by day range, find recently changed orders
+    INDEX idx_created (created_at),
+    INDEX idx_updated (updated_at)
 );
 
 -- 10. Order Items table
@@ -174,6 +174,7 @@ AND INDEX_NAME != 'PRIMARY'
 ORDER BY INDEX_NAME;
 
 -- Expected: Indexes on seller_id, category_id, sku
+-- plus keyset pagination indexes on (category_id, price), (category_id, created_at), price, created_at
 
 -- ============================================
 -- 7. INVENTORY TABLE VALIDATION
@@ -346,6 +347,7 @@ AND INDEX_NAME != 'PRIMARY'
 ORDER BY INDEX_NAME;
 
 -- Expected: Indexes on customer_id, seller_id, status, order_number
+-- plus (seller_id, status) for seller order lists and sales rollup indexes on created_at, updated_at
 
 -- ============================================
 -- 12. ORDER_ITEMS TABLE VALIDATION
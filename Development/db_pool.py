@@ -0,0 +1,361 @@
+"""
+MySQL Connection Pool
+"""
+import os
+import threading
+import time
+from flask import current_app, g
+
+# Try to import MySQLdb, fallback to PyMySQL
+try:
+    import MySQLdb
+except ImportError:
+    import pymysql
+    pymysql.install_as_MySQLdb()
+    import MySQLdb
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within acquire_timeout"""
+
+
+def mysql_config_from_env():
+    """Read connection settings from the environment (.env)"""
+    return {
+        'host': os.getenv('MYSQL_HOST', 'localhost'),
+        'user': os.getenv('MYSQL_USER', 'root'),
+        'passwd': os.getenv('MYSQL_PASSWORD', ''),
+        'db': os.getenv('MYSQL_DB', 'ecommerce_db'),
+        'port': int(os.getenv('MYSQL_PORT', '3306')),
+        'charset': 'utf8mb4',
+    }
+
+
+def mysql_replica_config(app, primary):
+    """Read-replica settings from MYSQL_REPLICA_* (app.config, then the environment).
+
+    Returns None when MYSQL_REPLICA_HOST is not set; any other setting
+    left out is taken from primary.
+    """
+    if not app.config.get('MYSQL_REPLICA_HOST', os.getenv('MYSQL_REPLICA_HOST')):
+        return None
+    config = dict(primary)
+    for suffix, option in (('HOST', 'host'), ('PORT', 'port'), ('USER', 'user'),
+                           ('PASSWORD', 'passwd'), ('DB', 'db')):
+        key = f"MYSQL_REPLICA_{suffix}"
+        value = app.config.get(key, os.getenv(key))
+        if value is not None:
+            config[option] = int(value) if option == 'port' else value
+    return config
+
+
+def mysql_connector(**config):
+    """Return a zero-argument function that opens a MySQL connection"""
+    def connect():
+        return MySQLdb.connect(**config)
+    return connect
+
+
+def ping_connection(conn):
+    """Default health check: MySQL ping, or SELECT 1 for other drivers"""
+    if hasattr(conn, 'ping'):
+        conn.ping()
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class PooledConnection:
+    """Proxy around a DB connection; close() returns it to the pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    @property
+    def raw(self):
+        """The underlying driver connection"""
+        return self._conn
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+    def close(self):
+        """Return the connection to the pool (safe to call twice)"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool._release(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise AttributeError(f"connection already returned to pool: {name}")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB connections.
+
+    Idle connections are recycled after idle_timeout seconds and every
+    connection after max_lifetime seconds. A connection that sat idle for
+    longer than health_check_interval is pinged before being handed out.
+    """
+
+    def __init__(self, connect, max_size=10, max_lifetime=3600, idle_timeout=300,
+                 acquire_timeout=5.0, health_check=ping_connection,
+                 health_check_interval=30):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._health_check = health_check
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        # Idle connections as (conn, created_at, returned_at), most recent last
+        self._idle = []
+        # id(conn) -> created_at for connections handed out
+        self._in_use = {}
+        # Slots claimed by threads currently opening a new connection
+        self._reserved = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._created = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+
+    # Checkout / return
+
+    def acquire(self):
+        """Check out a connection, waiting up to acquire_timeout seconds"""
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                entry = None
+                while True:
+                    if self._closed:
+                        raise RuntimeError("connection pool is closed")
+                    entry = self._pop_idle()
+                    if entry is not None:
+                        # Count it as in use before the health check so the
+                        # pool never exceeds max_size
+                        self._in_use[id(entry[0])] = entry[1]
+                        break
+                    if len(self._in_use) + self._reserved < self.max_size:
+                        self._reserved += 1
+                        break
+                    remaining = self.acquire_timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"no connection available after {self.acquire_timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                conn = self._open()
+                break
+            conn, created_at, returned_at = entry
+            if time.monotonic() - returned_at < self.health_check_interval:
+                break
+            if self._check(conn):
+                break
+            # Failed health check: the connection was dropped, try again
+
+        wait = time.monotonic() - started
+        with self._cond:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += wait
+                self._max_wait_time = max(self._max_wait_time, wait)
+        return PooledConnection(self, conn)
+
+    def _open(self):
+        """Open a new connection for a reserved slot, outside the lock"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._reserved -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._reserved -= 1
+            self._created += 1
+            self._in_use[id(conn)] = time.monotonic()
+        return conn
+
+    def _pop_idle(self):
+        """Take the freshest usable idle connection, recycling stale ones"""
+        now = time.monotonic()
+        while self._idle:
+            conn, created_at, returned_at = self._idle.pop()
+            if self._expired(created_at, returned_at, now):
+                self._discard(conn)
+                continue
+            return conn, created_at, returned_at
+        return None
+
+    def _expired(self, created_at, returned_at, now):
+        if self.max_lifetime and now - created_at >= self.max_lifetime:
+            return True
+        if self.idle_timeout and now - returned_at >= self.idle_timeout:
+            return True
+        return False
+
+    def _check(self, conn):
+        try:
+            self._health_check(conn)
+            return True
+        except Exception:
+            with self._cond:
+                self._failed_health_checks += 1
+                self._in_use.pop(id(conn), None)
+                self._discard(conn)
+                self._cond.notify()
+            return False
+
+    def _discard(self, conn):
+        """Close a connection that leaves the pool (caller holds the lock)"""
+        self._recycled += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release(self, conn):
+        """Return a connection; rolls back any open transaction first"""
+        try:
+            conn.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._cond:
+            created_at = self._in_use.pop(id(conn), None)
+            now = time.monotonic()
+            if (not healthy or self._closed or created_at is None
+                    or self._expired(created_at, now, now)):
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def prune(self):
+        """Close idle connections past their idle timeout or lifetime"""
+        with self._cond:
+            now = time.monotonic()
+            keep = []
+            for entry in self._idle:
+                if self._expired(entry[1], entry[2], now):
+                    self._discard(entry[0])
+                else:
+                    keep.append(entry)
+            self._idle = keep
+
+    def close(self):
+        """Close idle connections and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            for conn, _, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def metrics(self):
+        """Return pool size, usage and wait statistics"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': len(self._idle) + len(self._in_use),
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'total_wait_time': self._wait_time,
+                'max_wait_time': self._max_wait_time,
+                'created': self._created,
+                'recycled': self._recycled,
+                'failed_health_checks': self._failed_health_checks,
+            }
+
+
+# Flask integration
+
+def init_pool(app, connect=None, replica_connect=None):
+    """Create the app's pools and return connections on app-context teardown.
+
+    Pool settings come from app.config: DB_POOL_SIZE, DB_POOL_MAX_LIFETIME,
+    DB_POOL_IDLE_TIMEOUT and DB_POOL_TIMEOUT. A second pool for the read
+    replica is created when replica_connect is given or, for the default
+    MySQL connection, MYSQL_REPLICA_HOST is set.
+    """
+    if connect is None:
+        config = mysql_config_from_env()
+        for key, option in (('MYSQL_HOST', 'host'), ('MYSQL_USER', 'user'),
+                            ('MYSQL_PASSWORD', 'passwd'), ('MYSQL_DB', 'db')):
+            if key in app.config:
+                config[option] = app.config[key]
+        connect = mysql_connector(**config)
+        if replica_connect is None:
+            replica_config = mysql_replica_config(app, config)
+            if replica_config is not None:
+                replica_connect = mysql_connector(**replica_config)
+
+    def make_pool(connect):
+        return ConnectionPool(
+            connect,
+            max_size=app.config.get('DB_POOL_SIZE', 10),
+            max_lifetime=app.config.get('DB_POOL_MAX_LIFETIME', 3600),
+            idle_timeout=app.config.get('DB_POOL_IDLE_TIMEOUT', 300),
+            acquire_timeout=app.config.get('DB_POOL_TIMEOUT', 5.0),
+        )
+
+    pool = app.extensions['db_pool'] = make_pool(connect)
+    if replica_connect is not None:
+        app.extensions['db_replica_pool'] = make_pool(replica_connect)
+    app.teardown_appcontext(release_request_connections)
+    return pool
+
+
+def _checkout(pool_name):
+    conn = current_app.extensions[pool_name].acquire()
+    g.setdefault('_pooled_connections', []).append(conn)
+    return conn
+
+
+def get_db_connection():
+    """Check out a pooled connection for the current app context.
+
+    Callers may close() it as before; anything left open is returned to
+    the pool when the app context tears down.
+    """
+    return _checkout('db_pool')
+
+
+def get_replica_connection():
+    """Like get_db_connection, from the read-replica pool"""
+    return _checkout('db_replica_pool')
+
+
+def release_request_connections(exc=None):
+    """Teardown handler: return every connection checked out in this context"""
+    for conn in g.pop('_pooled_connections', ()):
+        conn.close()
@@ -0,0 +1,296 @@
+"""
+Streaming CSV/xlsx exports of orders and sales reports
+"""
+import csv
+import io
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+
+from db_pool import MySQLdb
+from rbac import AccessContext
+
+# Unbuffered cursor: rows are read from the server as they are consumed
+SSCursor = MySQLdb.cursors.SSCursor
+
+FETCH_SIZE = 1000
+
+ORDER_EXPORT_COLUMNS = (
+    'order_number', 'created_at', 'status', 'customer_email', 'store_name',
+    'subtotal', 'tax', 'shipping_cost', 'total',
+)
+ORDER_EXPORT_SELECT = (
+    "SELECT o.order_number, o.created_at, o.status, u.email, s.store_name, "
+    "o.subtotal, o.tax, o.shipping_cost, o.total "
+    "FROM orders o "
+    "JOIN users u ON u.id = o.customer_id "
+    "JOIN sellers s ON s.id = o.seller_id"
+)
+SALES_EXPORT_COLUMNS = (
+    'order_number', 'created_at', 'status', 'store_name', 'product', 'sku',
+    'quantity', 'price', 'subtotal',
+)
+SALES_EXPORT_SELECT = (
+    "SELECT o.order_number, o.created_at, o.status, s.store_name, p.name, p.sku, "
+    "oi.quantity, oi.price, oi.subtotal "
+    "FROM order_items oi "
+    "JOIN orders o ON o.id = oi.order_id "
+    "JOIN sellers s ON s.id = o.seller_id "
+    "JOIN products p ON p.id = oi.product_id"
+)
+
+# report -> (columns, select, permission for all stores, permission for own store)
+EXPORT_REPORTS = {
+    'orders': (ORDER_EXPORT_COLUMNS, ORDER_EXPORT_SELECT, 'view_all_orders', 'view_store_orders'),
+    'sales': (SALES_EXPORT_COLUMNS, SALES_EXPORT_SELECT, 'view_reports', 'view_store_reports'),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class ExportForbidden(PermissionError):
+    """Raised when the role may not export the requested report"""
+
+
+def export_scope(conn, role, user_id, report):
+    """Seller id the export is limited to, or None for all stores.
+
+    Admins (view_all_orders / view_reports) export every store; sellers
+    (view_store_orders / view_store_reports) only their own.
+    """
+    if report not in EXPORT_REPORTS:
+        raise ValueError(f"unknown report {report!r}")
+    _, _, all_permission, store_permission = EXPORT_REPORTS[report]
+    access = AccessContext(role)
+    if access.has_permission(all_permission):
+        return None
+    if not access.has_permission(store_permission):
+        raise ExportForbidden(f"role {role!r} may not export {report}")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM sellers WHERE user_id = %s", (user_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        raise ExportForbidden(f"user {user_id} has no store")
+    return row[0]
+
+
+def build_export_query(report, seller_id=None, start=None, end=None):
+    """SELECT for a report, optionally limited to one seller and a date range (inclusive)"""
+    _, select, _, _ = EXPORT_REPORTS[report]
+    conditions, params = [], []
+    if seller_id is not None:
+        conditions.append("o.seller_id = %s")
+        params.append(seller_id)
+    if start is not None:
+        conditions.append("o.created_at >= %s")
+        params.append(start.isoformat())
+    if end is not None:
+        conditions.append("o.created_at < %s")
+        params.append((end + timedelta(days=1)).isoformat())
+    sql = select
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    order = "o.id, oi.id" if report == 'sales' else "o.id"
+    return sql + f" ORDER BY {order}", params
+
+
+def stream_rows(conn, sql, params=(), fetch_size=FETCH_SIZE):
+    """Yield rows from an unbuffered server-side cursor, fetch_size at a time.
+
+    Falls back to the connection's default cursor for drivers without
+    SSCursor support. The cursor is closed when the generator finishes or
+    is closed early.
+    """
+    try:
+        cursor = conn.cursor(SSCursor)
+    except TypeError:
+        cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+# Spreadsheets run a CSV cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def _csv_cell(value):
+    """Text for a CSV cell; user-entered strings that look like formulas get a leading '"""
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def csv_chunks(columns, rows, chunk_rows=500):
+    """Encode rows as CSV, yielding one bytes chunk per chunk_rows rows.
+
+    String cells starting with = + - @ (or a tab / carriage return) are
+    prefixed with ' so spreadsheet apps show them instead of evaluating
+    them; numbers, including negative ones, are written as they are.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file that hands written bytes back in chunks"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(_text(value))}</t></is></c>'
+
+
+def xlsx_chunks(columns, rows, sheet_name='Export', chunk_rows=500):
+    """Encode rows as a single-sheet xlsx workbook, streamed as it is zipped.
+
+    Cells use inline strings, so no shared-string table has to be held in
+    memory, and the zip is written to a non-seekable sink (data
+    descriptors), so nothing is buffered beyond the current chunk.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(name=escape(sheet_name)))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            lines = ['<row>' + ''.join(_xlsx_cell(c) for c in columns) + '</row>']
+            for row in rows:
+                lines.append('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>')
+                if len(lines) >= chunk_rows:
+                    sheet.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write(''.join(lines).encode('utf-8') + b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def export_response(connect, role, user_id, report, fmt='csv', start=None, end=None):
+    """Flask Response streaming a report in fmt ('csv' or 'xlsx').
+
+    connect opens a dedicated connection that stays open while the
+    response streams and is closed when it ends. Raises ExportForbidden
+    (views turn it into a 403) before anything is streamed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    conn = connect()
+    try:
+        seller_id = export_scope(conn, role, user_id, report)
+    except Exception:
+        conn.close()
+        raise
+    columns = EXPORT_REPORTS[report][0]
+    sql, params = build_export_query(report, seller_id, start, end)
+
+    def generate():
+        try:
+            rows = stream_rows(conn, sql, params)
+            if fmt == 'csv':
+                yield from csv_chunks(columns, rows)
+            else:
+                yield from xlsx_chunks(columns, rows, sheet_name=report.title())
+        finally:
+            conn.close()
+
+    filename = f"{report}-{date.today():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,342 @@
+"""
+Inventory reservation engine (overselling prevention)
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+RESERVE_SQL = (
+    "UPDATE inventory SET quantity = quantity - %s "
+    "WHERE product_id = %s AND quantity >= %s"
+)
+RESTOCK_SQL = "UPDATE inventory SET quantity = quantity + %s WHERE product_id = %s"
+
+DEFAULT_HOLD_SECONDS = 15 * 60
+DEFAULT_HOLDS_PATH = 'inventory_holds.sqlite3'
+
+HOLDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS holds (
+    id TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    owner,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_holds_expires ON holds (expires_at);
+"""
+
+
+class InsufficientStock(Exception):
+    """Raised when a product does not have enough stock; nothing is reserved"""
+
+    def __init__(self, product_id, requested):
+        super().__init__(f"insufficient stock for product {product_id} (requested {requested})")
+        self.product_id = product_id
+        self.requested = requested
+
+
+def _normalize(items):
+    """Merge duplicate lines and sort by product id.
+
+    Every reservation touches inventory rows in ascending product_id order,
+    so two concurrent multi-item checkouts always lock rows in the same
+    order and cannot deadlock each other.
+    """
+    totals = {}
+    for product_id, quantity in (items.items() if isinstance(items, dict) else items):
+        if quantity <= 0:
+            raise ValueError(f"quantity must be positive for product {product_id}")
+        totals[product_id] = totals.get(product_id, 0) + quantity
+    return sorted(totals.items())
+
+
+def reserve_stock(conn, items, commit=True):
+    """Atomically decrement stock for every (product_id, quantity) in items.
+
+    Each row is decremented with a conditional UPDATE, so there is no
+    read-then-write window. If any product is short, the whole transaction
+    is rolled back and InsufficientStock is raised.
+    """
+    lines = _normalize(items)
+    cursor = conn.cursor()
+    try:
+        for product_id, quantity in lines:
+            cursor.execute(RESERVE_SQL, (quantity, product_id, quantity))
+            if cursor.rowcount != 1:
+                conn.rollback()
+                raise InsufficientStock(product_id, quantity)
+        if commit:
+            conn.commit()
+    except InsufficientStock:
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return lines
+
+
+def reserve_stock_batch(conn, items, commit=True):
+    """reserve_stock in a single UPDATE statement, for large carts.
+
+    One CASE expression maps each product to its quantity; MySQL walks the
+    product_id unique index in order, so the lock order is the same as
+    reserve_stock. If fewer rows than lines were updated, the transaction is
+    rolled back and one SELECT identifies the short product.
+    """
+    lines = _normalize(items)
+    if not lines:
+        return lines
+    case = "CASE product_id " + " ".join(["WHEN %s THEN %s"] * len(lines)) + " END"
+    case_params = [value for line in lines for value in line]
+    ids = [product_id for product_id, _ in lines]
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = (
+        f"UPDATE inventory SET quantity = quantity - {case} "
+        f"WHERE product_id IN ({placeholders}) AND quantity >= {case}"
+    )
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, case_params + ids + case_params)
+        if cursor.rowcount != len(lines):
+            conn.rollback()
+            cursor.execute(
+                f"SELECT product_id, quantity FROM inventory WHERE product_id IN ({placeholders})", ids)
+            available = dict(cursor.fetchall())
+            for product_id, quantity in lines:
+                if available.get(product_id, 0) < quantity:
+                    raise InsufficientStock(product_id, quantity)
+            raise InsufficientStock(lines[0][0], lines[0][1])
+        if commit:
+            conn.commit()
+    except InsufficientStock:
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return lines
+
+
+def restock(conn, items, commit=True):
+    """Give reserved quantities back (same lock order as reserve_stock)"""
+    from product_cache import on_product_updated
+
+    lines = _normalize(items)
+    cursor = conn.cursor()
+    try:
+        for product_id, quantity in lines:
+            cursor.execute(RESTOCK_SQL, (quantity, product_id))
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    for product_id, _ in lines:
+        on_product_updated(product_id)
+    return lines
+
+
+class Hold:
+    """Stock taken out of inventory for a checkout in progress"""
+
+    __slots__ = ('id', 'items', 'owner', 'expires_at')
+
+    def __init__(self, id, items, owner, expires_at):
+        self.id = id
+        self.items = items
+        self.owner = owner
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_row(cls, row):
+        id, items, owner, expires_at = row
+        return cls(id, [tuple(line) for line in json.loads(items)], owner, expires_at)
+
+
+class ReservationManager:
+    """Time-limited stock holds for checkout.
+
+    start_checkout() decrements inventory immediately and records a hold.
+    The hold is either confirmed when the order is placed (stock stays
+    taken) or released: explicitly, or by release_expired() once it
+    outlives hold_seconds.
+
+    Holds are stored in a SQLite file (INVENTORY_HOLDS_PATH; init_reservations
+    defaults it to the app's instance folder) shared by every worker on the
+    host, so any worker can confirm or release a hold
+    and the sweeper of any live worker returns the stock of holds left
+    behind by a worker that crashed or restarted. The inventory update and
+    the hold record cannot share a transaction; the order of the two
+    writes is chosen so a crash in between leaves stock held rather than
+    restocking it twice.
+    """
+
+    def __init__(self, hold_seconds=DEFAULT_HOLD_SECONDS, clock=time.time, path=None):
+        self.hold_seconds = hold_seconds
+        self.path = path or os.getenv('INVENTORY_HOLDS_PATH', DEFAULT_HOLDS_PATH)
+        self._clock = clock
+        self._local = threading.local()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.path:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(HOLDS_SCHEMA)
+            self._local.conn = conn
+            self._local.path = self.path
+        return conn
+
+    def _take(self, where, params):
+        """Delete and return the holds matching where, atomically across workers"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(f"SELECT id, items, owner, expires_at FROM holds WHERE {where}", params).fetchall()
+            if rows:
+                conn.executemany("DELETE FROM holds WHERE id = ?", [(row[0],) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [Hold.from_row(row) for row in rows]
+
+    def _put(self, holds):
+        self._connection().executemany(
+            "INSERT INTO holds (id, items, owner, expires_at) VALUES (?, ?, ?, ?)",
+            [(hold.id, json.dumps(hold.items), hold.owner, hold.expires_at) for hold in holds],
+        )
+
+    def start_checkout(self, conn, items, owner=None):
+        """Reserve stock for a checkout and return the Hold"""
+        lines = reserve_stock(conn, items)
+        hold = Hold(uuid.uuid4().hex, lines, owner, self._clock() + self.hold_seconds)
+        try:
+            self._put([hold])
+        except Exception:
+            restock(conn, lines)
+            raise
+        return hold
+
+    def get(self, hold_id):
+        row = self._connection().execute(
+            "SELECT id, items, owner, expires_at FROM holds WHERE id = ?", (hold_id,)).fetchone()
+        return None if row is None else Hold.from_row(row)
+
+    def confirm(self, hold_id):
+        """The order was placed: keep the stock taken and forget the hold.
+
+        Returns the Hold, or None if it already expired (stock was given
+        back, so the caller must reserve again).
+        """
+        holds = self._take("id = ?", (hold_id,))
+        return holds[0] if holds else None
+
+    def release(self, conn, hold_id):
+        """Cancel a checkout and return its stock"""
+        holds = self._take("id = ?", (hold_id,))
+        if not holds:
+            return None
+        try:
+            restock(conn, holds[0].items)
+        except Exception:
+            self._put(holds)
+            raise
+        return holds[0]
+
+    def release_expired(self, conn):
+        """Return stock for every expired hold; returns how many were released"""
+        expired = self._take("expires_at <= ?", (self._clock(),))
+        if not expired:
+            return 0
+        totals = {}
+        for hold in expired:
+            for product_id, quantity in hold.items:
+                totals[product_id] = totals.get(product_id, 0) + quantity
+        try:
+            restock(conn, totals)
+        except Exception:
+            # Put the holds back so the next sweep retries them
+            self._put(expired)
+            raise
+        return len(expired)
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM holds").fetchone()[0]
+
+    # Background sweeper
+
+    def start_sweeper(self, connect, interval=30):
+        """Release expired holds every interval seconds on a daemon thread.
+
+        The sweeper reaps every worker's expired holds, including those of
+        workers that have since died. connect is a zero-argument function
+        returning a DB connection (for example a ConnectionPool's acquire).
+        """
+        if self._sweeper is not None:
+            return self._sweeper
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    conn = connect()
+                    try:
+                        self.release_expired(conn)
+                    finally:
+                        conn.close()
+                except Exception:
+                    # Keep sweeping; the next pass retries the same holds
+                    logger.exception("inventory hold sweep failed; retrying in %ss", interval)
+
+        self._sweeper = threading.Thread(target=run, name="inventory-hold-sweeper", daemon=True)
+        self._sweeper.start()
+        return self._sweeper
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+
+reservations = ReservationManager()
+
+
+def init_reservations(app, connect=None):
+    """Point the shared manager at the app's hold store and start its sweeper.
+
+    Holds live in INVENTORY_HOLDS_PATH (config or environment), by default
+    inventory_holds.sqlite3 in the app's instance folder, so every worker
+    shares one store whichever directory it was started from. The sweeper
+    runs every INVENTORY_SWEEP_SECONDS on pooled connections and stops at
+    interpreter exit; TESTING apps skip it unless INVENTORY_SWEEPER is set.
+    """
+    path = app.config.get('INVENTORY_HOLDS_PATH') or os.getenv('INVENTORY_HOLDS_PATH')
+    if not path:
+        os.makedirs(app.instance_path, exist_ok=True)
+        path = os.path.join(app.instance_path, DEFAULT_HOLDS_PATH)
+    reservations.path = path
+    reservations.hold_seconds = app.config.get('INVENTORY_HOLD_SECONDS', reservations.hold_seconds)
+    app.extensions['reservations'] = reservations
+
+    if app.config.get('INVENTORY_SWEEPER', not app.testing):
+        if connect is None:
+            connect = app.extensions['db_pool'].acquire
+        reservations.start_sweeper(connect, app.config.get('INVENTORY_SWEEP_SECONDS', 30))
+        atexit.register(reservations.stop_sweeper)
+    return reservations
@@ -0,0 +1,378 @@
+"""
+Durable background job queue (SQLite-backed) with a worker pool
+"""
+import argparse
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at REAL NOT NULL,
+    locked_by TEXT,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, run_at);
+"""
+
+DEFAULT_QUEUE_PATH = 'jobs.sqlite3'
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+
+# name -> handler(payload)
+JOB_HANDLERS = {}
+
+
+def job(name):
+    """Register a handler: @job('generate_invoice') def handler(payload): ..."""
+    def decorator(f):
+        JOB_HANDLERS[name] = f
+        return f
+    return decorator
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Job:
+    """A claimed job; attempts includes the current run"""
+
+    __slots__ = ('id', 'name', 'payload', 'key', 'attempts', 'max_attempts', 'worker_id')
+
+    def __init__(self, id, name, payload, key, attempts, max_attempts, worker_id=None):
+        self.id = id
+        self.name = name
+        self.payload = payload
+        self.key = key
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id
+
+
+class JobQueue:
+    """Jobs stored in a local SQLite file so they survive restarts.
+
+    enqueue() is idempotent per key: a second enqueue with the same
+    idempotency key (e.g. 'generate_invoice:ORD-...') returns the existing
+    job instead of adding one. Workers claim ready jobs inside an
+    IMMEDIATE transaction, so one job never runs on two workers at once;
+    a job whose worker died is reclaimed after visibility_timeout.
+
+    With inline=True (tests, local development) enqueue() runs the handler
+    on the spot and nothing is stored.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, inline=False, visibility_timeout=300,
+                 clock=time.time):
+        self.path = path
+        self.inline = inline
+        self.visibility_timeout = visibility_timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._inline_keys = {}
+        if not inline:
+            self._connection().executescript(QUEUE_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, name, payload=None, key=None, delay=0, max_attempts=5):
+        """Add a job and return its id (the existing id if key was seen before)"""
+        if name not in JOB_HANDLERS:
+            raise KeyError(f"no handler registered for job {name!r}")
+        payload = payload or {}
+        if self.inline:
+            return self._run_inline(name, payload, key)
+        conn = self._connection()
+        now = self._clock()
+        cursor = conn.execute(
+            "INSERT INTO jobs (name, payload, idempotency_key, max_attempts, run_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (idempotency_key) DO NOTHING",
+            (name, json.dumps(payload), key, max_attempts, now + delay, now),
+        )
+        if cursor.rowcount:
+            return cursor.lastrowid
+        return conn.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()[0]
+
+    def _run_inline(self, name, payload, key):
+        if key is not None and key in self._inline_keys:
+            return self._inline_keys[key]
+        JOB_HANDLERS[name](payload)
+        job_id = len(self._inline_keys) + 1
+        if key is not None:
+            self._inline_keys[key] = job_id
+        return job_id
+
+    def claim(self, worker_id, limit=1):
+        """Lock up to limit ready jobs for worker_id.
+
+        Claiming counts as an attempt, so a job that keeps crashing or
+        hanging its worker (and is reclaimed after visibility_timeout)
+        still runs out of attempts; a stale job with none left is marked
+        failed instead of being handed out again.
+        """
+        conn = self._connection()
+        now = self._clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, name, payload, idempotency_key, attempts, max_attempts FROM jobs "
+                "WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND locked_at <= ?) "
+                "ORDER BY run_at, id LIMIT ?",
+                (now, now - self.visibility_timeout, limit),
+            ).fetchall()
+            exhausted = [row for row in rows if row[4] >= row[5]]
+            rows = [row for row in rows if row[4] < row[5]]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', locked_by = NULL, "
+                "last_error = 'worker lost after the final attempt' WHERE id = ?",
+                [(row[0],) for row in exhausted],
+            )
+            conn.executemany(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?, locked_at = ? "
+                "WHERE id = ?",
+                [(worker_id, now, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for row in exhausted:
+            logger.error("job %s (%s) failed permanently: worker lost after the final attempt", row[0], row[1])
+        return [Job(id, name, json.loads(payload), key, attempts + 1, max_attempts, worker_id)
+                for id, name, payload, key, attempts, max_attempts in rows]
+
+    def _settle(self, job, sql, params):
+        """Record a job's outcome unless another worker has reclaimed it since"""
+        cursor = self._connection().execute(sql + " WHERE id = ? AND locked_by = ?",
+                                            params + (job.id, job.worker_id))
+        if not cursor.rowcount:
+            logger.warning("job %s (%s) was reclaimed by another worker; result of %s dropped",
+                           job.id, job.name, job.worker_id)
+            return False
+        return True
+
+    def complete(self, job):
+        return self._settle(job, "UPDATE jobs SET status = 'done', locked_by = NULL, last_error = NULL", ())
+
+    def fail(self, job, error):
+        """Schedule a retry with backoff, or mark the job dead after max_attempts.
+
+        complete() and fail() return False (and change nothing) when the job
+        was reclaimed by another worker after this one's lock went stale.
+        """
+        if job.attempts >= job.max_attempts:
+            settled = self._settle(job, "UPDATE jobs SET status = 'failed', locked_by = NULL, last_error = ?",
+                                   (error,))
+            if settled:
+                logger.error("job %s (%s) failed permanently: %s", job.id, job.name, error)
+            return settled
+        return self._settle(job, "UPDATE jobs SET status = 'queued', run_at = ?, locked_by = NULL, last_error = ?",
+                     (self._clock() + backoff_delay(job.attempts), error))
+
+    def run(self, job):
+        """Run one claimed job and record the outcome; returns True on success"""
+        try:
+            JOB_HANDLERS[job.name](job.payload)
+        except Exception as error:
+            logger.warning("job %s (%s) attempt %s failed: %s", job.id, job.name, job.attempts, error)
+            self.fail(job, f"{type(error).__name__}: {error}")
+            return False
+        self.complete(job)
+        return True
+
+    def run_pending(self, worker_id='inline', limit=100):
+        """Run ready jobs in this thread until none are left; returns how many ran"""
+        ran = 0
+        while ran < limit:
+            jobs = self.claim(worker_id)
+            if not jobs:
+                break
+            self.run(jobs[0])
+            ran += 1
+        return ran
+
+    def counts(self):
+        """{status: number of jobs}"""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows.fetchall())
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            "SELECT status, attempts, last_error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(zip(('status', 'attempts', 'last_error'), row))
+
+
+class WorkerPool:
+    """Threads that poll the queue and run jobs until stop() is called"""
+
+    def __init__(self, queue, concurrency=4, poll_interval=1.0):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self.worker_id = f"{uuid.uuid4().hex[:8]}"
+
+    def _loop(self, index):
+        worker_id = f"{self.worker_id}-{index}"
+        while not self._stop.is_set():
+            try:
+                jobs = self.queue.claim(worker_id)
+            except sqlite3.OperationalError:
+                # Database busy; try again on the next poll
+                jobs = []
+            if not jobs:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.queue.run(jobs[0])
+
+    def start(self):
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, args=(index,), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+# Post-checkout jobs
+
+@job('generate_invoice')
+def generate_invoice(payload):
+    """Give the order's payment an invoice number (safe to run twice)"""
+    from utils import get_db_connection
+
+    order_number = payload['order_number']
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE payments SET invoice_number = %s "
+            "WHERE invoice_number IS NULL AND order_id = (SELECT id FROM orders WHERE order_number = %s)",
+            (order_number.replace('ORD-', 'INV-', 1), order_number),
+        )
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@job('send_order_confirmation')
+def send_order_confirmation(payload):
+    """Notify the customer about a placed order (hook for the mail backend)"""
+    logger.info("order confirmation for %s", payload['order_number'])
+
+
+@job('update_sales_rollup')
+def update_sales_rollup(payload):
+    """Count the order in this process's dashboard rollup.
+
+    Only a rollup that finished its backfill is updated (the backfill
+    already sees the order otherwise). Rollups in other processes pick the
+    order up on their next refresh, within SALES_ROLLUP_REFRESH_SECONDS.
+    """
+    from sales_rollup import sales_rollup
+    from utils import get_db_connection
+
+    if sales_rollup.watermark is None:
+        return
+    conn = get_db_connection()
+    try:
+        sales_rollup.on_orders_placed(conn, [payload['order_id']])
+    finally:
+        conn.close()
+
+
+POST_CHECKOUT_JOBS = ('generate_invoice', 'send_order_confirmation', 'update_sales_rollup')
+
+
+def enqueue_post_checkout(queue, orders):
+    """Queue the follow-up work for orders returned by place_orders.
+
+    Keys are '<job>:<order_number>', so retrying a checkout request never
+    queues the same work twice.
+    """
+    return [
+        queue.enqueue(name, {'order_number': order['order_number'], 'order_id': order['id']},
+                      key=f"{name}:{order['order_number']}")
+        for order in orders
+        for name in POST_CHECKOUT_JOBS
+    ]
+
+
+# Flask integration
+
+def init_job_queue(app):
+    """Create the app's queue from JOB_QUEUE_PATH / JOB_QUEUE_INLINE (inline when testing)"""
+    queue = JobQueue(
+        app.config.get('JOB_QUEUE_PATH', DEFAULT_QUEUE_PATH),
+        inline=app.config.get('JOB_QUEUE_INLINE', app.testing),
+    )
+    app.extensions['job_queue'] = queue
+    return queue
+
+
+def get_job_queue():
+    return current_app.extensions['job_queue']
+
+
+def main():
+    """Worker process: python jobs.py --path jobs.sqlite3 --concurrency 4"""
+    from dotenv import load_dotenv
+    from db_pool import mysql_config_from_env, mysql_connector
+    from utils import set_db_connection_func
+
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument('--path', default=DEFAULT_QUEUE_PATH)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    set_db_connection_func(mysql_connector(**mysql_config_from_env()))
+    pool = WorkerPool(JobQueue(args.path), args.concurrency, args.poll_interval)
+    pool.start()
+    logger.info("%s workers polling %s", args.concurrency, args.path)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()
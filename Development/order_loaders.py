@@ -0,0 +1,171 @@
+"""
+Batch loaders for order history and order detail pages
+"""
+ORDER_COLUMNS = (
+    'id', 'order_number', 'customer_id', 'seller_id', 'status',
+    'subtotal', 'tax', 'shipping_cost', 'total', 'created_at',
+)
+ORDER_ITEMS_QUERY = (
+    "SELECT order_id, id, product_id, quantity, price, subtotal "
+    "FROM order_items WHERE order_id IN ({placeholders}) ORDER BY order_id, id"
+)
+PRODUCTS_QUERY = "SELECT id, name, sku, image_url FROM products WHERE id IN ({placeholders})"
+PAYMENTS_QUERY = (
+    "SELECT order_id, id, payment_method, status, amount, invoice_number, payment_date "
+    "FROM payments WHERE order_id IN ({placeholders}) ORDER BY order_id, id"
+)
+
+MAX_BATCH_SIZE = 1000
+
+
+class BatchLoader:
+    """DataLoader-style loader: collect keys, fetch them with one IN query.
+
+    batch_fn(keys) returns {key: value} for the keys it found; missing keys
+    resolve to default. Results are cached, so a loader should live for
+    one request (or one page render).
+    """
+
+    def __init__(self, batch_fn, default=None, max_batch_size=MAX_BATCH_SIZE):
+        self._batch_fn = batch_fn
+        self._default = default
+        self._max_batch_size = max_batch_size
+        self._cache = {}
+        self.batches = 0
+
+    def load_many(self, keys):
+        """{key: value} for every key, fetching uncached keys in as few batches as possible"""
+        keys = list(dict.fromkeys(keys))
+        missing = [key for key in keys if key not in self._cache]
+        for start in range(0, len(missing), self._max_batch_size):
+            chunk = missing[start:start + self._max_batch_size]
+            found = self._batch_fn(chunk)
+            self.batches += 1
+            for key in chunk:
+                self._cache[key] = found.get(key, self._default)
+        return {key: self._cache[key] for key in keys}
+
+    def load(self, key):
+        return self.load_many([key])[key]
+
+    def prime(self, key, value):
+        self._cache.setdefault(key, value)
+
+
+def _fetch(conn, query, keys):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query.format(placeholders=", ".join(["%s"] * len(keys))), list(keys))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+class OrderLoaders:
+    """The three loaders an order page needs, sharing one connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.items = BatchLoader(self._items, default=())
+        self.products = BatchLoader(self._products)
+        self.payments = BatchLoader(self._payments)
+
+    def _items(self, order_ids):
+        grouped = {}
+        rows = _fetch(self.conn, ORDER_ITEMS_QUERY, order_ids)
+        for order_id, item_id, product_id, quantity, price, subtotal in rows:
+            grouped.setdefault(order_id, []).append({
+                'id': item_id, 'product_id': product_id, 'quantity': quantity,
+                'price': price, 'subtotal': subtotal,
+            })
+        return grouped
+
+    def _products(self, product_ids):
+        return {
+            product_id: {'name': name, 'sku': sku, 'image_url': image_url}
+            for product_id, name, sku, image_url in _fetch(self.conn, PRODUCTS_QUERY, product_ids)
+        }
+
+    def _payments(self, order_ids):
+        # Ordered by id, so the latest payment attempt wins
+        latest = {}
+        rows = _fetch(self.conn, PAYMENTS_QUERY, order_ids)
+        for order_id, payment_id, method, status, amount, invoice, paid_at in rows:
+            latest[order_id] = {
+                'id': payment_id, 'method': method, 'status': status, 'amount': amount,
+                'invoice_number': invoice, 'payment_date': paid_at,
+            }
+        return latest
+
+    def attach(self, orders):
+        """Add 'items' (with product name/sku) and 'payment' to each order dict.
+
+        Three queries in total, however many orders and items there are.
+        """
+        order_ids = [order['id'] for order in orders]
+        items = self.items.load_many(order_ids)
+        product_ids = [item['product_id'] for order_id in order_ids for item in items[order_id]]
+        products = self.products.load_many(product_ids)
+        payments = self.payments.load_many(order_ids)
+        missing = {'name': None, 'sku': None, 'image_url': None}
+        for order in orders:
+            order['items'] = [
+                dict(item, **(products[item['product_id']] or missing))
+                for item in items[order['id']]
+            ]
+            order['payment'] = payments[order['id']]
+        return orders
+
+
+def _order_query(customer_id, seller_id, before_id, order_id, limit):
+    conditions, params = [], []
+    # customer_id / seller_id lead so idx_customer / idx_seller drive the scan
+    if customer_id is not None:
+        conditions.append("customer_id = %s")
+        params.append(customer_id)
+    if seller_id is not None:
+        conditions.append("seller_id = %s")
+        params.append(seller_id)
+    if order_id is not None:
+        conditions.append("id = %s")
+        params.append(order_id)
+    if before_id is not None:
+        conditions.append("id < %s")
+        params.append(before_id)
+    sql = f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY id DESC LIMIT %s"
+    params.append(limit)
+    return sql, params
+
+
+def order_history(conn, customer_id=None, seller_id=None, before_id=None, limit=20):
+    """One page of orders, newest first, with items, products and payment.
+
+    Pass customer_id for view_own_orders, seller_id for view_store_orders
+    and neither for view_all_orders. Always four queries; pass the last
+    order's id as before_id for the next page.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*_order_query(customer_id, seller_id, before_id, None, limit))
+        orders = [dict(zip(ORDER_COLUMNS, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    if not orders:
+        return []
+    return OrderLoaders(conn).attach(orders)
+
+
+def order_detail(conn, order_id, customer_id=None, seller_id=None):
+    """A single order with items and payment, or None if missing or not visible to the caller"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*_order_query(customer_id, seller_id, None, order_id, 1))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        return None
+    return OrderLoaders(conn).attach([dict(zip(ORDER_COLUMNS, row))])[0]
@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination for product listing and search
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+# Sort name -> (column, direction). Every sort also orders by id as a tie-breaker.
+PRODUCT_SORTS = {
+    'newest': ('created_at', 'DESC'),
+    'oldest': ('created_at', 'ASC'),
+    'price_asc': ('price', 'ASC'),
+    'price_desc': ('price', 'DESC'),
+}
+DEFAULT_SORT = 'newest'
+MAX_PAGE_SIZE = 100
+
+PRODUCT_COLUMNS = (
+    'id', 'seller_id', 'category_id', 'name', 'price', 'sku', 'image_url', 'created_at'
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that are malformed or belong to another sort order"""
+
+
+class Page:
+    """One page of results plus the cursor for the next page"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(sort, sort_value, row_id):
+    """Pack (sort, sort_value, id) into an opaque URL-safe token"""
+    if hasattr(sort_value, 'isoformat'):
+        sort_value = sort_value.isoformat(sep=' ')
+    elif not isinstance(sort_value, str):
+        sort_value = str(sort_value)
+    payload = json.dumps([sort, sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Unpack a cursor, returns (sort_value, id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor("malformed cursor")
+    if cursor_sort != sort:
+        raise InvalidCursor("cursor does not match the requested sort order")
+    if not isinstance(row_id, int) or not isinstance(sort_value, str):
+        raise InvalidCursor("malformed cursor")
+    if PRODUCT_SORTS[sort][0] == 'price':
+        try:
+            sort_value = Decimal(sort_value)
+        except InvalidOperation:
+            raise InvalidCursor("malformed cursor")
+    return sort_value, row_id
+
+
+def build_product_page_query(sort=DEFAULT_SORT, category_ids=None, cursor=None, limit=20):
+    """Build the SQL for one keyset page of active products.
+
+    category_ids may be a single id or a list (e.g. a category subtree).
+    The seek predicate is written as "col >= x AND (col > x OR id > y)":
+    the leading bound lets MySQL range-scan the (category_id, col) / (col)
+    indexes from the cursor position instead of from the first row. One
+    extra row is fetched to detect whether a next page exists.
+    """
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"unknown sort order: {sort}")
+    column, direction = PRODUCT_SORTS[sort]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    op = '<' if direction == 'DESC' else '>'
+
+    where = ["p.is_active = TRUE"]
+    params = []
+
+    if category_ids is not None:
+        if isinstance(category_ids, int):
+            category_ids = [category_ids]
+        category_ids = list(category_ids)
+        if not category_ids:
+            # Empty subtree: match nothing without a malformed IN ()
+            where.append("1 = 0")
+        elif len(category_ids) == 1:
+            where.append("p.category_id = %s")
+            params.append(category_ids[0])
+        else:
+            where.append(f"p.category_id IN ({', '.join(['%s'] * len(category_ids))})")
+            params.extend(category_ids)
+
+    if cursor is not None:
+        sort_value, row_id = decode_cursor(cursor, sort)
+        where.append(f"p.{column} {op}= %s AND (p.{column} {op} %s OR p.id {op} %s)")
+        params.extend([sort_value, sort_value, row_id])
+
+    columns = ', '.join(f"p.{name}" for name in PRODUCT_COLUMNS)
+    sql = (
+        f"SELECT {columns} FROM products p "
+        f"WHERE {' AND '.join(where)} "
+        f"ORDER BY p.{column} {direction}, p.id {direction} "
+        f"LIMIT {limit + 1}"
+    )
+    return sql, params
+
+
+def fetch_product_page(conn, sort=DEFAULT_SORT, category_ids=None, cursor=None, limit=20):
+    """Run one keyset page query and return a Page of product dicts"""
+    sql, params = build_product_page_query(sort, category_ids, cursor, limit)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    db_cursor = conn.cursor()
+    try:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    finally:
+        db_cursor.close()
+
+    items = [dict(zip(PRODUCT_COLUMNS, row)) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        column = PRODUCT_SORTS[sort][0]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, last[column], last['id'])
+    return Page(items, next_cursor)
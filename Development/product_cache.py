@@ -0,0 +1,305 @@
+"""
+Read-through cache for product detail lookups
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import cart_summary
+from category_tree import get_category_tree
+from utils import get_db_connection
+
+# Redis is optional; without it only the in-process LRU is used
+try:
+    import redis
+except ImportError:
+    redis = None
+
+PRODUCT_DETAIL_QUERY = (
+    "SELECT p.id, p.seller_id, p.category_id, p.name, p.description, p.price, p.sku, "
+    "p.image_url, p.is_active, COALESCE(i.quantity, 0), i.low_stock_threshold, "
+    "s.store_name, c.name "
+    "FROM products p "
+    "LEFT JOIN inventory i ON i.product_id = p.id "
+    "LEFT JOIN sellers s ON s.id = p.seller_id "
+    "LEFT JOIN categories c ON c.id = p.category_id "
+    "WHERE p.id = %s"
+)
+PRODUCT_DETAIL_FIELDS = (
+    'id', 'seller_id', 'category_id', 'name', 'description', 'price', 'sku',
+    'image_url', 'is_active', 'stock', 'low_stock_threshold', 'store_name', 'category_name',
+)
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Bounded in-process cache with a TTL per entry"""
+
+    def __init__(self, max_entries=5000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DictBackend:
+    """In-process stand-in for the subset of the Redis API the cache uses"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= self._clock():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (self._clock() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+def redis_backend_from_env():
+    """Redis client for REDIS_URL, or None if unset or redis is not installed"""
+    url = os.getenv('REDIS_URL')
+    if not url or redis is None:
+        return None
+    return redis.Redis.from_url(url)
+
+
+class _Flight:
+    """One in-progress load that concurrent callers wait on"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReadThroughCache:
+    """Local LRU in front of an optional shared (Redis-compatible) backend.
+
+    On a miss in both tiers only one thread per key runs the loader; the
+    others wait for its result instead of stampeding the database. Values
+    stored in the shared backend are pickled, so it must only be reachable
+    by the application. Local entries use a shorter TTL than shared ones:
+    invalidate() clears this process and the shared tier, and other
+    workers pick the change up when their local copy expires.
+    """
+
+    def __init__(self, backend=None, ttl=300, local_ttl=5, max_entries=5000,
+                 prefix='cache:', clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.prefix = prefix
+        self.local = LocalLRU(max_entries, clock)
+        self._lock = threading.Lock()
+        self._flights = {}
+        # key -> invalidations seen while a load for key is in flight
+        self._generations = {}
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'loads': 0, 'waits': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _shared_get(self, key):
+        if self.backend is None:
+            return _MISSING
+        raw = self.backend.get(self.prefix + key)
+        return _MISSING if raw is None else pickle.loads(raw)
+
+    def get(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() on a miss"""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generations.get(key, 0)
+        if not leader:
+            self._count('waits')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._shared_get(key)
+            if value is not _MISSING:
+                self._count('shared_hits')
+                self._store(key, generation, value, ttl, shared=False)
+            else:
+                self._count('loads')
+                value = loader()
+                self._store(key, generation, value, ttl, shared=True)
+            flight.value = value
+            return value
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                self._generations.pop(key, None)
+            flight.done.set()
+
+    def _invalidated_since(self, key, generation):
+        with self._lock:
+            return self._generations.get(key, 0) != generation
+
+    def _store(self, key, generation, value, ttl, shared):
+        """Cache a value read at generation, unless key was invalidated meanwhile.
+
+        The check is repeated after writing: an invalidate() that landed
+        between the check and the write has already run its deletes, so
+        the write is undone here instead.
+        """
+        if self._invalidated_since(key, generation):
+            return
+        if shared and self.backend is not None:
+            self.backend.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+        self.local.set(key, value, min(ttl or self.ttl, self.local_ttl))
+        if self._invalidated_since(key, generation):
+            self.local.delete(key)
+            if shared and self.backend is not None:
+                self.backend.delete(self.prefix + key)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            # Loads in flight for these keys read the old value; bump their
+            # generation so they do not cache it
+            for key in keys:
+                if key in self._flights:
+                    self._generations[key] = self._generations.get(key, 0) + 1
+        for key in keys:
+            self.local.delete(key)
+        if self.backend is not None and keys:
+            self.backend.delete(*(self.prefix + key for key in keys))
+
+
+def load_product_details(conn, product_id):
+    """Product, stock, seller and category as a dict (None if not found)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PRODUCT_DETAIL_QUERY, (product_id,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None:
+        return None
+    details = dict(zip(PRODUCT_DETAIL_FIELDS, row))
+    details['is_active'] = bool(details['is_active'])
+    details['in_stock'] = details['stock'] > 0
+    return details
+
+
+class ProductDetailCache:
+    """Cached product detail pages; category paths come from the category tree"""
+
+    def __init__(self, cache=None):
+        self.cache = cache or ReadThroughCache(prefix='product:')
+
+    def get(self, product_id, connect=None):
+        """Product details for the detail page; connect is only called on a miss.
+
+        Misses load from the primary: the usual miss comes right after an
+        invalidate, and a lagging replica would hand back the pre-update
+        row to be cached for the full TTL.
+        """
+        if connect is None:
+            connect = get_db_connection
+
+        def load():
+            conn = connect()
+            try:
+                return load_product_details(conn, product_id)
+            finally:
+                conn.close()
+
+        details = self.cache.get(str(product_id), load)
+        if details is None:
+            return None
+        details = dict(details)
+        details['breadcrumbs'] = [
+            node.to_dict() for node in get_category_tree().breadcrumbs(details['category_id'])
+        ]
+        return details
+
+    def invalidate(self, product_id):
+        self.cache.invalidate(str(product_id))
+
+
+product_cache = ProductDetailCache(ReadThroughCache(redis_backend_from_env(), prefix='product:'))
+
+
+def on_product_updated(product_id):
+    """Call after a product, its price or its stock is edited or restocked, or it is deleted.
+
+    The one product-change hook: drops the cached detail page (in every
+    worker when the Redis tier is on) and bumps the product's version for
+    cart summaries and {% cache %} fragments in this process.
+    """
+    cart_summary.on_product_changed(product_id)
+    product_cache.invalidate(product_id)
+
+
+def init_product_cache(app):
+    """Apply PRODUCT_CACHE_TTL / PRODUCT_CACHE_LOCAL_TTL and expose the shared cache"""
+    cache = product_cache.cache
+    cache.ttl = app.config.get('PRODUCT_CACHE_TTL', cache.ttl)
+    cache.local_ttl = app.config.get('PRODUCT_CACHE_LOCAL_TTL', cache.local_ttl)
+    app.extensions['product_cache'] = product_cache
+    return product_cache
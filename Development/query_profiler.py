@@ -0,0 +1,254 @@
+"""
+Per-endpoint SQL profiling: statement counts, DB time, N+1 detection and slow-query log
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+import utils
+from rbac import permission_required
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 100
+# Endpoint name for requests no route matched (404s, favicon, scanners)
+UNMATCHED_ENDPOINT = '<unmatched>'
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and IN lists so repeated statements compare equal"""
+    return _IN_LIST.sub('(%s, ...)', _SPACES.sub(' ', sql).strip())
+
+
+def explain(conn, sql, params=()):
+    """Plan rows for sql: MySQL EXPLAIN or SQLite EXPLAIN QUERY PLAN"""
+    is_sqlite = isinstance(getattr(conn, 'raw', conn), sqlite3.Connection)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(("EXPLAIN QUERY PLAN " if is_sqlite else "EXPLAIN ") + sql, params)
+        columns = [column[0].lower() for column in cursor.description]
+        return is_sqlite, [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(conn, sql, params=()):
+    """Tables sql reads without an index lookup (empty list means every table is indexed)"""
+    is_sqlite, plan = explain(conn, sql, params)
+    if is_sqlite:
+        return [row['detail'] for row in plan
+                if row['detail'].startswith('SCAN ') and 'CONSTANT ROW' not in row['detail']]
+    return [row['table'] for row in plan if row.get('type') in ('ALL', 'index')]
+
+
+class SQLBudgetExceeded(AssertionError):
+    """Raised by QueryProfiler.budget() when a block runs too many statements"""
+
+
+class QueryLog:
+    """Statements run during one request (or one budget() block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.db_time += duration
+        self.statements[normalize_sql(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """{statement: times run} for statements run more than once (N+1 suspects)"""
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+
+class ProfiledCursor:
+    """Cursor proxy that times execute()/executemany()"""
+
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    def _timed(self, method, sql, params):
+        started = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            self._connection._profiler.record(self._connection, self._cursor, sql, params,
+                                              time.perf_counter() - started)
+
+    def execute(self, sql, params=()):
+        return self._timed(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._timed(self._cursor.executemany, sql, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class ProfiledConnection:
+    """Connection proxy whose cursors report to a QueryProfiler"""
+
+    def __init__(self, conn, profiler):
+        self.raw = conn
+        self._profiler = profiler
+
+    def cursor(self, *args):
+        return ProfiledCursor(self.raw.cursor(*args), self)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class QueryProfiler:
+    """Collects SQL statistics per Flask endpoint.
+
+    Statements above slow_query_ms are logged with their EXPLAIN plan and
+    kept in a short in-memory list for /admin/metrics.
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, slow_log_size=100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.last_request = None
+        self._budgets = []
+
+    def wrap(self, conn):
+        return ProfiledConnection(conn, self)
+
+    def record(self, conn, cursor, sql, params, duration):
+        if has_request_context():
+            log = g.get('_query_log')
+            if log is None:
+                log = g._query_log = QueryLog()
+            log.record(sql, duration)
+        with self._lock:
+            budgets = list(self._budgets)
+        for budget in budgets:
+            budget.record(sql, duration)
+        if duration * 1000 >= self.slow_query_ms:
+            self._log_slow(conn, cursor, sql, params, duration)
+
+    def _log_slow(self, conn, cursor, sql, params, duration):
+        plan = None
+        # An unbuffered cursor still holds its result set, so the connection
+        # cannot run EXPLAIN until it is consumed
+        unbuffered = any(cls.__name__ == 'SSCursor' for cls in type(cursor).__mro__)
+        if sql.lstrip()[:6].upper() == 'SELECT' and not unbuffered:
+            try:
+                plan = explain(conn.raw, sql, params)[1]
+            except Exception:
+                plan = None
+        entry = {
+            'endpoint': request.endpoint if has_request_context() else None,
+            'sql': normalize_sql(sql),
+            'duration_ms': round(duration * 1000, 3),
+            'plan': plan,
+        }
+        self.slow_queries.append(entry)
+        logger.warning("slow query (%.1f ms) in %s: %s plan=%s",
+                       entry['duration_ms'], entry['endpoint'], entry['sql'], plan)
+
+    def finish_request(self, endpoint):
+        """Fold the current request's QueryLog into the endpoint totals"""
+        log = g.pop('_query_log', None) or QueryLog()
+        self.last_request = log
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'statements': 0, 'max_statements': 0,
+                'db_time_ms': 0.0, 'max_db_time_ms': 0.0, 'n_plus_one_requests': 0,
+            })
+            stats['requests'] += 1
+            stats['statements'] += log.count
+            stats['max_statements'] = max(stats['max_statements'], log.count)
+            stats['db_time_ms'] += log.db_time * 1000
+            stats['max_db_time_ms'] = max(stats['max_db_time_ms'], log.db_time * 1000)
+            if log.duplicates:
+                stats['n_plus_one_requests'] += 1
+        return log
+
+    @contextmanager
+    def budget(self, max_statements, max_duplicates=None):
+        """Fail with SQLBudgetExceeded if the block runs more statements than allowed.
+
+        with profiler.budget(3):
+            client.get('/products/1')
+        """
+        log = QueryLog()
+        with self._lock:
+            self._budgets.append(log)
+        try:
+            yield log
+        finally:
+            with self._lock:
+                self._budgets.remove(log)
+        if log.count > max_statements:
+            raise SQLBudgetExceeded(f"{log.count} statements run, budget is {max_statements}: "
+                                    f"{dict(log.statements)}")
+        if max_duplicates is not None and max(log.statements.values(), default=0) > max_duplicates:
+            raise SQLBudgetExceeded(f"statement repeated beyond {max_duplicates}: {log.duplicates}")
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {name: dict(stats) for name, stats in self.endpoints.items()}
+        for stats in endpoints.values():
+            stats['avg_statements'] = round(stats['statements'] / stats['requests'], 2)
+            stats['avg_db_time_ms'] = round(stats['db_time_ms'] / stats['requests'], 3)
+        return {'endpoints': endpoints, 'slow_queries': list(self.slow_queries)}
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.slow_queries.clear()
+
+
+def init_query_profiler(app, slow_query_ms=None):
+    """Profile every connection from utils.get_db_connection and add /admin/metrics.
+
+    SQL_SLOW_QUERY_MS in app.config sets the slow-query threshold.
+    """
+    if slow_query_ms is None:
+        slow_query_ms = app.config.get('SQL_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)
+    profiler = QueryProfiler(slow_query_ms)
+    app.extensions['query_profiler'] = profiler
+    utils.set_connection_wrapper(profiler.wrap)
+
+    @app.teardown_request
+    def record_request_queries(exc=None):
+        profiler.finish_request(request.endpoint or UNMATCHED_ENDPOINT)
+
+    @permission_required('manage_settings')
+    def query_metrics():
+        metrics = profiler.snapshot()
+        pool = current_app.extensions.get('db_pool')
+        if pool is not None:
+            metrics['pool'] = pool.metrics()
+        startup = current_app.extensions.get('startup')
+        if startup is not None:
+            metrics['startup'] = startup.to_dict()
+        return jsonify(metrics)
+
+    app.add_url_rule('/admin/metrics', 'query_metrics', query_metrics)
+    return profiler
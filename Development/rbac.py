@@ -1,8 +1,11 @@
 """
 Role-Based Access Control (RBAC) Module
 """
+import sys
+import threading
 from functools import wraps
-from flask import redirect, url_for, flash, session, abort
+from types import MappingProxyType
+from flask import redirect, url_for, flash, session, abort, g, has_app_context
 from flask_login import current_user
 
 # Define roles & permissions
@@ -53,14 +56,381 @@ class RBAC:
     @staticmethod
     def has_permission(user_role, permission):
         """Check if user role has specific permission"""
-        if not user_role or user_role not in RBAC.PERMISSIONS:
+        if not user_role:
             return False
-        return permission in RBAC.PERMISSIONS[user_role]
+        return get_registry().engine.has(user_role, permission)
+    
+    @staticmethod
+    def has_permissions(user_role, permissions, inherited=False):
+        """Check several permissions at once, returns {permission: bool}"""
+        return get_registry().engine.check_many(user_role, permissions, inherited)
+    
+    @staticmethod
+    def has_all_permissions(user_role, permissions, inherited=False):
+        """Check if user role has every permission in the list"""
+        return get_registry().engine.has_all(user_role, permissions, inherited)
+    
+    @staticmethod
+    def has_any_permission(user_role, permissions, inherited=False):
+        """Check if user role has at least one permission in the list"""
+        return get_registry().engine.has_any(user_role, permissions, inherited)
     
     @staticmethod
     def get_user_permissions(user_role):
         """Get all permissions for a role"""
-        if not user_role or user_role not in RBAC.PERMISSIONS:
+        if not user_role:
             return []
-        return RBAC.PERMISSIONS[user_role]
-    
\ No newline at end of file
+        return get_registry().engine.permissions_for(user_role)
+
+
+class PermissionEngine:
+    """Permission checks compiled into integer bitmasks.
+    
+    Every permission gets one bit. Each role gets two masks: ``direct``
+    (the role's own PERMISSIONS entry) and ``effective`` (the union over
+    the roles listed for it in ROLE_HIERARCHY). A check is a single AND.
+    """
+    
+    def __init__(self, permissions, hierarchy):
+        # One bit per permission, in declaration order
+        self.bits = {}
+        for role_permissions in permissions.values():
+            for permission in role_permissions:
+                if permission not in self.bits:
+                    self.bits[permission] = 1 << len(self.bits)
+        self.names = sorted(self.bits, key=self.bits.get)
+        
+        self.direct = {
+            role: self._mask(role_permissions)
+            for role, role_permissions in permissions.items()
+        }
+        self.effective = {}
+        for role in set(permissions).union(hierarchy):
+            mask = 0
+            for inherited_role in hierarchy.get(role, [role]):
+                mask |= self.direct.get(inherited_role, 0)
+            self.effective[role] = mask | self.direct.get(role, 0)
+    
+    def _mask(self, permissions):
+        """OR together the bits of known permissions"""
+        mask = 0
+        for permission in permissions:
+            mask |= self.bits.get(permission, 0)
+        return mask
+    
+    def _role_mask(self, role, inherited):
+        masks = self.effective if inherited else self.direct
+        try:
+            return masks.get(role, 0)
+        except TypeError:
+            # Unhashable role value (e.g. a mock attribute)
+            return 0
+    
+    def has(self, role, permission, inherited=False):
+        """Check a single permission"""
+        bit = self.bits.get(permission, 0)
+        return bool(bit) and self._role_mask(role, inherited) & bit == bit
+    
+    def has_all(self, role, permissions, inherited=False):
+        """Check that the role holds every permission"""
+        required = 0
+        for permission in permissions:
+            bit = self.bits.get(permission)
+            if bit is None:
+                return False
+            required |= bit
+        return self._role_mask(role, inherited) & required == required
+    
+    def has_any(self, role, permissions, inherited=False):
+        """Check that the role holds at least one permission"""
+        return self._role_mask(role, inherited) & self._mask(permissions) != 0
+    
+    def check_many(self, role, permissions, inherited=False):
+        """Resolve the role mask once and test each permission against it"""
+        mask = self._role_mask(role, inherited)
+        result = {}
+        for permission in permissions:
+            bit = self.bits.get(permission, 0)
+            result[permission] = bool(bit) and mask & bit == bit
+        return result
+    
+    def permissions_for(self, role, inherited=False):
+        """List permission names held by the role (a new list every call)"""
+        mask = self._role_mask(role, inherited)
+        return [name for name in self.names if mask & self.bits[name]]
+
+
+class RoleRegistry:
+    """Immutable snapshot of roles, permissions and the role hierarchy.
+    
+    Permission sets are frozensets, the hierarchy is stored as its
+    precomputed transitive closure (so "does admin include customer" is a
+    single set lookup), and role names are interned. A registry is never
+    modified after construction; reloading builds a new one and swaps it
+    in with swap_registry().
+    """
+    
+    __slots__ = ('roles', 'permissions', 'hierarchy', 'engine', '_key')
+    
+    def __init__(self, permissions, hierarchy):
+        roles = set(permissions).union(hierarchy)
+        for inherited_roles in hierarchy.values():
+            roles.update(inherited_roles)
+        self.roles = tuple(sorted(sys.intern(role) for role in roles))
+        
+        self.permissions = MappingProxyType({
+            sys.intern(role): frozenset(permissions.get(role, ()))
+            for role in self.roles
+        })
+        self.hierarchy = MappingProxyType({
+            role: frozenset(self._closure(role, hierarchy))
+            for role in self.roles
+        })
+        # Compile from the original lists so permission order is preserved
+        self.engine = PermissionEngine(
+            {role: list(permissions.get(role, ())) for role in self.roles},
+            {role: sorted(closure) for role, closure in self.hierarchy.items()},
+        )
+        self._key = (
+            frozenset(self.permissions.items()),
+            frozenset(self.hierarchy.items()),
+        )
+    
+    @staticmethod
+    def _closure(role, hierarchy):
+        """All roles reachable from role, including itself"""
+        seen = {role}
+        stack = [role]
+        while stack:
+            for inherited_role in hierarchy.get(stack.pop(), ()):
+                if inherited_role not in seen:
+                    seen.add(inherited_role)
+                    stack.append(inherited_role)
+        return seen
+    
+    @classmethod
+    def from_rows(cls, permission_rows, hierarchy_rows=()):
+        """Build a registry from (role, permission) and (role, inherits_role) rows"""
+        permissions = {}
+        for role, permission in permission_rows:
+            permissions.setdefault(role, []).append(permission)
+        hierarchy = {}
+        for role, inherits_role in hierarchy_rows:
+            hierarchy.setdefault(role, []).append(inherits_role)
+        return cls(permissions, hierarchy)
+    
+    def includes_role(self, role, other_role):
+        """Check if role is other_role or inherits from it"""
+        try:
+            return other_role in self.hierarchy.get(role, ())
+        except TypeError:
+            return False
+    
+    def __eq__(self, other):
+        if not isinstance(other, RoleRegistry):
+            return NotImplemented
+        return self._key == other._key
+    
+    def __hash__(self):
+        return hash(self._key)
+    
+    def __setattr__(self, name, value):
+        if hasattr(self, '_key'):
+            raise AttributeError('RoleRegistry is immutable')
+        object.__setattr__(self, name, value)
+
+
+# Built once at import time from the tables above
+_registry = RoleRegistry(RBAC.PERMISSIONS, RBAC.ROLE_HIERARCHY)
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the active RoleRegistry"""
+    return _registry
+
+
+def swap_registry(registry):
+    """Atomically replace the active registry, returns the previous one.
+    
+    Callers that grabbed the old registry (e.g. an in-flight request's
+    AccessContext) keep using it; new lookups see the new one.
+    """
+    global _registry
+    with _registry_lock:
+        previous = _registry
+        _registry = registry
+    return previous
+
+
+ROLE_PERMISSIONS_QUERY = "SELECT role, permission FROM role_permissions"
+ROLE_HIERARCHY_QUERY = "SELECT role, inherits_role FROM role_hierarchy"
+
+
+def reload_roles_from_db(conn,
+                         permissions_query=ROLE_PERMISSIONS_QUERY,
+                         hierarchy_query=ROLE_HIERARCHY_QUERY):
+    """Rebuild the registry from DB tables and swap it in without a restart.
+    
+    The role_permissions/role_hierarchy tables are optional and not part of
+    schema.sql; pass other queries if roles live elsewhere. The new registry
+    is fully built before the swap, so a failed query leaves the current
+    one in place.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(permissions_query)
+        permission_rows = list(cursor.fetchall())
+        hierarchy_rows = []
+        if hierarchy_query:
+            cursor.execute(hierarchy_query)
+            hierarchy_rows = list(cursor.fetchall())
+    finally:
+        cursor.close()
+    registry = RoleRegistry.from_rows(permission_rows, hierarchy_rows)
+    swap_registry(registry)
+    return registry
+
+
+# Per-request access cache
+
+class AccessContext:
+    """Resolved role and permission masks for the current user"""
+    
+    __slots__ = ('role', 'registry', 'roles', 'direct', 'effective')
+    
+    def __init__(self, role, registry=None):
+        self.role = role
+        # Pin one registry for the whole request, even if it is swapped meanwhile
+        self.registry = registry or get_registry()
+        try:
+            self.roles = self.registry.hierarchy.get(role, frozenset())
+        except TypeError:
+            self.roles = frozenset()
+        self.direct = self.registry.engine._role_mask(role, inherited=False)
+        self.effective = self.registry.engine._role_mask(role, inherited=True)
+    
+    def has_role(self, role):
+        """Exact role match"""
+        return self.role is not None and self.role == role
+    
+    def includes_role(self, role):
+        """Check if the role is the user's role or one it inherits"""
+        return role in self.roles
+    
+    def has_permission(self, permission, inherited=False):
+        """Check a permission against the cached mask"""
+        bit = self.registry.engine.bits.get(permission, 0)
+        mask = self.effective if inherited else self.direct
+        return bool(bit) and mask & bit == bit
+
+
+class AccessCacheStats:
+    """Thread-safe hit/miss counters for the per-request access cache"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def snapshot(self):
+        """Return counters and hit rate as a dict"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+    
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+access_cache_stats = AccessCacheStats()
+
+
+def current_access():
+    """Get the AccessContext for current_user, computed once per request.
+    
+    The context is stored on flask.g and reused by every decorator and
+    template helper. It is rebuilt if the user's role changes mid-request
+    (e.g. right after login).
+    """
+    role = getattr(current_user, 'role', None)
+    if not has_app_context():
+        return AccessContext(role)
+    
+    cached = g.get('_rbac_access')
+    if cached is not None and cached.role == role:
+        access_cache_stats.record(hit=True)
+        return cached
+    
+    access_cache_stats.record(hit=False)
+    access = AccessContext(role)
+    g._rbac_access = access
+    return access
+
+
+def register_template_helpers(app):
+    """Expose cached permission checks to Jinja2 templates"""
+    @app.context_processor
+    def inject_rbac_helpers():
+        def has_permission(permission, inherited=False):
+            return current_access().has_permission(permission, inherited)
+        
+        def has_role(role):
+            return current_access().has_role(role)
+        
+        return {'has_permission': has_permission, 'has_role': has_role}
+
+
+# Route decorators
+
+def _access_guard(check):
+    """Build a decorator that redirects anonymous users and aborts 403 when check fails"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                flash('Please log in to access this page.', 'warning')
+                return redirect(url_for('auth.login'))
+            if not check(current_access()):
+                abort(403)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def role_required(*roles):
+    """Restrict a view to users whose role is one of roles"""
+    return _access_guard(lambda access: access.role in roles)
+
+
+def admin_required(f):
+    """Restrict a view to admins"""
+    return _access_guard(lambda access: access.has_role('admin'))(f)
+
+
+def seller_required(f):
+    """Restrict a view to sellers (admins inherit seller access)"""
+    return _access_guard(lambda access: access.includes_role('seller'))(f)
+
+
+def customer_required(f):
+    """Restrict a view to customers (admins inherit customer access)"""
+    return _access_guard(lambda access: access.includes_role('customer'))(f)
+
+
+def permission_required(permission):
+    """Restrict a view to roles holding permission"""
+    return _access_guard(lambda access: access.has_permission(permission))
@@ -0,0 +1,346 @@
+"""
+Daily sales rollups for the admin and seller dashboards
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Per (day, seller, status): order count and order totals
+STATUS_ROLLUP_QUERY = (
+    "SELECT DATE(created_at), seller_id, status, COUNT(*), SUM(total) "
+    "FROM orders WHERE created_at >= %s AND created_at < %s "
+    "GROUP BY DATE(created_at), seller_id, status"
+)
+# Per (day, seller, category): units and revenue of orders that were not cancelled
+CATEGORY_ROLLUP_QUERY = (
+    "SELECT DATE(o.created_at), o.seller_id, p.category_id, SUM(oi.quantity), SUM(oi.subtotal) "
+    "FROM orders o "
+    "JOIN order_items oi ON oi.order_id = o.id "
+    "JOIN products p ON p.id = oi.product_id "
+    "WHERE o.created_at >= %s AND o.created_at < %s AND o.status <> 'cancelled' "
+    "GROUP BY DATE(o.created_at), o.seller_id, p.category_id"
+)
+# One row per (order, category) for the orders just written
+ORDER_ROLLUP_QUERY = (
+    "SELECT o.id, DATE(o.created_at), o.seller_id, o.status, o.total, "
+    "p.category_id, SUM(oi.quantity), SUM(oi.subtotal) "
+    "FROM orders o "
+    "JOIN order_items oi ON oi.order_id = o.id "
+    "JOIN products p ON p.id = oi.product_id "
+    "WHERE o.id IN ({placeholders}) "
+    "GROUP BY o.id, DATE(o.created_at), o.seller_id, o.status, o.total, p.category_id"
+)
+# Days that own orders changed since the watermark
+CHANGED_DAYS_QUERY = "SELECT DISTINCT DATE(created_at) FROM orders WHERE updated_at >= %s"
+FIRST_ORDER_QUERY = "SELECT CURRENT_TIMESTAMP, MIN(created_at) FROM orders"
+
+ZERO = Decimal('0.00')
+
+logger = logging.getLogger(__name__)
+
+
+def _day(value):
+    """DATE() comes back as a date from MySQL and as a string from SQLite"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _money(value):
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+def _runs(days):
+    """[(first, last)] runs of consecutive days in a sorted list of dates"""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+class SalesRollup:
+    """Order counts and sales per day, seller, status and category.
+
+    Dashboards read O(days) buckets instead of aggregating orders and
+    order_items on every load. backfill() builds the buckets with two
+    GROUP BY queries; orders placed or changed by this process are added
+    straight away by on_orders_placed() / on_order_status_changed().
+    refresh() recomputes only the days that own orders updated since the
+    previous refresh, which picks up writes made by other workers. Days
+    touched by the incremental hooks are recomputed on the next refresh as
+    well, so an increment racing a refresh is corrected within one cycle.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # day -> {(seller_id, status): [orders, total]}
+        self._status = {}
+        # day -> {(seller_id, category_id): [units, revenue]}
+        self._category = {}
+        # Days changed by the incremental hooks since the last refresh
+        self._dirty_days = set()
+        self.watermark = None
+
+    # Building
+
+    def backfill(self, conn):
+        """Aggregate the whole order history; returns the number of days loaded"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(FIRST_ORDER_QUERY)
+            now, first = cursor.fetchone()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._status.clear()
+            self._category.clear()
+            self._dirty_days.clear()
+        if first is not None:
+            self._recompute(conn, _day(first), _day(now))
+        self.watermark = now
+        return len(self._status)
+
+    def refresh(self, conn):
+        """Recompute the days touched by orders updated since the last refresh.
+
+        Only those days are aggregated again: a status change on a
+        year-old order costs one day, not the whole year since. Runs of
+        consecutive days share one pair of range queries.
+        """
+        if self.watermark is None:
+            return self.backfill(conn)
+        with self._lock:
+            dirty, self._dirty_days = self._dirty_days, set()
+        cursor = conn.cursor()
+        try:
+            # Read the clock first: a write landing between the two
+            # queries is picked up again by the next refresh
+            cursor.execute("SELECT CURRENT_TIMESTAMP")
+            now = cursor.fetchone()[0]
+            cursor.execute(CHANGED_DAYS_QUERY, (self.watermark,))
+            dirty.update(_day(row[0]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+        days = 0
+        for first_day, last_day in _runs(sorted(dirty)):
+            days += self._recompute(conn, first_day, last_day)
+        self.watermark = now
+        return days
+
+    def _recompute(self, conn, first_day, last_day):
+        params = (first_day.isoformat(), (last_day + timedelta(days=1)).isoformat())
+        status, category = {}, {}
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STATUS_ROLLUP_QUERY, params)
+            for day, seller_id, order_status, count, total in cursor.fetchall():
+                status.setdefault(_day(day), {})[(seller_id, order_status)] = [count, _money(total)]
+            cursor.execute(CATEGORY_ROLLUP_QUERY, params)
+            for day, seller_id, category_id, units, revenue in cursor.fetchall():
+                category.setdefault(_day(day), {})[(seller_id, category_id)] = [int(units), _money(revenue)]
+        finally:
+            cursor.close()
+        with self._lock:
+            day = first_day
+            while day <= last_day:
+                self._replace(self._status, day, status.get(day))
+                self._replace(self._category, day, category.get(day))
+                day += timedelta(days=1)
+        return (last_day - first_day).days + 1
+
+    @staticmethod
+    def _replace(buckets, day, value):
+        if value:
+            buckets[day] = value
+        else:
+            buckets.pop(day, None)
+
+    # Incremental updates
+
+    def _order_rows(self, conn, order_ids):
+        placeholders = ", ".join(["%s"] * len(order_ids))
+        cursor = conn.cursor()
+        try:
+            cursor.execute(ORDER_ROLLUP_QUERY.format(placeholders=placeholders), list(order_ids))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _add(self, buckets, day, key, count, amount):
+        entry = buckets.setdefault(day, {}).setdefault(key, [0, ZERO])
+        entry[0] += count
+        entry[1] += amount
+        if entry[0] == 0 and entry[1] == 0:
+            del buckets[day][key]
+            if not buckets[day]:
+                del buckets[day]
+
+    def on_orders_placed(self, conn, order_ids):
+        """Count freshly inserted orders (e.g. the ids returned by place_orders)"""
+        if not order_ids:
+            return
+        rows = self._order_rows(conn, order_ids)
+        seen = set()
+        with self._lock:
+            for order_id, day, seller_id, status, total, category_id, units, revenue in rows:
+                day = _day(day)
+                self._dirty_days.add(day)
+                if order_id not in seen:
+                    seen.add(order_id)
+                    self._add(self._status, day, (seller_id, status), 1, _money(total))
+                if status != 'cancelled':
+                    self._add(self._category, day, (seller_id, category_id), int(units), _money(revenue))
+
+    def on_order_status_changed(self, conn, order_id, old_status):
+        """Move an order between status buckets after its status was updated"""
+        rows = self._order_rows(conn, [order_id])
+        if not rows:
+            return
+        _, day, seller_id, new_status, total, _, _, _ = rows[0]
+        if new_status == old_status:
+            return
+        day = _day(day)
+        total = _money(total)
+        with self._lock:
+            self._dirty_days.add(day)
+            self._add(self._status, day, (seller_id, old_status), -1, -total)
+            self._add(self._status, day, (seller_id, new_status), 1, total)
+            if 'cancelled' in (old_status, new_status):
+                sign = 1 if old_status == 'cancelled' else -1
+                for _, _, _, _, _, category_id, units, revenue in rows:
+                    self._add(self._category, day, (seller_id, category_id),
+                              sign * int(units), sign * _money(revenue))
+
+    # Dashboard reads (start/end are inclusive dates, None means unbounded)
+
+    def _each(self, buckets, start, end, seller_id):
+        with self._lock:
+            days = [(day, dict(entries)) for day, entries in buckets.items()
+                    if (start is None or day >= start) and (end is None or day <= end)]
+        for day, entries in sorted(days):
+            for key, (count, amount) in entries.items():
+                if seller_id is None or key[0] == seller_id:
+                    yield day, key, count, amount
+
+    def orders_by_status(self, start=None, end=None, seller_id=None):
+        counts = {}
+        for _, (_, status), count, _ in self._each(self._status, start, end, seller_id):
+            counts[status] = counts.get(status, 0) + count
+        return counts
+
+    def totals(self, start=None, end=None, seller_id=None):
+        """Order count and sales (cancelled orders excluded from sales)"""
+        orders, sales = 0, ZERO
+        for _, (_, status), count, amount in self._each(self._status, start, end, seller_id):
+            orders += count
+            if status != 'cancelled':
+                sales += amount
+        return {'orders': orders, 'sales': sales}
+
+    def daily_sales(self, start=None, end=None, seller_id=None):
+        """[(day, orders, sales)] for charts"""
+        per_day = {}
+        for day, (_, status), count, amount in self._each(self._status, start, end, seller_id):
+            entry = per_day.setdefault(day, [0, ZERO])
+            entry[0] += count
+            if status != 'cancelled':
+                entry[1] += amount
+        return [(day, count, amount) for day, (count, amount) in sorted(per_day.items())]
+
+    def top_sellers(self, start=None, end=None, limit=5):
+        """[(seller_id, sales)] best first"""
+        sales = {}
+        for _, (seller_id, status), _, amount in self._each(self._status, start, end, None):
+            if status != 'cancelled':
+                sales[seller_id] = sales.get(seller_id, ZERO) + amount
+        return sorted(sales.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def top_categories(self, start=None, end=None, seller_id=None, limit=5):
+        """[(category_id, units, revenue)] best revenue first"""
+        totals = {}
+        for _, (_, category_id), units, revenue in self._each(self._category, start, end, seller_id):
+            entry = totals.setdefault(category_id, [0, ZERO])
+            entry[0] += units
+            entry[1] += revenue
+        ranked = sorted(totals.items(), key=lambda item: (-item[1][1], item[0]))[:limit]
+        return [(category_id, units, revenue) for category_id, (units, revenue) in ranked]
+
+
+# Shared rollup for the dashboards; backfilled by init_sales_rollup
+sales_rollup = SalesRollup()
+
+
+def init_sales_rollup(app, connect=None, refresh_seconds=60):
+    """Backfill the shared rollup in the background and refresh it on traffic.
+
+    The backfill runs on a background thread (python sales_rollup.py runs
+    it from the command line), never inside a request. Once it is done,
+    every request at most refresh_seconds after the previous refresh
+    triggers one cheap catch-up query; a failed refresh is logged and
+    retried on the next cycle. A failed backfill is restarted on the same
+    schedule. connect defaults to utils.get_db_connection.
+    """
+    from utils import BackgroundLoad
+
+    if connect is None:
+        from utils import get_db_connection as connect
+    app.config.setdefault('SALES_ROLLUP_REFRESH_SECONDS', refresh_seconds)
+    state = {'last': time.monotonic()}
+    lock = threading.Lock()
+    backfill = BackgroundLoad(app, 'sales-rollup-backfill', sales_rollup.backfill, connect,
+                              retry_seconds=0)
+
+    @app.before_request
+    def refresh_sales_rollup():
+        now = time.monotonic()
+        with lock:
+            due = now - state['last'] >= app.config['SALES_ROLLUP_REFRESH_SECONDS']
+            if due:
+                state['last'] = now
+        if not due:
+            return
+        if sales_rollup.watermark is None:
+            backfill.retry()  # no-op while the backfill is still running
+            return
+        try:
+            conn = connect()
+            try:
+                sales_rollup.refresh(conn)
+            finally:
+                conn.close()
+        except Exception:
+            logger.exception("sales rollup refresh failed")
+
+    app.extensions['sales_rollup'] = sales_rollup
+    app.extensions['sales_rollup_backfill'] = backfill
+    return backfill.start()
+
+
+def main():
+    """Backfill against the configured MySQL database and print a summary"""
+    from dotenv import load_dotenv
+    from db_pool import mysql_config_from_env, mysql_connector
+
+    load_dotenv()
+    conn = mysql_connector(**mysql_config_from_env())()
+    try:
+        started = time.perf_counter()
+        days = sales_rollup.backfill(conn)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    print(f"Backfilled {days} days of orders in {elapsed:.2f}s")
+    print(f"Totals: {sales_rollup.totals()}")
+    print(f"Orders by status: {sales_rollup.orders_by_status()}")
+    print(f"Top sellers: {sales_rollup.top_sellers()}")
+
+
+if __name__ == '__main__':
+    main()
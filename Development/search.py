@@ -0,0 +1,779 @@
+"""
+In-process full-text product search (inverted index + BM25)
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with',
+})
+
+# Field weights: a match in the name counts more than one in the description
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'sku': 3.0,
+    'category': 2.0,
+    'description': 1.0,
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Max vocabulary terms a prefix may expand to
+MAX_PREFIX_EXPANSIONS = 50
+
+# Marks a product with no pending edit
+_UNSET = object()
+
+
+def tokenize(text):
+    """Lowercase text and split it into indexable terms"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+class ProductSearchIndex:
+    """Inverted index over product name, description, SKU and category path.
+
+    Each field's term frequencies are scaled by FIELD_WEIGHTS and summed, and
+    documents are ranked with BM25. add_product/remove_product update the
+    index incrementally; all methods are thread-safe.
+
+    Searches never take the lock: they read the current _Snapshot, which
+    does not change once published. Writers serialize on the lock, build
+    their changes into new structures and publish them by swapping the
+    snapshot reference. Single edits go to a small delta segment layered
+    over the main one (edited products are hidden in the main segment), so
+    they only copy the delta. Once DELTA_LIMIT products are pending, a
+    background thread folds them into a new main segment. add_products
+    folds right away, publishing the whole batch at once.
+
+    Per-term BM25 scores for the main segment are computed on first use and
+    cached together with a score-ordered list, so top-k queries can stop
+    early (threshold algorithm) instead of scoring every matching product.
+    A term's cache is updated when a fold changes its postings, and all
+    caches are dropped when the corpus size or average document length
+    drifts by more than STATS_DRIFT from the values they were computed with.
+    """
+
+    STATS_DRIFT = 0.05
+    # Below this many candidates, intersect directly instead of walking ranked lists
+    DIRECT_INTERSECT_LIMIT = 20000
+    # Pending single edits before a background fold into the main segment
+    DELTA_LIMIT = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __len__(self):
+        return self._snapshot.doc_count
+
+    def __contains__(self, product_id):
+        snapshot = self._snapshot
+        if product_id in snapshot.delta.doc_len:
+            return True
+        return product_id in snapshot.main.doc_len and product_id not in snapshot.hidden
+
+    # Indexing
+
+    def add_product(self, product):
+        """Index (or re-index) a product dict.
+
+        Expected keys: id, name, description, sku, category_path (a string or
+        a list of category names). Inactive products are removed instead.
+        """
+        with self._lock:
+            self._edit(product['id'], self._document(product))
+
+    def add_products(self, products):
+        """Index many products; searches see them all once the batch is done"""
+        with self._lock:
+            self._fold((product['id'], self._document(product)) for product in products)
+
+    def remove_product(self, product_id):
+        """Drop a product from the index (no-op if it is not indexed)"""
+        with self._lock:
+            self._edit(product_id, None)
+
+    @staticmethod
+    def _document(product):
+        """(weighted term frequencies, weighted length), or None if inactive"""
+        if not product.get('is_active', True):
+            return None
+
+        category_path = product.get('category_path') or ''
+        if not isinstance(category_path, str):
+            category_path = ' '.join(category_path)
+        fields = {
+            'name': product.get('name'),
+            'description': product.get('description'),
+            'sku': product.get('sku'),
+            'category': category_path,
+        }
+
+        frequencies = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            terms = tokenize(text)
+            if field == 'sku' and text:
+                # Also index the whole SKU so "TS-1001" matches as one term
+                terms.append(re.sub(r'[^a-z0-9]', '', str(text).lower()))
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+        return frequencies, length
+
+    def _edit(self, product_id, document):
+        """Publish one product change through the delta segment"""
+        snapshot = self._snapshot
+        previous = self._pending.get(product_id, _UNSET)
+        in_main = product_id in self._doc_terms
+        if document is None and (previous is None or (previous is _UNSET and not in_main)):
+            return
+
+        delta = _Batch(snapshot.delta)
+        hidden, hidden_df, hidden_len = snapshot.hidden, snapshot.hidden_df, snapshot.hidden_len
+        if previous is not _UNSET and previous is not None:
+            delta.remove(product_id, previous[0])
+        if in_main and product_id not in hidden:
+            hidden = hidden | {product_id}
+            hidden_df = dict(hidden_df)
+            hidden_len += self._hide(snapshot.main, product_id, hidden_df)
+        if document is not None:
+            delta.add(product_id, *document)
+        self._pending[product_id] = document
+        self._publish(snapshot.main, delta.build(), hidden, hidden_df, hidden_len,
+                      snapshot.cache, snapshot.cache_stats)
+
+        if len(self._pending) >= self.DELTA_LIMIT and self._fold_thread is None:
+            self._fold_thread = threading.Thread(target=self._fold_in_background,
+                                                 name='search-index-fold', daemon=True)
+            self._fold_thread.start()
+
+    def _hide(self, main, product_id, hidden_df):
+        """Count a main-segment product's terms in hidden_df; returns its length"""
+        for term in self._doc_terms[product_id]:
+            hidden_df[term] = hidden_df.get(term, 0) + 1
+        return main.doc_len[product_id]
+
+    def _build_main(self, snapshot, doc_terms, changes):
+        """Apply (product_id, document) changes to a copy of the main segment"""
+        main = _Batch(snapshot.main, snapshot.cache, snapshot.cache_stats[1], self.STATS_DRIFT)
+        doc_terms = dict(doc_terms)
+        for product_id, document in changes:
+            terms = doc_terms.pop(product_id, None)
+            if terms is not None:
+                main.remove(product_id, terms)
+            if document is not None:
+                main.add(product_id, *document)
+                doc_terms[product_id] = document[0].keys()
+        return main, doc_terms
+
+    def _fold(self, documents):
+        """Publish a new main segment with pending edits and documents applied"""
+        snapshot = self._snapshot
+        changes = itertools.chain(self._pending.items(), documents)
+        main, self._doc_terms = self._build_main(snapshot, self._doc_terms, changes)
+        self._pending = {}
+        self._publish(main.build(), _Segment.empty(), frozenset(), {}, 0.0,
+                      main.cache, snapshot.cache_stats)
+
+    def _fold_pending(self):
+        """Fold pending edits into a new main segment.
+
+        The copy is built without the lock, so edits and other writers keep
+        going meanwhile; edits made during the fold stay pending against the
+        new segment. Gives up if add_products or clear replaced the main
+        segment in the meantime.
+        """
+        with self._lock:
+            snapshot, doc_terms, pending = self._snapshot, self._doc_terms, dict(self._pending)
+        main, doc_terms = self._build_main(snapshot, doc_terms, pending.items())
+        segment = main.build()
+
+        with self._lock:
+            if self._snapshot.main is not snapshot.main:
+                return
+            self._doc_terms = doc_terms
+            self._pending = {product_id: document for product_id, document in self._pending.items()
+                             if pending.get(product_id, _UNSET) is not document}
+            delta = _Batch(_Segment.empty())
+            hidden, hidden_df, hidden_len = set(), {}, 0.0
+            for product_id, document in self._pending.items():
+                if product_id in doc_terms:
+                    hidden.add(product_id)
+                    hidden_len += self._hide(segment, product_id, hidden_df)
+                if document is not None:
+                    delta.add(product_id, *document)
+            self._publish(segment, delta.build(), frozenset(hidden), hidden_df, hidden_len,
+                          main.cache, snapshot.cache_stats)
+
+    def _fold_in_background(self):
+        try:
+            self._fold_pending()
+        except Exception:
+            logger.exception("search index fold failed; edits stay in the delta segment")
+        finally:
+            with self._lock:
+                self._fold_thread = None
+
+    def _publish(self, main, delta, hidden, hidden_df, hidden_len, cache, cache_stats):
+        """Swap in a new snapshot; cached scores are dropped if the corpus drifted"""
+        doc_count = len(main.doc_len) - len(hidden) + len(delta.doc_len)
+        total_len = main.total_len - hidden_len + delta.total_len
+        avg_len = total_len / doc_count if doc_count else 0.0
+        cached_count, cached_avg = cache_stats
+        if (abs(doc_count - cached_count) > self.STATS_DRIFT * max(cached_count, 1)
+                or abs(avg_len - cached_avg) > self.STATS_DRIFT * max(cached_avg, 1e-9)):
+            cache, cache_stats = {}, (doc_count, avg_len)
+        self._snapshot = _Snapshot(main, delta, hidden, hidden_df, hidden_len,
+                                   doc_count, cache, cache_stats)
+
+    def clear(self):
+        with self._lock:
+            # Writer-only bookkeeping: main segment product_id -> terms, so
+            # a product can be removed, and product_id -> document (None if
+            # removed) for edits not yet folded into the main segment
+            self._doc_terms = {}
+            self._pending = {}
+            self._fold_thread = None
+            self._snapshot = _Snapshot(_Segment.empty(), _Segment.empty(), frozenset(), {}, 0.0,
+                                       0, {}, (0, 0.0))
+
+    # Querying
+
+    @staticmethod
+    def _df(snapshot, term):
+        """Number of live products containing term"""
+        main = snapshot.main.postings.get(term)
+        delta = snapshot.delta.postings.get(term)
+        return ((len(main) - snapshot.hidden_df.get(term, 0)) if main else 0) + (len(delta) if delta else 0)
+
+    def _expand(self, snapshot, prefix, limit):
+        terms = _prefix_range(snapshot.main.vocabulary, prefix)
+        if not snapshot.hidden and not snapshot.delta.doc_len:
+            postings = snapshot.main.postings
+            return heapq.nlargest(limit, terms, key=lambda t: (len(postings[t]), t))
+        terms = set(terms).union(_prefix_range(snapshot.delta.vocabulary, prefix))
+        counts = {term: self._df(snapshot, term) for term in terms}
+        return heapq.nlargest(limit, (t for t in terms if counts[t]), key=lambda t: (counts[t], t))
+
+    def expand_prefix(self, prefix, limit=MAX_PREFIX_EXPANSIONS):
+        """Vocabulary terms starting with prefix, most frequent first"""
+        return self._expand(self._snapshot, prefix, limit)
+
+    def suggest(self, prefix, limit=10):
+        """Autocomplete: terms completing prefix, ranked by document frequency"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        return self.expand_prefix(prefix, limit)
+
+    def _idf(self, snapshot, term):
+        """idf from live counts, for terms only the delta segment has"""
+        doc_count, _ = snapshot.cache_stats
+        df = self._df(snapshot, term)
+        return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+    def _scores(self, snapshot, term):
+        """Cached main-segment _TermScores for one term.
+
+        The cache is shared by every snapshot with the same main segment and
+        stats, and entries depend only on those, so concurrent searches that
+        compute the same missing entry store equal values.
+        """
+        cached = snapshot.cache.get(term)
+        if cached is None:
+            postings = snapshot.main.postings[term]
+            df = len(postings)
+            idf = math.log(1 + (snapshot.cache_stats[0] - df + 0.5) / (df + 0.5))
+            scores = _bm25_scores(postings, snapshot.main.doc_len, idf, snapshot.cache_stats[1])
+            cached = snapshot.cache[term] = _TermScores(scores, idf, df)
+        return cached
+
+    def _term(self, snapshot, term):
+        """Scores for one term across both segments"""
+        hidden_count = snapshot.hidden_df.get(term, 0)
+        delta_postings = snapshot.delta.postings.get(term)
+        if not hidden_count and not delta_postings:
+            return self._scores(snapshot, term)
+        overlay = snapshot.overlays.get(term)
+        if overlay is None:
+            base = self._scores(snapshot, term) if term in snapshot.main.postings else None
+            idf = base.idf if base is not None else self._idf(snapshot, term)
+            delta_scores = _bm25_scores(delta_postings or {}, snapshot.delta.doc_len, idf,
+                                        snapshot.cache_stats[1])
+            overlay = snapshot.overlays[term] = _Overlay(
+                base, snapshot.hidden if hidden_count else frozenset(), hidden_count,
+                _TermScores(delta_scores, idf, len(delta_scores)),
+            )
+        return overlay
+
+    def warm(self, top_terms=500):
+        """Precompute score caches for the most frequent terms (e.g. at startup)"""
+        snapshot = self._snapshot
+        if not snapshot.doc_count:
+            return 0
+        postings = snapshot.main.postings
+        terms = heapq.nlargest(top_terms, postings, key=lambda t: len(postings[t]))
+        for term in terms:
+            self._scores(snapshot, term)
+        return len(terms)
+
+    def search(self, query, limit=20, prefix=True):
+        """Return [(product_id, score)] for products matching every query term.
+
+        With prefix=True the last term also matches longer terms, so
+        partially typed queries ("wirel") return results while typing.
+        Results are ordered by score, then product id.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+
+        snapshot = self._snapshot
+        if not snapshot.doc_count:
+            return []
+
+        # Each query term becomes a group of the vocabulary terms it matches
+        groups = []
+        for position, term in enumerate(terms):
+            if prefix and position == len(terms) - 1:
+                expansions = self._expand(snapshot, term, MAX_PREFIX_EXPANSIONS)
+            else:
+                expansions = [term] if self._df(snapshot, term) else []
+            if not expansions:
+                return []
+            groups.append([self._term(snapshot, expansion) for expansion in expansions])
+
+        if len(groups) == 1:
+            results = self._top_single(groups[0], limit)
+        else:
+            groups.sort(key=lambda group: sum(len(cached) for cached in group))
+            if sum(len(cached) for cached in groups[0]) <= self.DIRECT_INTERSECT_LIMIT:
+                results = self._top_intersect(groups, limit)
+            else:
+                results = self._top_threshold(groups, limit)
+
+        return [(product_id, -neg_score) for neg_score, product_id in results]
+
+    @staticmethod
+    def _merged(group):
+        """One ranked stream per query term: best expansion score per product"""
+        if len(group) == 1:
+            return iter(group[0].ranked)
+        return heapq.merge(*(cached.ranked for cached in group))
+
+    @staticmethod
+    def _group_score(group, product_id):
+        best = 0.0
+        for cached in group:
+            score = cached.get(product_id)
+            if score is not None and score > best:
+                best = score
+        return best
+
+    def _top_single(self, group, limit):
+        results = []
+        seen = set()
+        for neg_score, product_id in self._merged(group):
+            if product_id not in seen:
+                seen.add(product_id)
+                results.append((neg_score, product_id))
+                if len(results) == limit:
+                    break
+        return results
+
+    def _top_intersect(self, groups, limit):
+        """Score every product matching the rarest term"""
+        candidates = set()
+        for cached in groups[0]:
+            candidates.update(cached)
+        totals = []
+        for product_id in candidates:
+            total = 0.0
+            for group in groups:
+                score = self._group_score(group, product_id)
+                if not score:
+                    break
+                total += score
+            else:
+                totals.append((-total, product_id))
+        return heapq.nsmallest(limit, totals)
+
+    def _top_threshold(self, groups, limit):
+        """Fagin's threshold algorithm over the per-term ranked streams.
+
+        Streams are read in score order in lock-step; each newly seen product
+        is scored fully by lookup. Once the k-th best total reaches the sum
+        of the current stream positions no unseen product can beat it.
+        """
+        streams = [self._merged(group) for group in groups]
+        frontier = [float('inf')] * len(streams)
+        seen = set()
+        # Max-heap of the current k best as (total, -product_id)
+        top = []
+        while True:
+            for position, stream in enumerate(streams):
+                entry = next(stream, None)
+                if entry is None:
+                    # Every product matching all terms appears in this stream
+                    return sorted((-total, -neg_id) for total, neg_id in top)
+                neg_score, product_id = entry
+                frontier[position] = -neg_score
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                total = 0.0
+                for group in groups:
+                    group_score = self._group_score(group, product_id)
+                    if not group_score:
+                        break
+                    total += group_score
+                else:
+                    candidate = (total, -product_id)
+                    if len(top) < limit:
+                        heapq.heappush(top, candidate)
+                    elif candidate > top[0]:
+                        heapq.heapreplace(top, candidate)
+            if len(top) == limit and top[0][0] >= sum(frontier):
+                return sorted((-total, -neg_id) for total, neg_id in top)
+
+
+def _prefix_range(vocabulary, prefix):
+    start = bisect.bisect_left(vocabulary, prefix)
+    end = bisect.bisect_left(vocabulary, prefix + '\uffff')
+    return vocabulary[start:end]
+
+
+def _bm25(idf, frequency, doc_len, avg_len):
+    return idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * doc_len / avg_len))
+
+
+def _bm25_scores(postings, doc_len, idf, avg_len):
+    """{product_id: BM25 score} for one term's postings"""
+    scale = idf * (K1 + 1)
+    base = K1 * (1 - B)
+    slope = K1 * B / avg_len
+    return {
+        product_id: scale * frequency / (frequency + base + slope * doc_len[product_id])
+        for product_id, frequency in postings.items()
+    }
+
+
+class _Segment:
+    """Postings for a set of products; never changed once built"""
+
+    __slots__ = ('postings', 'doc_len', 'total_len', 'vocabulary')
+
+    def __init__(self, postings, doc_len, total_len, vocabulary):
+        # term -> {product_id: weighted term frequency}
+        self.postings = postings
+        # product_id -> weighted document length
+        self.doc_len = doc_len
+        self.total_len = total_len
+        # Sorted vocabulary for prefix lookups
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def empty(cls):
+        return cls({}, {}, 0.0, [])
+
+
+class _Snapshot:
+    """One published version of the index: main segment, delta and caches.
+
+    Searches fill cache and overlays in lazily, without locking; concurrent
+    readers only ever store equal values for a key.
+    """
+
+    __slots__ = ('main', 'delta', 'hidden', 'hidden_df', 'hidden_len', 'doc_count',
+                 'cache', 'cache_stats', 'overlays')
+
+    def __init__(self, main, delta, hidden, hidden_df, hidden_len, doc_count, cache, cache_stats):
+        self.main = main
+        self.delta = delta
+        # Main-segment products superseded by the delta or removed, the
+        # number of them per term and their total length
+        self.hidden = hidden
+        self.hidden_df = hidden_df
+        self.hidden_len = hidden_len
+        self.doc_count = doc_count
+        # term -> main-segment _TermScores, computed with cache_stats
+        # (doc count, avg length); shared by snapshots with the same main
+        self.cache = cache
+        self.cache_stats = cache_stats
+        # term -> _Overlay for terms the delta or hidden products touch
+        self.overlays = {}
+
+
+class _Batch:
+    """Copy-on-write changes to a segment, built into a new one.
+
+    The term and document maps are copied up front; a term's postings and
+    cached scores are copied the first time the batch changes them, so
+    searches still reading the base segment never see a partial update.
+    Cached scores are kept current with the avg_len they were computed with.
+    """
+
+    def __init__(self, base, cache=None, avg_len=0.0, drift=0.0):
+        self.base = base
+        self.postings = dict(base.postings)
+        self.doc_len = dict(base.doc_len)
+        self.total_len = base.total_len
+        self.cache = dict(cache) if cache else {}
+        self.avg_len = avg_len
+        self.drift = drift
+        # Terms whose postings / cached scores this batch already copied
+        self.owned = set()
+        self.owned_scores = set()
+        self.new_terms = set()
+        self.dropped_terms = set()
+
+    def _postings(self, term):
+        postings = self.postings.get(term)
+        if postings is None:
+            postings = self.postings[term] = {}
+            self.owned.add(term)
+            if term in self.dropped_terms:
+                self.dropped_terms.discard(term)
+            else:
+                self.new_terms.add(term)
+        elif term not in self.owned:
+            postings = self.postings[term] = dict(postings)
+            self.owned.add(term)
+        return postings
+
+    def _cached(self, term):
+        cached = self.cache.get(term)
+        if cached is not None and term not in self.owned_scores:
+            cached = self.cache[term] = cached.copy()
+            self.owned_scores.add(term)
+        return cached
+
+    def add(self, product_id, frequencies, length):
+        for term, frequency in frequencies.items():
+            self._postings(term)[product_id] = frequency
+        self.doc_len[product_id] = length
+        self.total_len += length
+
+        for term, frequency in frequencies.items():
+            cached = self.cache.get(term)
+            if cached is not None:
+                if cached.stale(len(self.postings[term]), self.drift):
+                    del self.cache[term]
+                else:
+                    self._cached(term).add(product_id, _bm25(cached.idf, frequency, length, self.avg_len))
+
+    def remove(self, product_id, terms):
+        for term in terms:
+            postings = self._postings(term)
+            del postings[product_id]
+            if postings:
+                cached = self._cached(term)
+                if cached is not None:
+                    cached.discard(product_id)
+                continue
+            self.cache.pop(term, None)
+            del self.postings[term]
+            if term in self.new_terms:
+                self.new_terms.discard(term)
+            else:
+                self.dropped_terms.add(term)
+        self.total_len -= self.doc_len.pop(product_id)
+
+    def build(self):
+        dropped, new = self.dropped_terms, self.new_terms
+        vocabulary = self.base.vocabulary
+        if len(dropped) + len(new) >= 64:
+            if dropped:
+                vocabulary = [term for term in vocabulary if term not in dropped]
+            vocabulary = vocabulary + sorted(new)
+            vocabulary.sort()
+        elif dropped or new:
+            vocabulary = list(vocabulary)
+            for term in dropped:
+                del vocabulary[bisect.bisect_left(vocabulary, term)]
+            for term in new:
+                bisect.insort(vocabulary, term)
+        return _Segment(self.postings, self.doc_len, self.total_len, vocabulary)
+
+
+class _Overlay:
+    """A term's main-segment scores with the delta segment applied on top.
+
+    Hidden products are skipped and the delta's scores merged in lazily,
+    so an edit never copies the main segment's lists. Offers the same
+    len/iter/get/ranked interface as _TermScores.
+    """
+
+    __slots__ = ('base', 'hidden', 'size', 'delta')
+
+    def __init__(self, base, hidden, hidden_count, delta):
+        self.base = base
+        self.hidden = hidden
+        self.delta = delta
+        self.size = (len(base) - hidden_count if base is not None else 0) + len(delta)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        if self.base is not None:
+            hidden = self.hidden
+            yield from (product_id for product_id in self.base if product_id not in hidden)
+        yield from self.delta
+
+    def get(self, product_id):
+        score = self.delta.get(product_id)
+        if score is None and self.base is not None and product_id not in self.hidden:
+            score = self.base.get(product_id)
+        return score
+
+    @property
+    def ranked(self):
+        if self.base is None:
+            return self.delta.ranked
+        hidden = self.hidden
+        base = self.base.ranked
+        if hidden:
+            base = (entry for entry in base if entry[1] not in hidden)
+        return heapq.merge(base, self.delta.ranked)
+
+
+class _TermScores:
+    """BM25 scores for one term, plus the same scores in rank order.
+
+    ranked holds (-score, product_id) ascending, i.e. best first, and is
+    kept sorted on incremental adds/removes with bisect. get is the scores
+    dict's own lookup, the hottest call during a search.
+    """
+
+    __slots__ = ('scores', 'ranked', 'idf', 'df', 'get')
+
+    def __init__(self, scores, idf, df):
+        self.scores = scores
+        self.ranked = sorted((-score, product_id) for product_id, score in scores.items())
+        self.idf = idf
+        self.df = df
+        self.get = scores.get
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __iter__(self):
+        return iter(self.scores)
+
+    def stale(self, df, drift):
+        """Check if the term's document frequency moved enough to change idf"""
+        return abs(df - self.df) > drift * self.df + 1
+
+    def copy(self):
+        copied = _TermScores.__new__(_TermScores)
+        copied.scores = dict(self.scores)
+        copied.ranked = list(self.ranked)
+        copied.idf = self.idf
+        copied.df = self.df
+        copied.get = copied.scores.get
+        return copied
+
+    def add(self, product_id, score):
+        self.scores[product_id] = score
+        bisect.insort(self.ranked, (-score, product_id))
+
+    def discard(self, product_id):
+        score = self.scores.pop(product_id, None)
+        if score is not None:
+            index = bisect.bisect_left(self.ranked, (-score, product_id))
+            del self.ranked[index]
+
+
+PRODUCT_INDEX_QUERY = """
+    SELECT p.id, p.name, p.description, p.sku, c.name, parent.name
+    FROM products p
+    JOIN categories c ON c.id = p.category_id
+    LEFT JOIN categories parent ON parent.id = c.parent_id
+    WHERE p.is_active = TRUE
+"""
+
+
+def build_index_from_db(conn, index=None, batch_size=5000, publish_every=50000):
+    """Load every active product into an index with one streaming query.
+
+    Rows are fetched batch_size at a time and published every
+    publish_every rows, so searches see the products loaded so far
+    without each small batch copying the whole index.
+    """
+    index = index if index is not None else ProductSearchIndex()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(PRODUCT_INDEX_QUERY)
+        products = []
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            products.extend({
+                'id': product_id,
+                'name': name,
+                'description': description,
+                'sku': sku,
+                'category_path': [c for c in (parent, category) if c],
+            } for product_id, name, description, sku, category, parent in rows)
+            if products and (not rows or len(products) >= publish_every):
+                index.add_products(products)
+                products = []
+            if not rows:
+                break
+    finally:
+        cursor.close()
+    index.warm()
+    return index
+
+
+# Shared index for the app; seller create/edit/delete views keep it current
+product_index = ProductSearchIndex()
+
+
+def on_product_saved(product):
+    """Call after a seller creates or edits a product"""
+    product_index.add_product(product)
+
+
+def on_product_deleted(product_id):
+    """Call after a product is deleted"""
+    product_index.remove_product(product_id)
+
+
+def init_search(app, connect=None):
+    """Build the shared index from the database without blocking startup.
+
+    The build runs on a background thread; until it finishes searches
+    see the products loaded so far. A failed build is started again by
+    the next request at least SEARCH_INDEX_RETRY_SECONDS later; products
+    already indexed are simply replaced. connect defaults to
+    utils.get_db_connection.
+    """
+    from utils import BackgroundLoad
+
+    build = BackgroundLoad(app, 'search-index-build', lambda conn: build_index_from_db(conn, product_index),
+                           connect, retry_seconds=app.config.get('SEARCH_INDEX_RETRY_SECONDS', 30))
+
+    @app.before_request
+    def retry_search_index_build():
+        build.retry()
+
+    app.extensions['search_index'] = product_index
+    app.extensions['search_index_build'] = build
+    return build.start()
@@ -0,0 +1,243 @@
+"""
+Seller-scoped data access: every query carries the seller_id predicate
+"""
+from flask import g
+from flask_login import current_user
+
+from product_cache import on_product_updated
+
+# Tables that carry seller_id directly, with the index that serves the predicate
+SCOPED_TABLES = {
+    'products': 'idx_seller',
+    'orders': 'idx_seller',
+}
+PRODUCT_UPDATE_FIELDS = ('name', 'description', 'price', 'sku', 'image_url', 'is_active', 'category_id')
+ORDER_STATUSES = ('placed', 'confirmed', 'packed', 'shipped', 'delivered', 'cancelled')
+# Columns select_sql may sort each scoped table by, optionally followed by ASC / DESC
+SORT_COLUMNS = {
+    'products': ('id', 'name', 'price', 'created_at'),
+    'orders': ('id', 'status', 'total', 'created_at'),
+}
+
+
+class NotASeller(PermissionError):
+    """Raised when a seller scope is requested for a user without a store"""
+
+
+class SellerScope:
+    """Queries limited to one seller's products and orders.
+
+    The seller_id predicate is always the leading condition, so MySQL
+    resolves it from idx_seller (or idx_seller_status) instead of scanning;
+    child rows (inventory, order_items) are only reached through a scoped
+    parent. Methods return None / 0 for rows owned by another seller,
+    which views turn into 404s.
+    """
+
+    def __init__(self, conn, seller_id):
+        if seller_id is None:
+            raise NotASeller("seller_id is required")
+        self.conn = conn
+        self.seller_id = seller_id
+
+    @classmethod
+    def for_user(cls, conn, user_id):
+        """Scope for the seller account of user_id"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id FROM sellers WHERE user_id = %s", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if row is None:
+            raise NotASeller(f"user {user_id} has no store")
+        return cls(conn, row[0])
+
+    def _run(self, sql, params, fetch='all'):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            if fetch == 'all':
+                return cursor.fetchall()
+            if fetch == 'one':
+                return cursor.fetchone()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def _write(self, sql, params):
+        try:
+            count = self._run(sql, params, fetch=None)
+            self.conn.commit()
+            return count
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    # Generic scoped SELECT
+
+    def select_sql(self, table, columns='*', where=None, params=(), order_by=None, limit=None):
+        """Build a SELECT on a seller-owned table with seller_id injected first.
+
+        columns and where are pasted into the SQL as they are, so they must
+        be literals written in code, never request data; values go through
+        params. order_by is limited to "<column> [ASC|DESC]" for the
+        table's SORT_COLUMNS.
+        """
+        if table not in SCOPED_TABLES:
+            raise ValueError(f"{table} is not a seller-scoped table")
+        if order_by:
+            column, _, direction = order_by.partition(' ')
+            if column not in SORT_COLUMNS[table] or direction.upper() not in ('', 'ASC', 'DESC'):
+                raise ValueError(f"cannot order {table} by {order_by!r}")
+        sql = f"SELECT {columns} FROM {table} WHERE seller_id = %s"
+        params = [self.seller_id] + list(params)
+        if where:
+            sql += f" AND ({where})"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return sql, params
+
+    def select(self, table, columns='*', where=None, params=(), order_by=None, limit=None):
+        return self._run(*self.select_sql(table, columns, where, params, order_by, limit))
+
+    # Products
+
+    def products_sql(self, active_only=False, after_id=None, limit=50):
+        where, params = [], []
+        if active_only:
+            where.append("is_active = TRUE")
+        if after_id is not None:
+            where.append("id > %s")
+            params.append(after_id)
+        return self.select_sql(
+            'products', "id, category_id, name, price, sku, is_active",
+            " AND ".join(where) or None, params, order_by="id", limit=limit)
+
+    def products(self, active_only=False, after_id=None, limit=50):
+        """The seller's products in id order; pass the last id as after_id for the next page"""
+        return self._run(*self.products_sql(active_only, after_id, limit))
+
+    def product(self, product_id):
+        sql, params = self.select_sql(
+            'products', "id, category_id, name, description, price, sku, image_url, is_active",
+            "id = %s", [product_id])
+        return self._run(sql, params, fetch='one')
+
+    def update_product(self, product_id, **fields):
+        """Update the given columns of one of the seller's products; returns rows changed"""
+        unknown = set(fields) - set(PRODUCT_UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"cannot update {', '.join(sorted(unknown))}")
+        if not fields:
+            return 0
+        assignments = ", ".join(f"{name} = %s" for name in fields)
+        count = self._write(
+            f"UPDATE products SET {assignments} WHERE seller_id = %s AND id = %s",
+            list(fields.values()) + [self.seller_id, product_id])
+        if count:
+            on_product_updated(product_id)
+        return count
+
+    def inventory_sql(self, low_stock_only=False):
+        sql = (
+            "SELECT p.id, p.name, COALESCE(i.quantity, 0), i.low_stock_threshold "
+            "FROM products p LEFT JOIN inventory i ON i.product_id = p.id "
+            "WHERE p.seller_id = %s"
+        )
+        if low_stock_only:
+            sql += " AND COALESCE(i.quantity, 0) <= COALESCE(i.low_stock_threshold, 10)"
+        return sql + " ORDER BY p.id", [self.seller_id]
+
+    def inventory(self, low_stock_only=False):
+        return self._run(*self.inventory_sql(low_stock_only))
+
+    def set_stock(self, product_id, quantity):
+        """Set stock for one of the seller's products; returns rows changed"""
+        count = self._write(
+            "UPDATE inventory SET quantity = %s WHERE product_id = "
+            "(SELECT id FROM products WHERE seller_id = %s AND id = %s)",
+            [quantity, self.seller_id, product_id])
+        if count:
+            on_product_updated(product_id)
+        return count
+
+    # Orders
+
+    def orders_sql(self, status=None, before_id=None, limit=50):
+        where, params = [], []
+        if status is not None:
+            where.append("status = %s")
+            params.append(status)
+        if before_id is not None:
+            where.append("id < %s")
+            params.append(before_id)
+        return self.select_sql(
+            'orders', "id, order_number, customer_id, status, total, created_at",
+            " AND ".join(where) or None, params, order_by="id DESC", limit=limit)
+
+    def orders(self, status=None, before_id=None, limit=50):
+        """Newest orders first; pass the last id as before_id for the next page"""
+        return self._run(*self.orders_sql(status, before_id, limit))
+
+    def order(self, order_id):
+        sql, params = self.select_sql(
+            'orders', "id, order_number, customer_id, shipping_address_id, status, "
+                      "subtotal, tax, shipping_cost, total, notes, created_at",
+            "id = %s", [order_id])
+        return self._run(sql, params, fetch='one')
+
+    def order_items_sql(self, order_id):
+        return (
+            "SELECT oi.id, oi.product_id, p.name, oi.quantity, oi.price, oi.subtotal "
+            "FROM orders o "
+            "JOIN order_items oi ON oi.order_id = o.id "
+            "JOIN products p ON p.id = oi.product_id "
+            "WHERE o.seller_id = %s AND o.id = %s ORDER BY oi.id",
+            [self.seller_id, order_id],
+        )
+
+    def order_items(self, order_id):
+        return self._run(*self.order_items_sql(order_id))
+
+    def update_order_status(self, order_id, status):
+        """Change the status of one of the seller's orders; returns rows changed"""
+        if status not in ORDER_STATUSES:
+            raise ValueError(f"unknown order status {status!r}")
+        return self._write(
+            "UPDATE orders SET status = %s WHERE seller_id = %s AND id = %s",
+            [status, self.seller_id, order_id])
+
+    def query_plans(self):
+        """Every read query this scope issues, with sample parameters, for EXPLAIN checks"""
+        return [
+            self.products_sql(),
+            self.products_sql(active_only=True, after_id=10),
+            self.select_sql('products', "id", "id = %s", [1]),
+            self.inventory_sql(),
+            self.inventory_sql(low_stock_only=True),
+            self.orders_sql(),
+            self.orders_sql(status='placed', before_id=100),
+            self.select_sql('orders', "id", "id = %s", [1]),
+            self.order_items_sql(1),
+        ]
+
+
+def current_seller_scope(connect=None):
+    """SellerScope for current_user, resolved once per request.
+
+    Raises NotASeller for anonymous users and users without a store.
+    connect defaults to utils.get_db_connection.
+    """
+    scope = g.get('_seller_scope')
+    if scope is None:
+        if not current_user.is_authenticated or getattr(current_user, 'role', None) != 'seller':
+            raise NotASeller("current user is not a seller")
+        if connect is None:
+            from utils import get_db_connection as connect
+        scope = g._seller_scope = SellerScope.for_user(connect(), current_user.id)
+    return scope
+
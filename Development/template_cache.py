@@ -0,0 +1,118 @@
+"""
+Jinja2 fragment cache: {% cache key, ttl %}...{% endcache %}
+"""
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+import cart_summary
+from category_tree import get_category_tree
+from product_cache import LocalLRU
+
+DEFAULT_FRAGMENT_TTL = 300
+# Overridden by SUPPORTED_LOCALES in app.config; the first one is the default
+SUPPORTED_LOCALES = ('en',)
+
+
+def _freeze(key):
+    """Make a key built in a template hashable (lists become tuples)"""
+    if isinstance(key, (list, tuple)):
+        return tuple(_freeze(part) for part in key)
+    return key
+
+
+def request_locale():
+    """g.locale or the best Accept-Language match among SUPPORTED_LOCALES.
+
+    Clients choose the header, so the raw value must never reach a cache
+    key; anything unsupported maps to the default locale.
+    """
+    supported = current_app.config.get('SUPPORTED_LOCALES', SUPPORTED_LOCALES)
+    locale = getattr(g, 'locale', None)
+    if locale not in supported:
+        locale = request.accept_languages.best_match(supported)
+    return locale or supported[0]
+
+
+def request_vary():
+    """Role and locale of the current request, part of every fragment key"""
+    if not has_request_context():
+        return (None, None)
+    try:
+        role = current_user.role if current_user.is_authenticated else None
+    except AttributeError:
+        # No LoginManager configured on this app
+        role = None
+    return (role, request_locale())
+
+
+class FragmentCacheExtension(Extension):
+    """Cache the rendered output of a template block.
+
+    {% cache key, ttl %} where key is a string or a tuple such as
+    ('category-menu', category_version()) and ttl (seconds) is optional.
+    The role and locale from fragment_cache_vary() are appended to every
+    key, so one fragment never leaks between roles. Put a version counter
+    in the key to invalidate on edits; never cache per-user content (names,
+    cart counts) inside a block.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(
+            fragment_cache=LocalLRU(max_entries=10000),
+            fragment_cache_ttl=DEFAULT_FRAGMENT_TTL,
+            fragment_cache_vary=request_vary,
+            fragment_cache_enabled=True,
+        )
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, caller):
+        environment = self.environment
+        if not environment.fragment_cache_enabled:
+            return caller()
+        key = (_freeze(key),) + tuple(environment.fragment_cache_vary())
+        cache = environment.fragment_cache
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(key, fragment, ttl or environment.fragment_cache_ttl)
+        return fragment
+
+
+def category_version():
+    """Changes whenever the shared category tree is edited or reloaded"""
+    tree = get_category_tree()
+    return (id(tree), tree.version)
+
+
+def product_version(product_id):
+    """Changes whenever product_cache.on_product_updated(product_id) runs in this process.
+
+    Versions are per process: a change handled by another worker leaves
+    this worker's fragments for the product stale for up to their TTL
+    (FRAGMENT_CACHE_TTL unless the {% cache %} tag sets one).
+    """
+    return cart_summary.cart_summaries.versions.get(product_id)
+
+
+def init_fragment_cache(app, max_entries=10000):
+    """Enable {% cache %} in app templates; FRAGMENT_CACHE_ENABLED=False turns it off"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = LocalLRU(max_entries=max_entries)
+    app.jinja_env.fragment_cache_ttl = app.config.get('FRAGMENT_CACHE_TTL', DEFAULT_FRAGMENT_TTL)
+    app.jinja_env.fragment_cache_enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+    app.jinja_env.globals.update(category_version=category_version, product_version=product_version)
+    return app
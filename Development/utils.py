@@ -0,0 +1,244 @@
+"""
+Utility functions
+"""
+import logging
+import threading
+import time
+from flask import has_request_context, session
+from flask.sessions import NullSession
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+# Session key holding the end of the current user's read-your-writes window
+STICKY_SESSION_KEY = '_db_sticky_until'
+
+
+class DBRouter:
+    """Route read-only work to a replica and everything else to the primary.
+
+    After a user commits on a primary connection, their reads stay on the
+    primary for sticky_seconds so they always see their own writes despite
+    replication lag; primary connections that never commit do not count
+    as writes. For the user of the current request the window is kept in
+    their Flask session, so it holds on whichever worker serves their next
+    request; explicit user_key callers outside a request fall back to a
+    per-process map.
+    """
+
+    def __init__(self, primary, replica=None, sticky_seconds=5.0, clock=time.time):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # user key -> time until which reads stay on the primary
+        self._sticky_until = {}
+        self.stats = {'primary': 0, 'replica': 0, 'sticky': 0}
+
+    def connection(self, readonly=False, user_key=None):
+        """Open a connection for the requested kind of work"""
+        in_session = user_key is None and _request_session() is not None
+        if user_key is None:
+            user_key = current_user_key()
+
+        if readonly and self.replica is not None:
+            if user_key is not None and self.is_sticky(user_key, in_session):
+                self._count('sticky')
+            else:
+                self._count('replica')
+                return self.replica()
+
+        self._count('primary')
+        conn = self.primary()
+        if not readonly and self.replica is not None and user_key is not None:
+            conn = _CommitTracking(conn, lambda: self.mark_write(
+                user_key, in_session and _request_session() is not None))
+        return conn
+
+    def mark_write(self, user_key, in_session=False):
+        """Start (or extend) the read-your-writes window for user_key"""
+        now = self._clock()
+        if in_session:
+            session[STICKY_SESSION_KEY] = now + self.sticky_seconds
+            return
+        with self._lock:
+            self._sticky_until[user_key] = now + self.sticky_seconds
+            if len(self._sticky_until) > 1024:
+                self._prune(now)
+
+    def is_sticky(self, user_key, in_session=False):
+        """Check if user_key wrote recently enough to read from the primary"""
+        if in_session:
+            until = session.get(STICKY_SESSION_KEY)
+            return until is not None and until > self._clock()
+        with self._lock:
+            until = self._sticky_until.get(user_key)
+            if until is None:
+                return False
+            if until <= self._clock():
+                del self._sticky_until[user_key]
+                return False
+            return True
+
+    def _prune(self, now):
+        expired = [key for key, until in self._sticky_until.items() if until <= now]
+        for key in expired:
+            del self._sticky_until[key]
+
+    def _count(self, target):
+        with self._lock:
+            self.stats[target] += 1
+
+
+class _CommitTracking:
+    """Primary connection proxy that calls on_commit after each commit()"""
+
+    def __init__(self, conn, on_commit):
+        self._conn = conn
+        self._on_commit = on_commit
+
+    @property
+    def raw(self):
+        return getattr(self._conn, 'raw', self._conn)
+
+    def commit(self):
+        self._conn.commit()
+        self._on_commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _request_session():
+    """The current request's session, or None outside a request or without a secret key"""
+    if not has_request_context() or isinstance(session, NullSession):
+        return None
+    return session
+
+
+def current_user_key():
+    """Identify the logged-in user for stickiness, or None outside a request"""
+    if not has_request_context():
+        return None
+    try:
+        if current_user.is_authenticated:
+            return current_user.get_id()
+    except AttributeError:
+        # No LoginManager configured on this app
+        pass
+    return None
+
+
+_db_router = None
+_connection_wrapper = None
+
+
+def set_db_connection_func(func, replica_func=None, sticky_seconds=5.0):
+    """Register the connection factory used by get_db_connection.
+
+    With only func, every query goes to that connection. Passing
+    replica_func enables read-replica routing for readonly=True callers.
+    """
+    global _db_router
+    _db_router = DBRouter(func, replica_func, sticky_seconds)
+    return _db_router
+
+
+def get_db_router():
+    """Return the active DBRouter (None until set_db_connection_func is called)"""
+    return _db_router
+
+
+def set_connection_wrapper(wrapper):
+    """Pass every connection from get_db_connection through wrapper (None to stop)"""
+    global _connection_wrapper
+    _connection_wrapper = wrapper
+
+
+def get_db_connection(readonly=False):
+    """Get a connection; readonly=True may be served by the replica"""
+    if _db_router is None:
+        raise RuntimeError("No DB connection function set; call set_db_connection_func first")
+    conn = _db_router.connection(readonly=readonly)
+    if _connection_wrapper is not None:
+        conn = _connection_wrapper(conn)
+    return conn
+
+
+def run_in_background(app, name, action, connect=None):
+    """Run action(conn) on a daemon thread with its own app context and connection.
+
+    For warm-up work (index builds, backfills) that should not hold up
+    startup or a user's request. connect defaults to get_db_connection.
+    Failures are logged, not raised. Returns the thread.
+    """
+    def run():
+        with app.app_context():
+            try:
+                conn = (connect or get_db_connection)()
+                try:
+                    action(conn)
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("background task %s failed", name)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+class BackgroundLoad:
+    """A run_in_background warm-up that is started again after it fails.
+
+    start() launches the first attempt. retry() is cheap enough to call
+    from a before_request hook: it does nothing while an attempt is
+    running or once one has succeeded, and otherwise starts a new attempt
+    at most once every retry_seconds.
+    """
+
+    def __init__(self, app, name, action, connect=None, retry_seconds=60, clock=time.monotonic):
+        self.app = app
+        self.name = name
+        self.action = action
+        self.connect = connect
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.done = False
+        self.thread = None
+        self._started = None
+        self._lock = threading.Lock()
+
+    def _run(self, conn):
+        self.action(conn)
+        self.done = True
+
+    def _launch(self, now):
+        self._started = now
+        self.thread = run_in_background(self.app, self.name, self._run, self.connect)
+        return self.thread
+
+    def start(self):
+        """Start the first attempt; returns its thread"""
+        with self._lock:
+            return self._launch(self.clock())
+
+    def retry(self):
+        """Start another attempt if the last one died; True once loaded"""
+        if self.done:
+            return True
+        now = self.clock()
+        with self._lock:
+            if (self.done or self.thread is None or self.thread.is_alive()
+                    or now - self._started < self.retry_seconds):
+                return self.done
+            logger.warning("background task %s did not finish; retrying", self.name)
+            self._launch(now)
+        return False
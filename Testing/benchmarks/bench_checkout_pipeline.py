@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-item checkout vs the batched checkout pipeline
+
+Places orders for carts of increasing size both ways on the SQLite
+stand-in and reports round trips (statements sent) and wall time. An
+executemany counts as one round trip only when PyMySQL would fold it
+into a multi-row INSERT (its RE_INSERT_VALUES matches), otherwise one per
+row, as on a real connection. Use
+--latency to add a simulated network delay per round trip, which is what
+dominates against a remote MySQL server.
+
+Usage:
+  python Testing/benchmarks/bench_checkout_pipeline.py
+  python Testing/benchmarks/bench_checkout_pipeline.py --latency 0.5   # ms per round trip
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+TESTING_DIR = Path(__file__).parent.parent
+PROJECT_ROOT = TESTING_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "Development"))
+sys.path.insert(0, str(TESTING_DIR))
+
+from pymysql.cursors import RE_INSERT_VALUES
+
+from checkout_pipeline import build_orders, place_orders
+from inventory import RESERVE_SQL
+from tests.sqlite_standin import StandInConnection, StandInCursor, connect
+
+PRODUCTS = 1000
+SELLERS = 20
+
+
+class RoundTripConnection(StandInConnection):
+    """Counts statements and optionally sleeps latency seconds for each"""
+
+    def __init__(self, conn, latency):
+        super().__init__(conn.raw)
+        self.latency = latency
+        self.round_trips = 0
+
+    def _trip(self, statements=1):
+        self.round_trips += statements
+        if self.latency:
+            time.sleep(self.latency * statements)
+
+    def cursor(self):
+        connection = self
+
+        class Cursor(StandInCursor):
+            def execute(self, sql, params=()):
+                connection._trip()
+                return super().execute(sql, params)
+
+            def executemany(self, sql, seq_of_params):
+                seq_of_params = list(seq_of_params)
+                connection._trip(1 if RE_INSERT_VALUES.match(sql) else len(seq_of_params))
+                return super().executemany(sql, seq_of_params)
+
+        return Cursor(self.raw.cursor())
+
+    def commit(self):
+        self._trip()
+        self.raw.commit()
+
+
+def seed(conn):
+    """PRODUCTS products spread over SELLERS sellers (the seed data has two)"""
+    extra = range(3, SELLERS + 1)
+    conn.raw.executemany(
+        "INSERT INTO users (id, email, password_hash, role, first_name, last_name) "
+        "VALUES (?, ?, 'x', 'seller', 'Bench', 'Seller')",
+        [(1000 + i, f"bench-seller{i}@example.test") for i in extra])
+    conn.raw.executemany("INSERT INTO sellers (id, user_id, store_name) VALUES (?, ?, ?)",
+                         [(i, 1000 + i, f"Store {i}") for i in extra])
+    conn.raw.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, ?, 6, ?, ?)",
+        [(i, 1 + i % SELLERS, f"Product {i}", 10 + i % 90) for i in range(1, PRODUCTS + 1)])
+    conn.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, ?)",
+                         [(i, 10 ** 9) for i in range(1, PRODUCTS + 1)])
+    conn.raw.commit()
+
+
+def naive_checkout(conn, customer_id, address_id, lines):
+    """The per-item flow: one lookup, one stock update and one insert per line"""
+    cursor = conn.cursor()
+    products = {}
+    for product_id, quantity in lines:
+        cursor.execute("SELECT id, seller_id, price, is_active FROM products WHERE id = %s", (product_id,))
+        row = cursor.fetchone()
+        products[row[0]] = row[1:]
+    orders = build_orders(lines, products)
+    for product_id, quantity in lines:
+        cursor.execute(RESERVE_SQL, (quantity, product_id, quantity))
+    for order in orders:
+        cursor.execute(
+            "INSERT INTO orders (order_number, customer_id, seller_id, shipping_address_id, "
+            "subtotal, tax, shipping_cost, total) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (order['order_number'], customer_id, order['seller_id'], address_id,
+             order['subtotal'], order['tax'], order['shipping_cost'], order['total']))
+        order['id'] = cursor.lastrowid
+        for item in order['items']:
+            cursor.execute(
+                "INSERT INTO order_items (order_id, product_id, quantity, price, subtotal) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (order['id'], item['product_id'], item['quantity'], item['price'], item['subtotal']))
+        cursor.execute(
+            "INSERT INTO payments (order_id, amount, payment_method) VALUES (%s, %s, 'cash_on_delivery')",
+            (order['id'], order['total']))
+    conn.commit()
+    return orders
+
+
+def measure(conn, checkout, lines, repeat):
+    conn.round_trips = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        checkout(conn, 4, 1, lines)
+    elapsed = (time.perf_counter() - started) / repeat
+    return conn.round_trips // repeat, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated ms per round trip")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    conn = RoundTripConnection(connect(seed=True), args.latency / 1000)
+    seed(conn)
+
+    def batched(conn, customer_id, address_id, lines):
+        return place_orders(conn, customer_id, address_id, lines=lines)
+
+    print(f"{'lines':>6} | {'naive trips':>11} {'naive ms':>9} | {'batched trips':>13} {'batched ms':>10}")
+    for size in (1, 5, 20, 50, 100, 200):
+        lines = [(i * 3 + 1, 1 + i % 3) for i in range(size)]
+        naive = measure(conn, naive_checkout, lines, args.repeat)
+        batch = measure(conn, batched, lines, args.repeat)
+        print(f"{size:>6} | {naive[0]:>11} {naive[1]:>9.2f} | {batch[0]:>13} {batch[1]:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: OFFSET/LIMIT vs keyset pagination on a large products table
+
+Seeds the SQLite stand-in schema (same indexes as schema.sql) with N
+products and times fetching pages at increasing depth both ways.
+
+Usage:
+  python Testing/benchmarks/bench_product_pagination.py            # 1,000,000 products
+  python Testing/benchmarks/bench_product_pagination.py --rows 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+TESTING_DIR = Path(__file__).parent.parent
+PROJECT_ROOT = TESTING_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "Development"))
+sys.path.insert(0, str(TESTING_DIR))
+
+from pagination import PRODUCT_COLUMNS, PRODUCT_SORTS, build_product_page_query, encode_cursor
+from tests.sqlite_standin import connect
+
+PAGE_SIZE = 20
+
+
+def seed(conn, rows):
+    print(f"Seeding {rows:,} products...")
+    started = time.perf_counter()
+    rng = random.Random(42)
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((
+            i, rng.randint(1, 50), rng.randint(1, 11), f"Product {i}",
+            round(rng.uniform(1, 2000), 2), f"SKU-{i}",
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+            f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+        ))
+        if len(batch) == 50000:
+            conn.raw.executemany(
+                "INSERT INTO products (id, seller_id, category_id, name, price, sku, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.raw.executemany(
+            "INSERT INTO products (id, seller_id, category_id, name, price, sku, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.raw.execute("ANALYZE")
+    print(f"  done in {time.perf_counter() - started:.1f}s")
+
+
+def offset_page(conn, sort_column, direction, offset):
+    columns = ', '.join(f"p.{name}" for name in PRODUCT_COLUMNS)
+    sql = (f"SELECT {columns} FROM products p WHERE p.is_active = TRUE "
+           f"ORDER BY p.{sort_column} {direction}, p.id {direction} "
+           f"LIMIT {PAGE_SIZE} OFFSET {offset}")
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    return cursor.fetchall()
+
+
+def keyset_page(conn, sort, cursor_token):
+    sql, params = build_product_page_query(sort, cursor=cursor_token, limit=PAGE_SIZE)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sort", default="price_asc", choices=["price_asc", "price_desc", "newest", "oldest"])
+    args = parser.parse_args()
+
+    conn = connect()
+    seed(conn, args.rows)
+
+    column, direction = PRODUCT_SORTS[args.sort]
+    print(f"\nSort: {args.sort}  page size: {PAGE_SIZE}  (best of 5, ms)")
+    print(f"{'page':>10} {'offset':>12} {'OFFSET ms':>10} {'keyset ms':>10} {'speedup':>8}")
+
+    depths = [1, 10, 100, 1000, 10000, args.rows // PAGE_SIZE - 1]
+    for page in depths:
+        offset = (page - 1) * PAGE_SIZE
+        if offset >= args.rows:
+            continue
+        # The keyset cursor for this page is the last row of the previous page
+        token = None
+        if offset:
+            previous = offset_page(conn, column, direction, offset - 1)[0]
+            row = dict(zip(PRODUCT_COLUMNS, previous))
+            token = encode_cursor(args.sort, row[column], row['id'])
+        assert offset_page(conn, column, direction, offset) == keyset_page(conn, args.sort, token)[:PAGE_SIZE]
+
+        offset_ms = timed(lambda: offset_page(conn, column, direction, offset))
+        keyset_ms = timed(lambda: keyset_page(conn, args.sort, token))
+        print(f"{page:>10,} {offset:>12,} {offset_ms:>10.2f} {keyset_ms:>10.2f} {offset_ms / keyset_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-process product search over a large synthetic catalog
+
+Indexes N generated products and reports build time plus per-query
+latency for full-word and partially typed (autocomplete) queries.
+
+Usage:
+  python Testing/benchmarks/bench_product_search.py               # 300,000 products
+  python Testing/benchmarks/bench_product_search.py --rows 50000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "Development"))
+
+from search import ProductSearchIndex
+
+ADJECTIVES = ["wireless", "portable", "premium", "compact", "smart", "classic", "ultra",
+              "lightweight", "waterproof", "vintage", "organic", "ergonomic", "digital"]
+NOUNS = ["mouse", "keyboard", "laptop", "phone", "headphones", "speaker", "jacket", "shirt",
+         "novel", "backpack", "lamp", "chair", "watch", "camera", "charger", "bottle"]
+CATEGORIES = [["Electronics", "Laptops"], ["Electronics", "Smartphones"], ["Clothing", "Men's Clothing"],
+              ["Clothing", "Women's Clothing"], ["Books", "Fiction"], ["Home & Garden"], ["Sports"]]
+FILLER = ["durable", "design", "quality", "everyday", "use", "gift", "edition", "model",
+          "color", "size", "warranty", "material", "feature", "battery", "fabric"]
+
+QUERIES = ["wireless mouse", "premium laptop", "waterproof jacket", "smart watch",
+           "fiction novel", "electronics", "sku 12345"]
+PREFIXES = ["w", "wi", "wire", "lap", "premium lap", "organic bo", "cam"]
+
+
+def generate(rows):
+    rng = random.Random(7)
+    for i in range(1, rows + 1):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i % 997}"
+        description = " ".join(rng.choice(FILLER + NOUNS) for _ in range(rng.randint(8, 25)))
+        yield {
+            'id': i,
+            'name': name.title(),
+            'description': description,
+            'sku': f"SKU-{i}",
+            'category_path': rng.choice(CATEGORIES),
+        }
+
+
+def measure(index, queries, prefix, repeat=20):
+    print(f"{'query':<22} {'hits':>7} {'cold ms':>8} {'p50 ms':>8} {'max ms':>8}")
+    for query in queries:
+        timings = []
+        for _ in range(repeat + 1):
+            started = time.perf_counter()
+            results = index.search(query, limit=20, prefix=prefix)
+            timings.append((time.perf_counter() - started) * 1000)
+        # The first run fills the per-term score cache
+        cold, warm = timings[0], timings[1:]
+        print(f"{query!r:<22} {len(results):>7} {cold:>8.2f} "
+              f"{statistics.median(warm):>8.2f} {max(warm):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--warm", action="store_true", help="precompute frequent term scores first")
+    args = parser.parse_args()
+
+    index = ProductSearchIndex()
+    started = time.perf_counter()
+    index.add_products(generate(args.rows))
+    print(f"Indexed {len(index):,} products in {time.perf_counter() - started:.1f}s")
+    if args.warm:
+        started = time.perf_counter()
+        warmed = index.warm()
+        print(f"Warmed {warmed} most frequent terms in {time.perf_counter() - started:.1f}s")
+
+    print("\nFull-word queries")
+    measure(index, QUERIES, prefix=False)
+    print("\nAutocomplete (last term as prefix)")
+    measure(index, PREFIXES, prefix=True)
+
+    edited = list(generate(2000))
+    for product in edited:
+        product['name'] += " refurbished"
+    started = time.perf_counter()
+    for product in edited[:1000]:
+        index.add_product(product)
+    print(f"\nRe-indexed 1,000 edited products one at a time in {(time.perf_counter() - started) * 1000:.1f} ms")
+    measure(index, QUERIES[:2], prefix=False)
+    started = time.perf_counter()
+    index._fold_pending()
+    print(f"Folded them into the main segment in {(time.perf_counter() - started) * 1000:.1f} ms "
+          f"(normally on a background thread every {index.DELTA_LIMIT} edits)")
+    started = time.perf_counter()
+    index.add_products(edited[1000:])
+    print(f"Re-indexed 1,000 edited products as one batch in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print("\nFull-word queries after edits (warm caches carried into the new snapshot)")
+    measure(index, QUERIES, prefix=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: product listing page render time with and without fragment caching
+
+Renders a listing page (navbar, nested category menu, a grid of product
+cards) from in-memory templates shaped like Development/templates, first
+with {% cache %} disabled and then warm.
+
+Usage:
+  python Testing/benchmarks/bench_template_cache.py
+  python Testing/benchmarks/bench_template_cache.py --cards 96 --renders 500
+"""
+
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+TESTING_DIR = Path(__file__).parent.parent
+PROJECT_ROOT = TESTING_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "Development"))
+
+from jinja2 import DictLoader, Environment
+
+from category_tree import CategoryTree
+from template_cache import FragmentCacheExtension
+
+TEMPLATES = {
+    'base.html': """<!doctype html><html><body>
+{% cache ('navbar', role), 600 %}
+<nav><a href="/">Shop</a>{% for link in nav_links %}<a href="{{ link.url }}">{{ link.label }}</a>{% endfor %}</nav>
+{% endcache %}
+{% cache ('category-menu', menu_version), 600 %}
+<ul class="menu">{% for node in menu recursive %}
+<li><a href="/category/{{ node.slug }}">{{ node.name }} ({{ node.subtree_count }})</a>
+{% if node.children %}<ul>{{ loop(node.children) }}</ul>{% endif %}</li>{% endfor %}</ul>
+{% endcache %}
+<main>{% block content %}{% endblock %}</main></body></html>""",
+    'product/card.html': """<div class="card"><img src="{{ product.image_url or '/static/none.png' }}" alt="{{ product.name }}">
+<h3>{{ product.name|title }}</h3><p>{{ product.description|truncate(80) }}</p>
+<span class="price">${{ '%.2f'|format(product.price) }}</span>
+{% if product.stock > 0 %}<span class="stock">In stock</span>{% else %}<span>Sold out</span>{% endif %}</div>""",
+    'product/list.html': """{% extends 'base.html' %}{% block content %}
+<div class="grid">{% for product in products %}
+{% cache ('product-card', product.id, product.version), 600 %}{% include 'product/card.html' %}{% endcache %}
+{% endfor %}</div>{% endblock %}""",
+}
+
+
+def build_context(cards):
+    rng = random.Random(7)
+    rows = [(i, None if i <= 10 else rng.randint(1, i - 1), f"Category {i}", f"category-{i}")
+            for i in range(1, 301)]
+    tree = CategoryTree.from_rows(rows, [(i, rng.randint(0, 50)) for i in range(1, 301)])
+    products = [{
+        'id': i, 'version': 1, 'name': f"product number {i}", 'price': Decimal(rng.randint(100, 99999)) / 100,
+        'description': "A sturdy everyday item with a long description " * 3,
+        'image_url': None if i % 3 else f"/static/p{i}.jpg", 'stock': rng.randint(0, 5),
+    } for i in range(cards)]
+    return {
+        'role': 'customer',
+        'nav_links': [{'url': f"/section/{i}", 'label': f"Section {i}"} for i in range(8)],
+        'menu': tree.menu(), 'menu_version': tree.version,
+        'products': products,
+    }
+
+
+def time_renders(template, context, renders):
+    started = time.perf_counter()
+    for _ in range(renders):
+        template.render(context)
+    return (time.perf_counter() - started) / renders * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cards', type=int, default=48)
+    parser.add_argument('--renders', type=int, default=200)
+    args = parser.parse_args()
+
+    env = Environment(loader=DictLoader(TEMPLATES), extensions=[FragmentCacheExtension], autoescape=True)
+    env.fragment_cache_vary = lambda: ('customer', 'en')
+    template = env.get_template('product/list.html')
+    context = build_context(args.cards)
+
+    env.fragment_cache_enabled = False
+    uncached = time_renders(template, context, args.renders)
+    env.fragment_cache_enabled = True
+    template.render(context)
+    cached = time_renders(template, context, args.renders)
+    print(f"listing page, {args.cards} cards, 300-category menu, {args.renders} renders")
+    print(f"  no fragment cache: {uncached:8.3f} ms/render")
+    print(f"  warm cache:        {cached:8.3f} ms/render  ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
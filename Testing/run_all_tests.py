@@ -3,11 +3,16 @@
 Run all tests and generate HTML reports for each task
 """
 
+import argparse
+import hashlib
 import subprocess
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os
+import queue
+import socket
 
 PROJECT_ROOT = Path(__file__).parent.parent
 DEVELOPMENT_DIR = PROJECT_ROOT / "Development"
@@ -15,6 +20,12 @@ TESTING_DIR = Path(__file__).parent
 TEST_CONFIGS_DIR = TESTING_DIR / "test_configs"
 TESTS_DIR = TESTING_DIR / "tests"
 RESULTS_DIR = TESTING_DIR / "results"
+CACHE_FILE = RESULTS_DIR / ".test_cache.json"
+TASK_IDS = range(1, 16)
+# Inputs every task depends on besides its own test files
+SHARED_INPUT_PATTERNS = ("**/*.py", "**/*.sql", "**/*.html")
+# Settings that decide which database tests run (or skip)
+DATABASE_ENV = ("MYSQL_HOST", "MYSQL_PORT", "MYSQL_USER", "MYSQL_DB", "MYSQL_TEST_DB")
 
 # Create results directory
 RESULTS_DIR.mkdir(exist_ok=True)
@@ -48,46 +59,137 @@ def fix_test_imports():
         test_file.write_text(content)
     print("✅ Test imports fixed")
 
-def run_test_for_task(task_id):
-    """Run tests for a specific task and generate HTML report"""
+def load_task_config(task_id):
+    """Return (config, test_files) for a task, or (None, []) if it has no config"""
     task_id_str = str(task_id).zfill(2)
     config_file = TEST_CONFIGS_DIR / f"task_{task_id_str}.json"
-    
     if not config_file.exists():
-        print(f"❌ Config not found for task {task_id}")
-        return False
-    
+        return None, []
+
     with open(config_file) as f:
         config = json.load(f)
-    
-    task_name = config.get("task_name", f"Task {task_id}")
-    print(f"\n{'='*60}")
-    print(f"Running tests for Task {task_id}: {task_name}")
-    print(f"{'='*60}")
-    
+
     # Collect all test files for this task
     test_files = []
     mandatory_tests = config.get("mandatory_tests", [])
     optional_tests = config.get("optional_tests", [])
-    
+
     for test in mandatory_tests + optional_tests:
         test_file = test.get("file", "")
         if test_file.startswith("tests/"):
             test_path = TESTS_DIR / test_file.replace("tests/", "")
             if test_path.exists():
                 test_files.append(str(test_path))
-    
-    if not test_files:
-        print(f"⚠️  No test files found for task {task_id}")
+    return config, test_files
+
+
+def _hash_file(digest, path):
+    digest.update(str(path.relative_to(PROJECT_ROOT)).encode())
+    digest.update(b"\0")
+    digest.update(path.read_bytes())
+    digest.update(b"\0")
+
+
+def database_available():
+    """Check if the MySQL server the tests would use accepts connections"""
+    host = os.environ.get("MYSQL_HOST", "localhost")
+    port = int(os.environ.get("MYSQL_PORT", "3306"))
+    try:
+        socket.create_connection((host, port), timeout=1).close()
+    except OSError:
         return False
-    
+    return True
+
+
+def database_fingerprint():
+    """The database settings and whether the server is up: a run that
+    skipped the DB tests must not stand in for one that ran them"""
+    settings = {name: os.environ.get(name) for name in DATABASE_ENV}
+    settings["available"] = database_available()
+    return json.dumps(settings, sort_keys=True)
+
+
+def shared_inputs_hash():
+    """Content hash of Development/ sources, the shared test helpers and
+    the database environment.
+
+    Every tests/*.py that is not a test_*.py module (conftest.py,
+    template_db.py, sqlite_standin.py, ...) counts as a shared helper.
+    """
+    digest = hashlib.sha256(database_fingerprint().encode())
+    files = set()
+    for pattern in SHARED_INPUT_PATTERNS:
+        files.update(path for path in DEVELOPMENT_DIR.glob(pattern)
+                     if path.is_file() and "__pycache__" not in path.parts)
+    files.update(path for path in TESTS_DIR.glob("*.py") if not path.name.startswith("test_"))
+    for path in sorted(files):
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+
+def task_inputs_hash(task_id, test_files, shared_hash):
+    """Content hash of everything a task's result depends on"""
+    digest = hashlib.sha256(shared_hash.encode())
+    config_file = TEST_CONFIGS_DIR / f"task_{str(task_id).zfill(2)}.json"
+    for path in [config_file] + sorted(Path(f) for f in test_files):
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+
+def load_cache():
+    try:
+        return json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    CACHE_FILE.write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+
+def run_test_for_task(task_id, worker_id=None, cache=None, shared_hash=None):
+    """Run tests for a specific task and generate HTML report.
+
+    Returns (passed, output lines) so parallel runs can print each task's
+    output in one block. worker_id gives the run its own test database
+    (MYSQL_DB suffixed with _w<worker_id>). With a cache, a task that
+    passed last time with the same inputs hash (which covers the database
+    settings and whether the server is up) is not run again; runs where
+    every test was skipped are never reused.
+    """
+    lines = []
+    log = lines.append
+    task_id_str = str(task_id).zfill(2)
+    config, test_files = load_task_config(task_id)
+
+    if config is None:
+        log(f"❌ Config not found for task {task_id}")
+        return False, lines
+
+    task_name = config.get("task_name", f"Task {task_id}")
+    log(f"\n{'='*60}")
+    log(f"Running tests for Task {task_id}: {task_name}")
+    log(f"{'='*60}")
+
+    if not test_files:
+        log(f"⚠️  No test files found for task {task_id}")
+        return False, lines
+
     # Run pytest with HTML report
     html_report = RESULTS_DIR / f"task_{task_id_str}_result.html"
-    
+
+    inputs_hash = None
+    if cache is not None:
+        inputs_hash = task_inputs_hash(task_id, test_files, shared_hash or shared_inputs_hash())
+        cached = cache.get(task_id_str)
+        if cached and cached.get("hash") == inputs_hash and cached.get("passed") and html_report.exists():
+            log(f"⏭️  Unchanged since last run, skipped - Report: {html_report}")
+            return True, lines
+
     # Use venv Python if available
     venv_python = PROJECT_ROOT / "venv" / "bin" / "python"
     python_exe = str(venv_python) if venv_python.exists() else sys.executable
-    
+
     cmd = [
         python_exe, "-m", "pytest",
         "-v",
@@ -95,11 +197,17 @@ def run_test_for_task(task_id):
         "--self-contained-html",
         *test_files
     ]
-    
+
     # Set PYTHONPATH to include Development directory
     env = os.environ.copy()
     env['PYTHONPATH'] = str(DEVELOPMENT_DIR)
-    
+    if worker_id is not None:
+        env['TEST_WORKER_ID'] = str(worker_id)
+        env['MYSQL_DB'] = f"{os.environ.get('MYSQL_DB', 'ecommerce_test_db')}_w{worker_id}"
+
+    passed = False
+    # Only cache runs where tests really ran, not ones skipped wholesale
+    cacheable = False
     try:
         result = subprocess.run(
             cmd,
@@ -108,33 +216,90 @@ def run_test_for_task(task_id):
             capture_output=True,
             text=True
         )
-        
+
         # Check if tests passed or were skipped (both are acceptable)
         if result.returncode == 0:
             # Check if all tests were skipped
             if "no tests ran" in result.stdout.lower() or "collected 0 items" in result.stdout.lower():
-                print(f"⚠️  No tests found - Report: {html_report}")
-                return False
+                log(f"⚠️  No tests found - Report: {html_report}")
             elif "skipped" in result.stdout.lower():
                 # Some or all skipped is acceptable if database not available
                 if "passed" in result.stdout.lower():
-                    print(f"✅ Tests passed (some skipped) - Report: {html_report}")
+                    log(f"✅ Tests passed (some skipped) - Report: {html_report}")
+                    cacheable = True
                 else:
-                    print(f"⚠️  All tests skipped (database may not be available) - Report: {html_report}")
-                return True
+                    log(f"⚠️  All tests skipped (database may not be available) - Report: {html_report}")
+                passed = True
             else:
-                print(f"✅ Tests passed - Report: {html_report}")
-                return True
+                log(f"✅ Tests passed - Report: {html_report}")
+                passed = True
+                cacheable = True
         else:
-            print(f"❌ Tests failed - Report: {html_report}")
-            print(f"   {result.stdout[:500]}")
-            return False
+            log(f"❌ Tests failed - Report: {html_report}")
+            log(f"   {result.stdout[:500]}")
     except Exception as e:
-        print(f"❌ Error running tests: {e}")
-        return False
+        log(f"❌ Error running tests: {e}")
+
+    if cache is not None:
+        cache[task_id_str] = {"hash": inputs_hash, "passed": passed and cacheable}
+    return passed, lines
+
+
+def run_tasks(task_ids, jobs=1, use_cache=True):
+    """Run every task and return {task_id: passed}.
+
+    With jobs > 1 the tasks' pytest processes run concurrently, each
+    worker slot using its own test database; output is printed per task
+    in task order.
+    """
+    cache = load_cache() if use_cache else None
+    shared_hash = shared_inputs_hash() if use_cache else None
+    results = {}
+
+    if jobs <= 1:
+        for task_id in task_ids:
+            results[task_id], lines = run_test_for_task(task_id, cache=cache, shared_hash=shared_hash)
+            print("\n".join(lines))
+    else:
+        # Each pytest process borrows a worker slot, and with it a database, for its run
+        slots = queue.Queue()
+        for worker_id in range(jobs):
+            slots.put(worker_id)
+
+        def run(task_id):
+            worker_id = slots.get()
+            try:
+                return run_test_for_task(task_id, worker_id, cache, shared_hash)
+            finally:
+                slots.put(worker_id)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {task_id: pool.submit(run, task_id) for task_id in task_ids}
+            for task_id, future in futures.items():
+                results[task_id], lines = future.result()
+                print("\n".join(lines))
+
+    if cache is not None:
+        save_cache(cache)
+    return results
 
 def main():
     """Run all tests"""
+    parser = argparse.ArgumentParser(description="Run all task tests and generate HTML reports")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Run up to N tasks in parallel, each with its own test database (0 = one per CPU)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every task, even if its inputs are unchanged since the last passing run"
+    )
+    args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+
     print("🧪 Running all test cases and generating HTML reports...\n")
     
     # Fix imports first
@@ -158,9 +323,7 @@ def main():
         print("✅ Copied and fixed conftest.py")
     
     # Run tests for each task
-    results = {}
-    for task_id in range(1, 16):
-        results[task_id] = run_test_for_task(task_id)
+    results = run_tasks(TASK_IDS, jobs=jobs, use_cache=not args.no_cache)
     
     # Summary
     print(f"\n{'='*60}")
@@ -2,6 +2,7 @@
 Shared pytest fixtures for all tests
 """
 
+import os
 import pytest
 import sys
 from pathlib import Path
@@ -11,16 +12,22 @@ project_root = Path(__file__).parent.parent.parent
 development_dir = project_root / "Development"
 sys.path.insert(0, str(development_dir))
 
-from app import app, get_db_connection
+# app.py refuses to start without a key outside TESTING/DEBUG
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+from app import app, ensure_loaded, get_db_connection
 from utils import set_db_connection_func
+from .template_db import mysql_db, mysql_test_database, standin_db, standin_module_db
 
 @pytest.fixture
-def client():
-    """Create a test client"""
+def client(mysql_test_database):
+    """Create a test client backed by this worker's clone of the template database"""
+    _, settings = mysql_test_database
     app.config['TESTING'] = True
     app.config['WTF_CSRF_ENABLED'] = False
-    app.config['MYSQL_DB'] = 'ecommerce_test_db'
-    
+    app.config['MYSQL_DB'] = settings['db']
+    ensure_loaded(app)
+
     with app.test_client() as client:
         with app.app_context():
             yield client
@@ -0,0 +1,149 @@
+"""
+SQLite stand-in for the MySQL database used in unit tests and benchmarks.
+Loads Development/database/schema.sql and accepts MySQLdb-style SQL (%s
+placeholders) so application queries run unchanged.
+"""
+
+import re
+import sqlite3
+from decimal import Decimal
+from pathlib import Path
+
+DATABASE_DIR = Path(__file__).parent.parent.parent / "Development" / "database"
+SCHEMA_FILE = DATABASE_DIR / "schema.sql"
+SEED_FILE = DATABASE_DIR / "seed_data.sql"
+
+sqlite3.register_adapter(Decimal, float)
+
+
+def translate_sql(sql):
+    """Translate the MySQL idioms used by the app into SQLite syntax"""
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\s+FOR UPDATE\b', '', sql, flags=re.IGNORECASE)
+    upsert = re.search(r'ON DUPLICATE KEY UPDATE', sql, flags=re.IGNORECASE)
+    if upsert:
+        updates = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', sql[upsert.end():])
+        sql = sql[:upsert.start()] + 'ON CONFLICT DO UPDATE SET' + updates
+    return sql
+
+
+def translate_schema(schema_sql):
+    """Turn the MySQL CREATE TABLE statements into SQLite DDL"""
+    statements = []
+    for statement in split_statements(schema_sql):
+        if not statement.upper().startswith('CREATE TABLE'):
+            statements.append(statement)
+            continue
+        table = re.match(r'CREATE TABLE (\w+)', statement, re.IGNORECASE).group(1)
+        lines = []
+        indexes = []
+        for line in statement.splitlines():
+            stripped = line.strip().rstrip(',')
+            index = re.match(r'INDEX (\w+) \((.+)\)$', stripped)
+            if index:
+                indexes.append(f"CREATE INDEX {table}_{index.group(1)} ON {table} ({index.group(2)})")
+                continue
+            if stripped.startswith('--'):
+                continue
+            line = re.sub(r'INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT', line)
+            line = re.sub(r'ENUM\([^)]*\)', 'TEXT', line)
+            line = line.replace(' ON UPDATE CURRENT_TIMESTAMP', '')
+            line = re.sub(r'UNIQUE KEY \w+ \(', 'UNIQUE (', line)
+            lines.append(line)
+        ddl = '\n'.join(lines)
+        ddl = re.sub(r',\s*\)$', '\n)', ddl)
+        statements.append(ddl)
+        statements.extend(indexes)
+    return statements
+
+
+def split_statements(sql):
+    """Split a SQL script on ';', dropping comment-only chunks"""
+    statements = []
+    for chunk in sql.split(';'):
+        body = '\n'.join(
+            line for line in chunk.splitlines() if not line.strip().startswith('--')
+        ).strip()
+        if body:
+            statements.append(body)
+    return statements
+
+
+class StandInCursor:
+    """DB-API cursor that accepts MySQLdb-style SQL"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(translate_sql(sql), tuple(params or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate_sql(sql), [tuple(p) for p in seq_of_params])
+        return self._cursor.rowcount
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class StandInConnection:
+    """sqlite3 connection with a MySQLdb-compatible cursor()"""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self):
+        return StandInCursor(self.raw.cursor())
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+# (seed,) -> in-memory database holding schema (and seed data), built once per process
+_TEMPLATES = {}
+
+
+def _template(seed):
+    template = _TEMPLATES.get(seed)
+    if template is None:
+        template = sqlite3.connect(':memory:', check_same_thread=False)
+        load_schema(StandInConnection(template))
+        if seed:
+            load_seed_data(StandInConnection(template))
+        _TEMPLATES[seed] = template
+    return template
+
+
+def connect(path=':memory:', schema=True, seed=False, **kwargs):
+    """Open a stand-in database, optionally loading schema.sql and seed_data.sql.
+
+    In-memory databases are copied page by page from a template built on
+    first use instead of replaying the DDL and seed inserts every time.
+    """
+    kwargs.setdefault('check_same_thread', False)
+    conn = StandInConnection(sqlite3.connect(path, **kwargs))
+    if schema and path == ':memory:':
+        _template(seed).backup(conn.raw)
+        return conn
+    if schema:
+        load_schema(conn)
+    if seed:
+        load_seed_data(conn)
+    return conn
+
+
+def load_schema(conn):
+    for statement in translate_schema(SCHEMA_FILE.read_text()):
+        conn.raw.execute(statement)
+    conn.raw.commit()
+
+
+def load_seed_data(conn):
+    sql = SEED_FILE.read_text().replace("\\'", "''")
+    for statement in split_statements(sql):
+        conn.raw.execute(statement)
+    conn.raw.commit()
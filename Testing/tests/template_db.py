@@ -0,0 +1,232 @@
+"""
+Template-cloned test databases.
+
+Schema and seed data are loaded once into a template; each worker then
+gets its own copy and each test runs inside a savepoint that is rolled
+back afterwards. MySQL clones copy the template's tables with CREATE
+TABLE ... LIKE / INSERT ... SELECT; the SQLite stand-in copies its
+in-memory template with the backup API (see sqlite_standin.connect).
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from .sqlite_standin import SCHEMA_FILE, SEED_FILE, connect, split_statements
+
+TEMPLATE_LOCK = 'ecommerce_test_template'
+SAVEPOINT = 'test_case'
+
+
+def schema_fingerprint():
+    """Short hash of schema.sql + seed_data.sql; a new template is built when it changes"""
+    digest = hashlib.sha256(SCHEMA_FILE.read_bytes() + b'\0' + SEED_FILE.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def test_database_name():
+    """Database for this test worker.
+
+    run_all_tests.py -j sets MYSQL_DB per worker (with TEST_WORKER_ID);
+    otherwise MYSQL_TEST_DB (default ecommerce_test_db) is used. Under
+    pytest-xdist the worker id (gw0, gw1, ...) is appended.
+    """
+    if os.getenv('TEST_WORKER_ID') is not None:
+        name = os.getenv('MYSQL_DB')
+    else:
+        name = os.getenv('MYSQL_TEST_DB', 'ecommerce_test_db')
+    xdist_worker = os.getenv('PYTEST_XDIST_WORKER')
+    if xdist_worker:
+        name = f"{name}_{xdist_worker}"
+    return name
+
+
+test_database_name.__test__ = False
+
+
+def template_database_name():
+    return f"ecommerce_template_{schema_fingerprint()}"
+
+
+def _execute(cursor, statements):
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def _database_exists(cursor, name):
+    cursor.execute("SELECT SCHEMA_NAME FROM information_schema.SCHEMATA WHERE SCHEMA_NAME = %s", (name,))
+    return cursor.fetchone() is not None
+
+
+def build_template(conn, name=None):
+    """Create the MySQL template database (schema + seed) unless it already exists.
+
+    conn is a server connection with CREATE DATABASE rights. Concurrent
+    workers serialize on a named lock, so the template is built once.
+    """
+    name = name or template_database_name()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 120)", (TEMPLATE_LOCK,))
+        try:
+            if not _database_exists(cursor, name):
+                cursor.execute(f"CREATE DATABASE `{name}` CHARACTER SET utf8mb4")
+                cursor.execute(f"USE `{name}`")
+                _execute(cursor, split_statements(SCHEMA_FILE.read_text()))
+                _execute(cursor, split_statements(SEED_FILE.read_text()))
+                conn.commit()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (TEMPLATE_LOCK,))
+    finally:
+        cursor.close()
+    return name
+
+
+def clone_database(conn, template, target):
+    """Replace target with a copy of template's tables and rows"""
+    if target == template or 'test' not in target:
+        raise ValueError(f"refusing to overwrite {target!r}: clone targets must be test databases")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'", (template,))
+        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"DROP DATABASE IF EXISTS `{target}`")
+        cursor.execute(f"CREATE DATABASE `{target}` CHARACTER SET utf8mb4")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            for table in tables:
+                cursor.execute(f"CREATE TABLE `{target}`.`{table}` LIKE `{template}`.`{table}`")
+                cursor.execute(f"INSERT INTO `{target}`.`{table}` SELECT * FROM `{template}`.`{table}`")
+        finally:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        # CREATE TABLE ... LIKE copies indexes but not foreign keys; the
+        # schema tests check those, so re-add them from the template
+        cursor.execute(
+            "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, "
+            "k.REFERENCED_COLUMN_NAME, r.DELETE_RULE, r.UPDATE_RULE "
+            "FROM information_schema.KEY_COLUMN_USAGE k "
+            "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+            "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME "
+            "WHERE k.TABLE_SCHEMA = %s ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION",
+            (template,))
+        for table, constraint, column, ref_table, ref_column, on_delete, on_update in cursor.fetchall():
+            cursor.execute(
+                f"ALTER TABLE `{target}`.`{table}` ADD CONSTRAINT `{constraint}` "
+                f"FOREIGN KEY (`{column}`) REFERENCES `{target}`.`{ref_table}` (`{ref_column}`) "
+                f"ON DELETE {on_delete} ON UPDATE {on_update}")
+        conn.commit()
+    finally:
+        cursor.close()
+    return target
+
+
+def ensure_test_database(conn, target=None):
+    """Build the template if needed and clone it into this worker's test database"""
+    target = target or test_database_name()
+    return clone_database(conn, build_template(conn), target)
+
+
+class SavepointConnection:
+    """Run a test inside a transaction that is rolled back at the end.
+
+    commit() only moves the savepoint forward and rollback() returns to
+    it, so code under test can commit and roll back as usual while
+    nothing reaches the database. DDL commits implicitly on MySQL and
+    must not be used inside a savepoint test.
+    """
+
+    def __init__(self, conn):
+        self.raw = getattr(conn, 'raw', conn)
+        self._conn = conn
+        self._run("BEGIN", f"SAVEPOINT {SAVEPOINT}")
+
+    def _run(self, *statements):
+        cursor = self.raw.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def cursor(self, *args):
+        return self._conn.cursor(*args)
+
+    def commit(self):
+        self._run(f"RELEASE SAVEPOINT {SAVEPOINT}", f"SAVEPOINT {SAVEPOINT}")
+
+    def rollback(self):
+        self._run(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+
+    def close(self):
+        pass
+
+    def discard(self):
+        """End the test: undo everything it did"""
+        self.raw.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+# Fixtures (re-exported by conftest.py)
+
+@pytest.fixture(scope="module")
+def standin_module_db():
+    """Seeded SQLite stand-in cloned from the in-memory template, one per test module"""
+    conn = connect(seed=True)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def standin_db(standin_module_db):
+    """The module's stand-in database inside a per-test savepoint"""
+    conn = SavepointConnection(standin_module_db)
+    yield conn
+    conn.discard()
+
+
+@pytest.fixture(scope="session")
+def mysql_test_database():
+    """Connection settings for this worker's MySQL clone of the template database"""
+    from dotenv import load_dotenv
+    try:
+        import MySQLdb
+    except ImportError:
+        try:
+            import pymysql
+            pymysql.install_as_MySQLdb()
+            import MySQLdb
+        except ImportError:
+            pytest.skip("PyMySQL not installed")
+
+    load_dotenv()
+    settings = {
+        'host': os.getenv("MYSQL_HOST", "localhost"),
+        'user': os.getenv("MYSQL_USER", "root"),
+        'passwd': os.getenv("MYSQL_PASSWORD", ""),
+        'port': int(os.getenv("MYSQL_PORT", "3306")),
+        'charset': 'utf8mb4',
+    }
+    try:
+        server = MySQLdb.connect(**settings)
+    except MySQLdb.Error as e:
+        pytest.skip(f"Cannot connect to database: {e}")
+    try:
+        settings['db'] = ensure_test_database(server)
+    finally:
+        server.close()
+    return MySQLdb, settings
+
+
+@pytest.fixture
+def mysql_db(mysql_test_database):
+    """Connection to the worker's MySQL clone inside a per-test savepoint"""
+    MySQLdb, settings = mysql_test_database
+    conn = SavepointConnection(MySQLdb.connect(**settings))
+    yield conn
+    conn.discard()
+    conn.raw.close()
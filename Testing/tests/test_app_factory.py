@@ -0,0 +1,116 @@
+"""
+Test cases for the application factory
+Tests lazy blueprint loading, deferred extension setup and startup timing
+"""
+
+import pytest
+import sys
+import types
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from flask import Blueprint
+
+import utils
+from app import EXTENSIONS, create_app, ensure_loaded
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    """Keep the DB router / connection wrapper set during loading out of other tests"""
+    monkeypatch.setattr(utils, '_db_router', None)
+    monkeypatch.setattr(utils, '_connection_wrapper', None)
+    bp = Blueprint('order', __name__)
+    bp.add_url_rule('/ping', 'ping', lambda: 'pong')
+    fake = types.ModuleType('blueprints.order')
+    fake.bp = bp
+    monkeypatch.setitem(sys.modules, 'blueprints.order', fake)
+
+
+@pytest.mark.unit
+def test_lazy_app_loads_on_first_request(isolated):
+    app = create_app({'TESTING': True}, lazy=True)
+    stats = app.extensions['startup']
+    assert stats.load_s is None and stats.import_times == {}
+    assert 'db_pool' not in app.extensions
+
+    with app.test_client() as client:
+        assert client.get('/orders/ping').data == b'pong'
+        assert client.get('/orders/ping').data == b'pong'
+
+    assert app.extensions['lazy_loader'].loaded
+    assert 'db_pool' in app.extensions and app.extensions['job_queue'].inline
+    assert {'blueprints.auth', 'blueprints.order', 'db_pool'} <= set(stats.import_times)
+    report = stats.to_dict()
+    assert report['lazy'] and report['load_ms'] >= 0
+    assert list(report['import_ms'].values()) == sorted(report['import_ms'].values(), reverse=True)
+
+
+@pytest.mark.unit
+def test_replica_settings_enable_read_routing(isolated, monkeypatch):
+    import db_pool
+    monkeypatch.delenv('MYSQL_REPLICA_HOST', raising=False)
+    app = create_app({'TESTING': True}, lazy=False)
+    assert 'db_replica_pool' not in app.extensions
+    assert utils.get_db_router().replica is None
+
+    monkeypatch.setattr(utils, '_db_router', None)
+    app = create_app({'TESTING': True, 'MYSQL_REPLICA_HOST': 'replica.internal',
+                      'MYSQL_REPLICA_PORT': '3307', 'DB_STICKY_SECONDS': 2}, lazy=False)
+    assert 'db_replica_pool' in app.extensions
+    router = utils.get_db_router()
+    assert router.replica is db_pool.get_replica_connection and router.sticky_seconds == 2
+    replica = db_pool.mysql_replica_config(app, db_pool.mysql_config_from_env())
+    assert replica['host'] == 'replica.internal' and replica['port'] == 3307
+
+
+@pytest.mark.unit
+def test_eager_app_loads_in_factory(isolated):
+    app = create_app({'TESTING': True}, lazy=False)
+    assert 'lazy_loader' not in app.extensions
+    assert 'order.ping' in app.view_functions
+    assert app.extensions['startup'].load_s is not None
+
+
+@pytest.mark.unit
+def test_ensure_loaded_registers_routes_for_url_for(isolated):
+    app = create_app({'TESTING': True}, lazy=True)
+    ensure_loaded(app)
+    ensure_loaded(app)
+    with app.test_request_context():
+        from flask import url_for
+        assert url_for('order.ping') == '/orders/ping'
+
+
+@pytest.mark.unit
+def test_lazy_mode_from_environment(monkeypatch):
+    monkeypatch.setenv('APP_LAZY_LOAD', '1')
+    assert create_app().extensions['startup'].lazy
+
+@pytest.mark.unit
+def test_testing_app_is_loaded_for_url_for(isolated):
+    app = create_app({'TESTING': True})
+    assert not app.extensions['startup'].lazy
+    with app.test_request_context():
+        from flask import url_for
+        assert url_for('order.ping') == '/orders/ping'
+
+@pytest.mark.unit
+def test_secret_key_is_required_outside_testing(monkeypatch):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    monkeypatch.delenv('FLASK_DEBUG', raising=False)
+    monkeypatch.setattr('dotenv.load_dotenv', lambda *args, **kwargs: False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        create_app()
+    assert create_app({'TESTING': True}).config['SECRET_KEY']
+    assert create_app({'SECRET_KEY': 'fixed'}).config['SECRET_KEY'] == 'fixed'
+
+@pytest.mark.unit
+def test_every_feature_init_hook_is_registered():
+    modules = {module for module, _ in EXTENSIONS}
+    assert {'search', 'category_tree', 'sales_rollup', 'product_cache'} <= modules
+    assert EXTENSIONS[0][0] == 'db_pool'
@@ -0,0 +1,229 @@
+"""
+Test cases for the session cart with write-behind persistence
+Tests coalescing, batched flushes, login merge and the idle flush hook
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from flask import Flask, session
+from flask_login import LoginManager, UserMixin, login_user
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from cart_store import SESSION_KEY, SessionCart, get_cart, init_cart
+from .sqlite_standin import StandInConnection, StandInCursor, connect
+
+
+class CountingConnection(StandInConnection):
+    """Stand-in connection that counts statements; close() is a no-op"""
+
+    def __init__(self, conn):
+        super().__init__(conn.raw)
+        self.statements = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor(StandInCursor):
+            def execute(self, sql, params=()):
+                connection.statements += 1
+                return super().execute(sql, params)
+
+            def executemany(self, sql, seq_of_params):
+                connection.statements += 1
+                return super().executemany(sql, seq_of_params)
+
+        return Cursor(self.raw.cursor())
+
+    def close(self):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def db():
+    conn = CountingConnection(connect(seed=True))
+    conn.raw.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, 1, 6, ?, 10)",
+        [(i, f"P{i}") for i in range(1, 11)])
+    conn.raw.commit()
+    return conn
+
+
+def saved_items(conn, customer_id=4):
+    return conn.raw.execute(
+        "SELECT ci.product_id, ci.quantity FROM cart_items ci JOIN cart c ON c.id = ci.cart_id "
+        "WHERE c.customer_id = ? ORDER BY ci.product_id", (customer_id,)).fetchall()
+
+
+@pytest.mark.unit
+def test_edits_stay_in_the_session(db):
+    store = {}
+    cart = SessionCart(store)
+    cart.add(3)
+    cart.add(3, 2)
+    cart.add(1)
+    cart.set(5, 4)
+    cart.remove(5)
+    assert cart.items() == [(1, 1), (3, 3)]
+    assert cart.count() == 4 and len(cart) == 2 and 3 in cart
+    assert db.statements == 0
+    # The state is plain JSON-friendly data and survives a new request
+    assert SessionCart(dict(store)).items() == [(1, 1), (3, 3)]
+
+@pytest.mark.unit
+def test_flush_coalesces_into_one_batch(db):
+    cart = SessionCart({})
+    for _ in range(20):
+        cart.add(2)
+    cart.add(7)
+    cart.flush(db, 4)
+    # cart lookup + insert, one upsert batch
+    assert db.statements == 3
+    assert saved_items(db) == [(2, 20), (7, 1)]
+
+    db.statements = 0
+    cart.set(2, 5)
+    cart.remove(7)
+    cart.add(9)
+    cart.flush(db, 4)
+    assert db.statements == 2
+    assert saved_items(db) == [(2, 5), (9, 1)]
+
+    db.statements = 0
+    cart.flush(db, 4)
+    assert db.statements == 0
+
+@pytest.mark.unit
+def test_needs_flush_after_idle_period():
+    clock = FakeClock()
+    cart = SessionCart({}, clock=clock)
+    assert not cart.needs_flush(60)
+    cart.add(1)
+    clock.now += 30
+    assert not cart.needs_flush(60)
+    cart.add(1)
+    clock.now += 59
+    assert not cart.needs_flush(60)
+    clock.now += 1
+    assert cart.needs_flush(60)
+
+@pytest.mark.unit
+def test_attach_merges_saved_cart(db):
+    earlier = SessionCart({})
+    earlier.add(1, 2)
+    earlier.add(2, 1)
+    earlier.flush(db, 4)
+
+    cart = SessionCart({})
+    cart.add(2, 5)
+    cart.add(3)
+    cart.attach(db, 4)
+    assert cart.cart_id == earlier.cart_id
+    assert cart.items() == [(1, 2), (2, 5), (3, 1)]
+    assert saved_items(db) == [(1, 2), (2, 5), (3, 1)]
+    assert not cart.dirty
+
+@pytest.mark.unit
+def test_checkout_uses_session_lines(db):
+    cart = SessionCart({})
+    cart.add(1, 2)
+    cart.flush(db, 4)
+    cart.add(4)
+    db.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, 10)",
+                       [(1,), (4,)])
+    db.raw.commit()
+
+    orders = cart.checkout(db, 4, 1)
+    assert [item['product_id'] for item in orders[0]['items']] == [1, 4]
+    assert saved_items(db) == []
+    assert cart.items() == [] and not cart.dirty
+
+@pytest.mark.integration
+def test_login_and_idle_flush_hooks(db):
+    class User(UserMixin):
+        def __init__(self, id, role):
+            self.id = id
+            self.role = role
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config['CART_IDLE_FLUSH_SECONDS'] = 60
+    LoginManager(app)
+    init_cart(app, connect=lambda: db)
+
+    with app.test_request_context():
+        get_cart().add(6)
+        login_user(User(4, 'customer'))
+        assert saved_items(db) == [(6, 1)]
+
+        get_cart().add(6)
+        app.preprocess_request()
+        assert saved_items(db) == [(6, 1)]
+
+        session[SESSION_KEY]['changed_at'] -= 60
+        app.preprocess_request()
+        assert saved_items(db) == [(6, 2)]
+
+@pytest.mark.unit
+def test_flush_drops_deleted_products(db):
+    db.raw.execute("PRAGMA foreign_keys = ON")
+    cart = SessionCart({})
+    cart.add(1)
+    cart.add(2, 3)
+    db.raw.execute("DELETE FROM products WHERE id = 2")
+    db.raw.commit()
+
+    cart.flush(db, 4)
+    assert cart.items() == [(1, 1)]
+    assert saved_items(db) == [(1, 1)]
+    assert not cart.dirty
+
+@pytest.mark.integration
+def test_failed_flush_backs_off_without_failing_requests(db):
+    class User(UserMixin):
+        id = 4
+        role = 'customer'
+
+    class BrokenConnection:
+        def cursor(self):
+            raise ConnectionError("server has gone away")
+
+        def close(self):
+            pass
+
+    broken = {'on': True}
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config['CART_IDLE_FLUSH_SECONDS'] = 60
+    LoginManager(app)
+    init_cart(app, connect=lambda: BrokenConnection() if broken['on'] else db)
+
+    with app.test_request_context():
+        get_cart().add(6)
+        login_user(User())  # attach fails; login still succeeds
+        assert get_cart().dirty and saved_items(db) == []
+
+        retry_at = session[SESSION_KEY]['retry_at']
+        session[SESSION_KEY]['changed_at'] -= 60
+        for _ in range(3):
+            app.preprocess_request()
+        assert session[SESSION_KEY]['retry_at'] == retry_at  # still backing off, no new attempts
+
+        broken['on'] = False
+        session[SESSION_KEY]['retry_at'] -= 60
+        app.preprocess_request()
+        assert saved_items(db) == [(6, 1)]
+        assert 'retry_at' not in session[SESSION_KEY]
@@ -0,0 +1,111 @@
+"""
+Test cases for the cart summary cache
+Tests incremental updates, version-stamp invalidation and checkout revalidation
+"""
+
+import pytest
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from cart_summary import CartSummaryCache
+from .sqlite_standin import StandInConnection, StandInCursor, connect
+
+
+class CountingConnection(StandInConnection):
+    def __init__(self, conn):
+        super().__init__(conn.raw)
+        self.statements = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor(StandInCursor):
+            def execute(self, sql, params=()):
+                connection.statements += 1
+                return super().execute(sql, params)
+
+        return Cursor(self.raw.cursor())
+
+
+@pytest.fixture
+def db():
+    conn = CountingConnection(connect(seed=True))
+    conn.raw.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, ?, 6, ?, ?)",
+        [(1, 1, 'Lamp', 10.50), (2, 2, 'Mug', 4.25), (3, 1, 'Desk', 120)])
+    conn.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, ?)",
+                         [(1, 5), (2, 1), (3, 2)])
+    conn.raw.commit()
+    return conn
+
+
+@pytest.mark.unit
+def test_summary_totals_and_grouping(db):
+    cache = CartSummaryCache()
+    summary = cache.get(db, 'c1', [(1, 2), (2, 1), (3, 1)])
+    assert summary.subtotal == Decimal('145.25')
+    assert summary.item_count == 4
+    groups = summary.by_seller()
+    assert [(seller, [i['product_id'] for i in items], total) for seller, items, total in groups] == [
+        (1, [1, 3], Decimal('141.00')), (2, [2], Decimal('4.25'))]
+    assert not summary.has_problems
+
+@pytest.mark.unit
+def test_quantity_changes_cost_no_queries(db):
+    cache = CartSummaryCache()
+    cache.get(db, 'c1', [(1, 2), (2, 1)])
+    db.statements = 0
+
+    summary = cache.get(db, 'c1', [(1, 3)])
+    assert db.statements == 0
+    assert summary.subtotal == Decimal('31.50')
+    assert summary.seller_subtotals == {1: Decimal('31.50')}
+    assert summary.by_seller()[0][1][0]['quantity'] == 3
+
+    summary = cache.get(db, 'c1', [(1, 3), (3, 1)])
+    assert db.statements == 1
+    assert cache.stats['fetched'] == 3
+
+@pytest.mark.unit
+def test_product_edit_bumps_version(db):
+    cache = CartSummaryCache()
+    cache.get(db, 'c1', [(1, 1), (2, 1)])
+    db.raw.execute("UPDATE products SET price = 12 WHERE id = 1")
+    db.raw.commit()
+    assert cache.get(db, 'c1', [(1, 1), (2, 1)]).subtotal == Decimal('14.75')
+
+    cache.versions.bump(1)
+    db.statements = 0
+    assert cache.get(db, 'c1', [(1, 1), (2, 1)]).subtotal == Decimal('16.25')
+    assert db.statements == 1
+    assert cache.stats['fetched'] == 3
+
+@pytest.mark.unit
+def test_revalidate_reports_changes(db):
+    cache = CartSummaryCache()
+    cache.get(db, 'c1', [(1, 1), (2, 1), (3, 1)])
+    db.raw.execute("UPDATE products SET price = 9 WHERE id = 1")
+    db.raw.execute("UPDATE inventory SET quantity = 0 WHERE product_id = 2")
+    db.raw.execute("DELETE FROM products WHERE id = 3")
+    db.raw.commit()
+
+    summary, changes = cache.revalidate(db, 'c1', [(1, 1), (2, 1), (3, 1)])
+    assert changes == [1, 2, 3]
+    assert summary.subtotal == Decimal('13.25')
+    assert summary.has_problems
+    assert [line['available'] for _, items, _ in summary.by_seller() for line in items] == [True, False]
+
+@pytest.mark.unit
+def test_cache_is_bounded(db):
+    cache = CartSummaryCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.get(db, key, [(1, 1)])
+    assert len(cache) == 2
+    cache.invalidate('c')
+    assert len(cache) == 1
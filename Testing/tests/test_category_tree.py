@@ -0,0 +1,133 @@
+"""
+Test cases for the in-memory category tree
+Tests ancestor/descendant lookups, subtree counts and incremental edits
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import category_tree
+from category_tree import CategoryTree
+from flask import Flask
+from .sqlite_standin import connect
+
+# Seed categories: 1 Electronics > 6 Laptops, 7 Smartphones; 2 Clothing > 8, 9;
+# 4 Books > 10 Fiction, 11 Non-Fiction; 3 Home & Garden; 5 Sports
+
+
+@pytest.fixture
+def tree():
+    conn = connect(seed=True)
+    rows = [(1, 6, 'L1', 1), (1, 6, 'L2', 1), (1, 7, 'P1', 1), (1, 1, 'E1', 1),
+            (2, 8, 'M1', 1), (2, 8, 'M2', 0), (2, 10, 'F1', 1)]
+    conn.cursor().executemany(
+        "INSERT INTO products (seller_id, category_id, name, is_active, price) "
+        "VALUES (%s, %s, %s, %s, 10)", rows)
+    tree = CategoryTree.load(conn)
+    conn.close()
+    return tree
+
+
+def check_counts(tree):
+    """Every subtree_count equals the sum of product_count below it"""
+    for category_id in [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]:
+        if category_id in tree:
+            expected = sum(tree.get(i).product_count for i in tree.descendant_ids(category_id))
+            assert tree.subtree_count(category_id) == expected
+
+
+@pytest.mark.unit
+def test_load_builds_paths_and_counts(tree):
+    assert len(tree) == 11
+    assert tree.ancestor_ids(6) == (1, 6)
+    assert [c.name for c in tree.breadcrumbs(10)] == ['Books', 'Fiction']
+    assert tree.descendant_ids(1) == frozenset({1, 6, 7})
+    assert tree.descendant_ids(99) == frozenset()
+    assert tree.subtree_count(1) == 4
+    assert tree.subtree_count(2) == 1  # inactive product not counted
+    assert tree.subtree_count(4) == 1
+    assert tree.is_descendant(7, 1) and not tree.is_descendant(1, 7)
+    check_counts(tree)
+
+@pytest.mark.unit
+def test_menu(tree):
+    menu = tree.menu(include_empty=False)
+    assert [item['name'] for item in menu] == ['Books', 'Clothing', 'Electronics']
+    electronics = menu[2]
+    assert [(c['name'], c['subtree_count']) for c in electronics['children']] == [
+        ('Laptops', 2), ('Smartphones', 1)]
+    assert all(item['children'] == [] for item in tree.menu(max_depth=1))
+
+@pytest.mark.unit
+def test_product_count_updates_only_touch_path(tree):
+    version = tree.version
+    tree.adjust_product_count(7, 3)
+    assert tree.subtree_count(7) == 4
+    assert tree.subtree_count(1) == 7
+    tree.move_product(7, 10)
+    assert tree.subtree_count(1) == 6
+    assert tree.subtree_count(4) == 2
+    assert tree.version > version
+    check_counts(tree)
+
+@pytest.mark.unit
+def test_add_and_reparent_category(tree):
+    tree.descendant_ids(1)  # warm the cache
+    tree.add_category(12, 6, 'Gaming Laptops', 'gaming-laptops')
+    assert tree.descendant_ids(1) == frozenset({1, 6, 7, 12})
+    tree.adjust_product_count(12, 2)
+    assert tree.subtree_count(1) == 6
+
+    # Move Laptops (with its new child) under Books
+    tree.update_category(6, parent_id=4)
+    assert tree.ancestor_ids(12) == (4, 6, 12)
+    assert tree.descendant_ids(1) == frozenset({1, 7})
+    assert tree.descendant_ids(4) == frozenset({4, 6, 10, 11, 12})
+    assert tree.subtree_count(1) == 2
+    assert tree.subtree_count(4) == 5
+    check_counts(tree)
+
+    with pytest.raises(ValueError):
+        tree.update_category(4, parent_id=12)
+
+@pytest.mark.unit
+def test_rename_and_remove_category(tree):
+    tree.update_category(7, name='Phones')
+    assert [c.name for c in tree.breadcrumbs(7)] == ['Electronics', 'Phones']
+
+    tree.remove_category(1)
+    assert 1 not in tree
+    assert tree.ancestor_ids(6) == (6,)
+    assert {root.id for root in tree.roots()} >= {6, 7}
+    check_counts(tree)
+
+
+@pytest.mark.integration
+def test_failed_load_is_retried_on_a_later_request(monkeypatch):
+    monkeypatch.setattr(category_tree, 'category_tree', CategoryTree())
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database not up yet")
+        return connect(seed=True)
+
+    app = Flask(__name__)
+    app.config['CATEGORY_TREE_RETRY_SECONDS'] = 0
+    app.add_url_rule('/', 'index', lambda: 'ok')
+    category_tree.init_category_tree(app, connect=flaky_connect).join()
+    assert len(category_tree.get_category_tree()) == 0
+
+    app.test_client().get('/')
+    app.extensions['category_tree_load'].thread.join()
+    assert len(attempts) == 2
+    assert len(category_tree.get_category_tree()) == 11
+    app.test_client().get('/')
+    assert len(attempts) == 2  # loaded; no more attempts
@@ -0,0 +1,114 @@
+"""
+Test cases for the batched checkout pipeline
+Tests per-seller order splitting, totals and constant statement counts
+"""
+
+import pytest
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from checkout_pipeline import CheckoutError, build_orders, place_orders
+from inventory import InsufficientStock
+from .sqlite_standin import StandInConnection, StandInCursor, connect
+
+
+class CountingConnection(StandInConnection):
+    """Stand-in connection that counts statements sent to the database"""
+
+    def __init__(self, conn):
+        super().__init__(conn.raw)
+        self.statements = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor(StandInCursor):
+            def execute(self, sql, params=()):
+                connection.statements += 1
+                return super().execute(sql, params)
+
+            def executemany(self, sql, seq_of_params):
+                connection.statements += 1
+                return super().executemany(sql, seq_of_params)
+
+        return Cursor(self.raw.cursor())
+
+
+@pytest.fixture
+def shop():
+    """Seeded DB: products 1-100 alternate between sellers 1 and 2"""
+    conn = CountingConnection(connect(seed=True))
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, price, is_active) "
+        "VALUES (%s, %s, 6, %s, %s, %s)",
+        [(i, 1 + i % 2, f"P{i}", Decimal('9.99') + i, i != 100) for i in range(1, 101)],
+    )
+    cursor.executemany("INSERT INTO inventory (product_id, quantity) VALUES (%s, 20)",
+                       [(i,) for i in range(1, 101)])
+    cursor.execute("INSERT INTO cart (id, customer_id) VALUES (1, 4)")
+    conn.commit()
+    conn.statements = 0
+    return conn
+
+
+def count(conn, sql):
+    return conn.raw.execute(sql).fetchone()[0]
+
+
+@pytest.mark.unit
+def test_build_orders_groups_by_seller():
+    products = {1: (10, Decimal('5.00'), True), 2: (20, Decimal('2.50'), True), 3: (10, Decimal('1.25'), True)}
+    orders = build_orders([(1, 2), (2, 1), (3, 4)], products, tax_rate='0.1', shipping_cost='3')
+    assert [o['seller_id'] for o in orders] == [10, 20]
+    assert orders[0]['subtotal'] == Decimal('15.00')
+    assert orders[0]['tax'] == Decimal('1.50')
+    assert orders[0]['total'] == Decimal('19.50')
+    assert orders[1]['total'] == Decimal('5.75')
+    assert orders[0]['order_number'] != orders[1]['order_number']
+
+    with pytest.raises(CheckoutError):
+        build_orders([(9, 1)], products)
+
+@pytest.mark.unit
+def test_place_orders_from_cart(shop):
+    shop.cursor().executemany("INSERT INTO cart_items (cart_id, product_id, quantity) VALUES (1, %s, %s)",
+                              [(1, 2), (2, 1), (3, 3)])
+    shop.commit()
+
+    orders = place_orders(shop, customer_id=4, shipping_address_id=1, cart_id=1, payment_method='paypal')
+
+    assert [(o['seller_id'], len(o['items'])) for o in orders] == [(1, 1), (2, 2)]
+    assert count(shop, "SELECT COUNT(*) FROM orders") == 2
+    assert count(shop, "SELECT COUNT(*) FROM order_items") == 3
+    assert count(shop, "SELECT COUNT(*) FROM payments WHERE payment_method = 'paypal'") == 2
+    assert count(shop, "SELECT COUNT(*) FROM cart_items") == 0
+    assert count(shop, "SELECT quantity FROM inventory WHERE product_id = 3") == 17
+    for order in orders:
+        stored = shop.raw.execute("SELECT total FROM orders WHERE id = ?", (order['id'],)).fetchone()[0]
+        assert Decimal(str(stored)) == order['total']
+
+@pytest.mark.unit
+@pytest.mark.parametrize("size", [1, 10, 99])
+def test_statement_count_is_constant(shop, size):
+    place_orders(shop, 4, 1, lines=[(i, 1) for i in range(1, size + 1)])
+    assert shop.statements == 6
+    assert count(shop, "SELECT COUNT(*) FROM order_items") == size
+
+@pytest.mark.unit
+def test_failure_rolls_back_everything(shop):
+    with pytest.raises(InsufficientStock) as error:
+        place_orders(shop, 4, 1, lines=[(1, 1), (2, 25)])
+    assert error.value.product_id == 2
+    with pytest.raises(CheckoutError):
+        place_orders(shop, 4, 1, lines=[(1, 1), (100, 1)])  # inactive product
+    with pytest.raises(CheckoutError):
+        place_orders(shop, 4, 1, lines=[])
+    assert count(shop, "SELECT COUNT(*) FROM orders") == 0
+    assert count(shop, "SELECT SUM(quantity) FROM inventory") == 2000
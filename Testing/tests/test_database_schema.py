@@ -4,7 +4,6 @@ Validates database creation and table structures
 """
 
 import pytest
-import os
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
@@ -26,23 +25,15 @@ except ImportError:
     except ImportError:
         pytest.skip("PyMySQL not installed", allow_module_level=True)
 
+from .template_db import mysql_test_database, test_database_name
+
 
 @pytest.fixture(scope="module")
-def db_connection():
-    """Create database connection for testing"""
-    host = os.getenv("MYSQL_HOST", "localhost")
-    user = os.getenv("MYSQL_USER", "root")
-    password = os.getenv("MYSQL_PASSWORD", "")
-    db_name = os.getenv("MYSQL_DB", "ecommerce_db")
-    
+def db_connection(mysql_test_database):
+    """Connection to this worker's clone of the template database"""
+    _, settings = mysql_test_database
     try:
-        conn = MySQLdb.connect(
-            host=host,
-            user=user,
-            passwd=password,
-            db=db_name,
-            charset='utf8mb4'
-        )
+        conn = MySQLdb.connect(**settings)
         yield conn
         conn.close()
     except MySQLdb.Error as e:
@@ -68,7 +59,7 @@ class TestDatabaseExistence:
         cursor.execute("SELECT DATABASE()")
         db_name = cursor.fetchone()[0]
         assert db_name is not None
-        assert db_name == os.getenv("MYSQL_DB", "ecommerce_db")
+        assert db_name == test_database_name()
         cursor.close()
     
     def test_database_connection_works(self, db_connection):
@@ -0,0 +1,139 @@
+"""
+Test cases for the pooled DB connections behind get_db_connection
+Uses SQLite connections as a stand-in for MySQL
+"""
+
+import pytest
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from flask import Flask
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from db_pool import ConnectionPool, PoolTimeout, get_db_connection, init_pool
+
+
+def sqlite_connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+@pytest.mark.unit
+def test_connections_are_reused():
+    """Closing a pooled connection returns it instead of disconnecting"""
+    pool = ConnectionPool(sqlite_connect, max_size=2)
+    conn = pool.acquire()
+    raw = conn.raw
+    conn.close()
+    conn.close()  # second close is a no-op
+    assert pool.acquire().raw is raw
+    metrics = pool.metrics()
+    assert metrics['created'] == 1
+    assert metrics['checkouts'] == 2
+    assert metrics['in_use'] == 1
+
+@pytest.mark.unit
+def test_pool_is_bounded():
+    """Checkouts beyond max_size wait, then time out"""
+    pool = ConnectionPool(sqlite_connect, max_size=1, acquire_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    def release_later():
+        time.sleep(0.02)
+        held.close()
+
+    pool.acquire_timeout = 1.0
+    threading.Thread(target=release_later).start()
+    conn = pool.acquire()
+    assert conn.raw is not None
+    metrics = pool.metrics()
+    assert metrics['size'] == 1
+    assert metrics['waits'] == 1
+    assert metrics['max_wait_time'] > 0
+
+@pytest.mark.unit
+def test_concurrent_checkouts_never_exceed_max_size():
+    """Many threads share a small pool without over-allocating"""
+    pool = ConnectionPool(sqlite_connect, max_size=3, acquire_timeout=5)
+    peak = []
+
+    def worker():
+        for _ in range(20):
+            with pool.acquire() as conn:
+                conn.execute("SELECT 1")
+                peak.append(pool.metrics()['size'])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) <= 3
+    assert pool.metrics()['checkouts'] == 160
+
+@pytest.mark.unit
+def test_idle_timeout_and_max_lifetime_recycle():
+    """Stale connections are closed and replaced"""
+    pool = ConnectionPool(sqlite_connect, idle_timeout=0.01)
+    first = pool.acquire()
+    raw = first.raw
+    first.close()
+    time.sleep(0.02)
+    assert pool.acquire().raw is not raw
+    assert pool.metrics()['recycled'] == 1
+
+    pool = ConnectionPool(sqlite_connect, max_lifetime=0.01, idle_timeout=0)
+    conn = pool.acquire()
+    time.sleep(0.02)
+    conn.close()
+    assert pool.metrics()['idle'] == 0
+
+@pytest.mark.unit
+def test_failed_health_check_drops_connection():
+    """A connection that fails its health check is never handed out"""
+    broken = set()
+
+    def health_check(conn):
+        if id(conn) in broken:
+            raise sqlite3.OperationalError("gone away")
+
+    pool = ConnectionPool(sqlite_connect, health_check=health_check,
+                          health_check_interval=0)
+    conn = pool.acquire()
+    raw = conn.raw
+    broken.add(id(raw))
+    conn.close()
+    assert pool.acquire().raw is not raw
+    assert pool.metrics()['failed_health_checks'] == 1
+
+@pytest.mark.unit
+def test_release_rolls_back_open_transaction(tmp_path):
+    """Uncommitted work is rolled back before the connection is reused"""
+    path = str(tmp_path / "pool.db")
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))
+    with pool.acquire() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pool.acquire() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+@pytest.mark.unit
+def test_connections_returned_on_app_context_teardown():
+    """get_db_connection hands back pooled connections at teardown"""
+    app = Flask(__name__)
+    pool = init_pool(app, connect=sqlite_connect)
+    with app.app_context():
+        get_db_connection()
+        get_db_connection().close()
+        assert pool.metrics()['in_use'] == 1
+    metrics = pool.metrics()
+    assert metrics['in_use'] == 0
+    assert metrics['idle'] == 2
@@ -0,0 +1,122 @@
+"""
+Test cases for read-replica routing in utils
+Two SQLite databases stand in for the MySQL primary and replica
+"""
+
+import pytest
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from flask import Flask
+
+import utils
+from utils import DBRouter, get_db_connection, set_db_connection_func
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Primary and replica stand-ins that identify themselves"""
+    factories = {}
+    for name in ('primary', 'replica'):
+        path = str(tmp_path / f"{name}.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE marker (name TEXT)")
+        conn.execute("INSERT INTO marker VALUES (?)", (name,))
+        conn.commit()
+        conn.close()
+        factories[name] = lambda path=path: sqlite3.connect(path)
+    return factories
+
+
+def served_by(conn):
+    try:
+        return conn.execute("SELECT name FROM marker").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def write(conn):
+    """Commit on conn, as a view saving something would; returns who served it"""
+    conn.commit()
+    return served_by(conn)
+
+
+@pytest.mark.unit
+def test_reads_go_to_replica_writes_to_primary(databases):
+    """readonly=True uses the replica, everything else the primary"""
+    router = DBRouter(databases['primary'], databases['replica'])
+    assert served_by(router.connection(readonly=True)) == 'replica'
+    assert served_by(router.connection()) == 'primary'
+    assert router.stats == {'primary': 1, 'replica': 1, 'sticky': 0}
+
+@pytest.mark.unit
+def test_read_your_writes_stickiness(databases):
+    """A user's reads stay on the primary for a short window after a write"""
+    clock = FakeClock()
+    router = DBRouter(databases['primary'], databases['replica'],
+                      sticky_seconds=5, clock=clock)
+
+    # A primary connection that only reads does not start the window
+    served_by(router.connection(user_key='7'))
+    assert served_by(router.connection(readonly=True, user_key='7')) == 'replica'
+
+    write(router.connection(user_key='7'))
+    assert served_by(router.connection(readonly=True, user_key='7')) == 'primary'
+    # Other users are unaffected
+    assert served_by(router.connection(readonly=True, user_key='8')) == 'replica'
+
+    clock.now += 5
+    assert served_by(router.connection(readonly=True, user_key='7')) == 'replica'
+    assert router.stats['sticky'] == 1
+
+@pytest.mark.unit
+def test_stickiness_follows_the_user_across_workers(databases, monkeypatch):
+    """The window lives in the session, so another worker's router honours it"""
+    monkeypatch.setattr(utils, 'current_user_key', lambda: '7')
+    clock = FakeClock()
+    workers = [DBRouter(databases['primary'], databases['replica'], sticky_seconds=5, clock=clock)
+               for _ in range(2)]
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.add_url_rule('/write', 'write', lambda: write(workers[0].connection()))
+    app.add_url_rule('/read', 'read', lambda: served_by(workers[1].connection(readonly=True)))
+
+    client = app.test_client()
+    assert client.get('/read').data == b'replica'
+    assert client.get('/write').data == b'primary'
+    assert client.get('/read').data == b'primary'
+    assert app.test_client().get('/read').data == b'replica'  # another browser
+    clock.now += 5
+    assert client.get('/read').data == b'replica'
+    assert workers[0]._sticky_until == {} and workers[1].stats['sticky'] == 1
+
+@pytest.mark.unit
+def test_without_replica_everything_uses_primary(databases):
+    """Single-database setups keep working unchanged"""
+    router = DBRouter(databases['primary'])
+    assert served_by(router.connection(readonly=True)) == 'primary'
+
+@pytest.mark.unit
+def test_module_level_get_db_connection(databases, monkeypatch):
+    """set_db_connection_func installs the router used by get_db_connection"""
+    monkeypatch.setattr(utils, '_db_router', None)
+    with pytest.raises(RuntimeError):
+        get_db_connection()
+
+    set_db_connection_func(databases['primary'], databases['replica'])
+    assert served_by(get_db_connection(readonly=True)) == 'replica'
+    assert served_by(get_db_connection()) == 'primary'
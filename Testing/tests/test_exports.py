@@ -0,0 +1,137 @@
+"""
+Test cases for streaming order/sales exports
+Tests RBAC scoping, CSV and xlsx encoding and bounded memory while streaming
+"""
+
+import csv
+import io
+import pytest
+import sys
+import tracemalloc
+import zipfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from xml.etree import ElementTree
+
+from flask import Flask
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from exports import (ExportForbidden, build_export_query, csv_chunks, export_response,
+                     export_scope, stream_rows)
+from .sqlite_standin import StandInConnection, connect
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+class Borrowed(StandInConnection):
+    """Shares the test database; close() is recorded instead of closing"""
+
+    closed = 0
+
+    def close(self):
+        Borrowed.closed += 1
+
+
+def seed_orders(conn, count):
+    conn.raw.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, sku, price) VALUES (?, ?, 6, ?, ?, 5)",
+        [(1, 1, 'Lamp', 'L-1'), (2, 2, 'Mug & <Cup>', 'M-1')])
+    conn.raw.executemany(
+        "INSERT INTO orders (id, order_number, customer_id, seller_id, shipping_address_id, "
+        "subtotal, total, created_at) VALUES (?, ?, 4, ?, 1, 10, 10.5, ?)",
+        [(i, f"ORD-{i:06d}", 1 + i % 2, f"2024-03-{1 + i % 28:02d} 12:00:00") for i in range(1, count + 1)])
+    conn.raw.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, price, subtotal) VALUES (?, ?, 2, 5, 10)",
+        [(i, 1 + i % 2) for i in range(1, count + 1)])
+    conn.raw.commit()
+
+
+@pytest.fixture
+def db():
+    conn = connect(seed=True)
+    seed_orders(conn, 40)
+    return conn
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.mark.unit
+def test_scope_follows_rbac(db):
+    assert export_scope(db, 'admin', 1, 'orders') is None
+    assert export_scope(db, 'admin', 1, 'sales') is None
+    assert export_scope(db, 'seller', 3, 'orders') == 2
+    with pytest.raises(ExportForbidden):
+        export_scope(db, 'customer', 4, 'orders')
+    with pytest.raises(ExportForbidden):
+        export_scope(db, 'seller', 4, 'sales')
+
+@pytest.mark.unit
+def test_csv_export_is_limited_to_the_sellers_orders(db, app):
+    with app.test_request_context():
+        response = export_response(lambda: Borrowed(db.raw), 'seller', 2, 'orders')
+        body = b''.join(response.response).decode()
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0][0] == 'order_number'
+    assert len(rows) == 21
+    assert {row[4] for row in rows[1:]} == {'Tech Store'}
+    assert 'attachment; filename="orders-' in response.headers['Content-Disposition']
+    assert Borrowed.closed >= 1
+
+@pytest.mark.unit
+def test_xlsx_export_is_a_valid_workbook(db, app):
+    with app.test_request_context():
+        response = export_response(lambda: Borrowed(db.raw), 'admin', 1, 'sales', fmt='xlsx',
+                                   start=date(2024, 3, 2), end=date(2024, 3, 2))
+        body = b''.join(response.response)
+    archive = zipfile.ZipFile(io.BytesIO(body))
+    assert 'xl/workbook.xml' in archive.namelist()
+    sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    rows = sheet.iter(f'{SHEET_NS}row')
+    header = [t.text for t in next(rows).iter(f'{SHEET_NS}t')]
+    assert header[:3] == ['order_number', 'created_at', 'status']
+    data = list(rows)
+    assert len(data) == 2
+    assert 'Mug & <Cup>' in {t.text for row in data for t in row.iter(f'{SHEET_NS}t')}
+
+@pytest.mark.unit
+def test_csv_neutralizes_formulas():
+    rows = [('=HYPERLINK("http://evil.example","x")', '+1', '-2+3', '@SUM(A1)', '\tcmd', 'Lamp',
+             Decimal('-5.00'), -3)]
+    data = b''.join(csv_chunks(('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h'), rows)).decode('utf-8')
+    cells = list(csv.reader(io.StringIO(data)))[1]
+    assert cells == ["'=HYPERLINK(\"http://evil.example\",\"x\")", "'+1", "'-2+3", "'@SUM(A1)",
+                     "'\tcmd", 'Lamp', '-5.00', '-3']
+
+@pytest.mark.unit
+def test_streaming_memory_does_not_grow_with_rows():
+    def peak(count):
+        conn = connect(seed=True)
+        seed_orders(conn, count)
+        sql, params = build_export_query('sales')
+        tracemalloc.start()
+        size = 0
+        for chunk in csv_chunks(('a',), stream_rows(conn, sql, params)):
+            size += len(chunk)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size, peak_bytes
+
+    small_size, small_peak = peak(5000)
+    large_size, large_peak = peak(50000)
+    assert large_size > 9 * small_size
+    assert large_peak < 2 * small_peak
+
+@pytest.mark.unit
+def test_unknown_format_or_report(db):
+    with pytest.raises(ValueError):
+        export_scope(db, 'admin', 1, 'payroll')
+    with pytest.raises(ValueError):
+        export_response(lambda: db, 'admin', 1, 'orders', fmt='pdf')
@@ -0,0 +1,196 @@
+"""
+Test cases for the inventory reservation engine
+Includes a concurrent checkout stress test asserting zero oversells
+"""
+
+import pytest
+import random
+import sys
+import threading
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import inventory
+from flask import Flask
+
+from inventory import InsufficientStock, ReservationManager, reserve_stock, restock
+from .sqlite_standin import connect
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """File-backed stand-in DB with 5 products in stock"""
+    path = str(tmp_path / "shop.db")
+    conn = connect(path, seed=True)
+    cursor = conn.cursor()
+    for product_id, stock in [(1, 50), (2, 30), (3, 10), (4, 5), (5, 1)]:
+        cursor.execute(
+            "INSERT INTO products (id, seller_id, category_id, name, price) VALUES (%s, 1, 6, %s, 10)",
+            (product_id, f"Product {product_id}"))
+        cursor.execute("INSERT INTO inventory (product_id, quantity) VALUES (%s, %s)", (product_id, stock))
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def holds_path(tmp_path):
+    return str(tmp_path / "holds.sqlite3")
+
+
+def stock(conn):
+    return dict(conn.raw.execute("SELECT product_id, quantity FROM inventory").fetchall())
+
+
+@pytest.mark.unit
+def test_reserve_is_all_or_nothing(db_path):
+    conn = connect(db_path, schema=False)
+    assert reserve_stock(conn, {2: 3, 1: 2}) == [(1, 2), (2, 3)]
+    assert stock(conn)[1] == 48
+
+    with pytest.raises(InsufficientStock) as error:
+        reserve_stock(conn, [(1, 1), (5, 2)])
+    assert error.value.product_id == 5
+    assert stock(conn)[1] == 48  # product 1 rolled back too
+
+    restock(conn, {1: 2, 2: 3})
+    assert stock(conn)[1] == 50
+
+@pytest.mark.unit
+def test_invalid_quantities_rejected(db_path):
+    conn = connect(db_path, schema=False)
+    with pytest.raises(ValueError):
+        reserve_stock(conn, {1: 0})
+
+@pytest.mark.unit
+def test_holds_confirm_release_and_expire(db_path, holds_path):
+    conn = connect(db_path, schema=False)
+    clock = FakeClock()
+    manager = ReservationManager(hold_seconds=60, clock=clock, path=holds_path)
+
+    kept = manager.start_checkout(conn, {3: 4}, owner=7)
+    cancelled = manager.start_checkout(conn, {3: 2})
+    abandoned = manager.start_checkout(conn, {3: 3})
+    assert stock(conn)[3] == 1
+
+    assert manager.confirm(kept.id).items == [(3, 4)]
+    manager.release(conn, cancelled.id)
+    assert stock(conn)[3] == 3
+
+    clock.now = 59
+    assert manager.release_expired(conn) == 0
+    clock.now = 60
+    assert manager.release_expired(conn) == 1
+    assert stock(conn)[3] == 6
+    assert manager.confirm(abandoned.id) is None
+    assert len(manager) == 0
+
+@pytest.mark.unit
+def test_holds_are_shared_between_workers(db_path, holds_path):
+    """A hold left by a crashed worker is confirmed or reaped by another one"""
+    conn = connect(db_path, schema=False)
+    clock = FakeClock()
+    crashed = ReservationManager(hold_seconds=60, clock=clock, path=holds_path)
+    placed = crashed.start_checkout(conn, {3: 4}, owner=7)
+    crashed.start_checkout(conn, {4: 5})
+    del crashed
+    assert stock(conn)[3] == 6 and stock(conn)[4] == 0
+
+    survivor = ReservationManager(hold_seconds=60, clock=clock, path=holds_path)
+    assert len(survivor) == 2
+    assert survivor.get(placed.id).owner == 7
+    assert survivor.confirm(placed.id).items == [(3, 4)]
+    clock.now = 60
+    assert survivor.release_expired(conn) == 1
+    assert stock(conn)[3] == 6 and stock(conn)[4] == 5
+    assert len(survivor) == 0
+
+@pytest.mark.unit
+def test_background_sweeper_releases_expired_holds(db_path, holds_path):
+    clock = FakeClock()
+    manager = ReservationManager(hold_seconds=1, clock=clock, path=holds_path)
+    conn = connect(db_path, schema=False)
+    manager.start_checkout(conn, {4: 5})
+    clock.now = 5
+    manager.start_sweeper(lambda: connect(db_path, schema=False), interval=0.01)
+    try:
+        for _ in range(200):
+            if len(manager) == 0:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        manager.stop_sweeper()
+    assert stock(conn)[4] == 5
+
+@pytest.mark.unit
+def test_init_reservations_sweeps_the_instance_store(db_path, tmp_path, monkeypatch):
+    """The app hook keeps holds in the instance folder and starts the sweeper"""
+    manager = ReservationManager()
+    monkeypatch.setattr(inventory, 'reservations', manager)
+    monkeypatch.delenv('INVENTORY_HOLDS_PATH', raising=False)
+    app = Flask(__name__, instance_path=str(tmp_path / "instance"))
+    app.config.update(TESTING=True, INVENTORY_SWEEPER=True, INVENTORY_SWEEP_SECONDS=0.01,
+                      INVENTORY_HOLD_SECONDS=0)
+    assert inventory.init_reservations(app, lambda: connect(db_path, schema=False)) is manager
+    try:
+        assert manager.path == str(tmp_path / "instance" / "inventory_holds.sqlite3")
+        conn = connect(db_path, schema=False)
+        manager.start_checkout(conn, {4: 5})
+        for _ in range(200):
+            if len(manager) == 0:
+                break
+            threading.Event().wait(0.01)
+        assert stock(conn)[4] == 5
+    finally:
+        manager.stop_sweeper()
+
+@pytest.mark.integration
+def test_concurrent_checkouts_never_oversell(db_path, holds_path):
+    """300 parallel multi-item checkouts compete for 96 units"""
+    initial = stock(connect(db_path, schema=False))
+    manager = ReservationManager(path=holds_path)
+    successes = []
+    failures = []
+    start = threading.Barrier(300)
+
+    def checkout(seed):
+        rng = random.Random(seed)
+        items = {product_id: rng.randint(1, 3) for product_id in rng.sample([1, 2, 3, 4, 5], rng.randint(1, 3))}
+        conn = connect(db_path, schema=False, timeout=60)
+        start.wait()
+        try:
+            hold = manager.start_checkout(conn, items)
+            if seed % 4 == 0:
+                manager.release(conn, hold.id)
+            else:
+                manager.confirm(hold.id)
+                successes.append(items)
+        except InsufficientStock:
+            failures.append(items)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(300)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    final = stock(connect(db_path, schema=False))
+    assert all(quantity >= 0 for quantity in final.values())
+    for product_id, quantity in initial.items():
+        sold = sum(items.get(product_id, 0) for items in successes)
+        assert final[product_id] == quantity - sold
+    assert failures  # demand exceeded stock, so some checkouts must have failed
@@ -0,0 +1,227 @@
+"""
+Test cases for the background job queue
+Tests idempotent enqueue, retries with backoff, inline mode and post-checkout jobs
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import jobs
+import sales_rollup
+import utils
+from cart_store import SessionCart
+from checkout_pipeline import place_orders
+from jobs import JOB_HANDLERS, JobQueue, WorkerPool, backoff_delay, enqueue_post_checkout
+from .sqlite_standin import StandInConnection, connect
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Register a 'record' job that fails while calls['fail'] > 0"""
+    calls = {'seen': [], 'fail': 0}
+
+    def record(payload):
+        calls['seen'].append(payload['n'])
+        if calls['fail']:
+            calls['fail'] -= 1
+            raise RuntimeError("temporary failure")
+
+    monkeypatch.setitem(JOB_HANDLERS, 'record', record)
+    return calls
+
+
+@pytest.fixture
+def queue(tmp_path):
+    clock = Clock()
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), clock=clock)
+    queue.clock = clock
+    return queue
+
+
+@pytest.mark.unit
+def test_enqueue_is_idempotent_per_key(queue, calls):
+    first = queue.enqueue('record', {'n': 1}, key='record:ORD-1')
+    assert queue.enqueue('record', {'n': 1}, key='record:ORD-1') == first
+    queue.enqueue('record', {'n': 2}, key='record:ORD-2')
+    assert queue.counts() == {'queued': 2}
+
+    assert queue.run_pending() == 2
+    assert calls['seen'] == [1, 2]
+    # Still deduplicated after the job has finished
+    assert queue.enqueue('record', {'n': 1}, key='record:ORD-1') == first
+    assert queue.run_pending() == 0
+
+
+@pytest.mark.unit
+def test_unknown_job_is_rejected(queue):
+    with pytest.raises(KeyError):
+        queue.enqueue('no_such_job')
+
+
+@pytest.mark.unit
+def test_failed_job_retries_with_backoff(queue, calls, monkeypatch):
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: high)
+    calls['fail'] = 2
+    job_id = queue.enqueue('record', {'n': 7}, max_attempts=3)
+
+    assert queue.run_pending() == 1
+    assert queue.get(job_id)['status'] == 'queued'
+    assert queue.run_pending() == 0  # not due yet
+
+    queue.clock.now += backoff_delay(1)
+    assert queue.run_pending() == 1
+    queue.clock.now += backoff_delay(2)
+    assert queue.run_pending() == 1
+    assert queue.get(job_id) == {'status': 'done', 'attempts': 3, 'last_error': None}
+
+
+@pytest.mark.unit
+def test_job_fails_permanently_after_max_attempts(queue, calls):
+    calls['fail'] = 5
+    job_id = queue.enqueue('record', {'n': 1}, max_attempts=2)
+    queue.run_pending()
+    queue.clock.now += 3600
+    queue.run_pending()
+    state = queue.get(job_id)
+    assert state['status'] == 'failed' and state['attempts'] == 2
+    assert 'temporary failure' in state['last_error']
+    queue.clock.now += 3600
+    assert queue.run_pending() == 0
+
+
+@pytest.mark.unit
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(jobs.random, 'uniform', lambda low, high: high)
+    assert [backoff_delay(n) for n in (1, 2, 3)] == [2.0, 4.0, 8.0]
+    assert backoff_delay(30) == jobs.BACKOFF_MAX
+
+
+@pytest.mark.unit
+def test_stale_running_job_is_reclaimed(queue, calls):
+    queue.enqueue('record', {'n': 1})
+    assert len(queue.claim('dead-worker')) == 1
+    assert queue.claim('other') == []
+    queue.clock.now += queue.visibility_timeout
+    assert len(queue.claim('other')) == 1
+
+
+@pytest.mark.unit
+def test_job_that_keeps_losing_its_worker_fails(queue, calls):
+    job_id = queue.enqueue('record', {'n': 1}, max_attempts=2)
+    for attempt in (1, 2):
+        [job] = queue.claim(f"worker-{attempt}")
+        assert job.attempts == attempt
+        queue.clock.now += queue.visibility_timeout
+    assert queue.claim('worker-3') == []
+    state = queue.get(job_id)
+    assert state['status'] == 'failed' and state['attempts'] == 2
+    assert 'worker lost' in state['last_error']
+
+
+@pytest.mark.unit
+def test_slow_worker_cannot_overwrite_reclaimed_job(queue, calls):
+    job_id = queue.enqueue('record', {'n': 1})
+    [slow] = queue.claim('slow')
+    queue.clock.now += queue.visibility_timeout
+    [retry] = queue.claim('fast')
+    assert queue.run(retry)
+    assert not queue.fail(slow, 'timed out') and not queue.complete(slow)
+    assert queue.get(job_id) == {'status': 'done', 'attempts': 2, 'last_error': None}
+
+
+@pytest.mark.unit
+def test_inline_mode_runs_immediately(calls):
+    queue = JobQueue(inline=True)
+    queue.enqueue('record', {'n': 1}, key='record:ORD-1')
+    queue.enqueue('record', {'n': 1}, key='record:ORD-1')
+    assert calls['seen'] == [1]
+    calls['fail'] = 1
+    with pytest.raises(RuntimeError):
+        queue.enqueue('record', {'n': 2})
+
+
+@pytest.mark.integration
+def test_worker_pool_drains_queue(queue, calls):
+    for n in range(20):
+        queue.enqueue('record', {'n': n}, key=f"record:{n}")
+    queue.clock.now += 1
+    pool = WorkerPool(queue, concurrency=4, poll_interval=0.01)
+    pool.start()
+    try:
+        for _ in range(500):
+            if queue.counts() == {'done': 20}:
+                break
+            pool._stop.wait(0.01)
+    finally:
+        pool.stop()
+    assert queue.counts() == {'done': 20}
+    assert sorted(calls['seen']) == list(range(20))
+
+
+@pytest.mark.integration
+def test_post_checkout_jobs_generate_invoice(queue, monkeypatch):
+    db = connect(seed=True)
+    db.raw.executemany("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, ?, 6, ?, 5)",
+                       [(1, 1, 'A'), (2, 2, 'B')])
+    db.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, 10)", [(1,), (2,)])
+
+    class Borrowed(StandInConnection):
+        def close(self):
+            pass
+
+    monkeypatch.setattr(utils, '_db_router', None)
+    utils.set_db_connection_func(lambda: Borrowed(db.raw))
+
+    orders = place_orders(db, 4, 1, lines=[(1, 1), (2, 1)])
+    ids = enqueue_post_checkout(queue, orders)
+    assert len(ids) == 6
+    assert enqueue_post_checkout(queue, orders) == ids  # a retried checkout queues nothing new
+
+    assert queue.run_pending() == 6
+    invoices = db.raw.execute("SELECT o.order_number, p.invoice_number FROM payments p "
+                              "JOIN orders o ON o.id = p.order_id").fetchall()
+    assert len(invoices) == 2
+    assert all(invoice == number.replace('ORD-', 'INV-') for number, invoice in invoices)
+
+@pytest.mark.integration
+def test_cart_checkout_queues_follow_up_work(queue, monkeypatch):
+    """Checkout returns with the invoice, confirmation and rollup work queued"""
+    db = connect(seed=True)
+    db.raw.executemany("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, ?, 6, ?, 5)",
+                       [(1, 1, 'A'), (2, 2, 'B')])
+    db.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, 10)", [(1,), (2,)])
+
+    class Borrowed(StandInConnection):
+        def close(self):
+            pass
+
+    monkeypatch.setattr(utils, '_db_router', None)
+    utils.set_db_connection_func(lambda: Borrowed(db.raw))
+    rollup = sales_rollup.SalesRollup()
+    rollup.backfill(db)
+    monkeypatch.setattr(sales_rollup, 'sales_rollup', rollup)
+
+    cart = SessionCart({})
+    cart.add(1)
+    cart.add(2)
+    orders = cart.checkout(db, 4, 1, queue=queue)
+    assert len(orders) == 2 and cart.items() == []
+    assert queue.counts() == {'queued': 6}
+    assert rollup.totals()['orders'] == 0
+
+    assert queue.run_pending() == 6
+    assert rollup.totals() == {'orders': 2, 'sales': sum(order['total'] for order in orders)}
@@ -0,0 +1,93 @@
+"""
+Test cases for the order history batch loaders
+Tests fixed query counts per page, scoping and batch loader caching
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from order_loaders import BatchLoader, order_detail, order_history
+from .sqlite_standin import StandInConnection, StandInCursor, connect
+
+
+class CountingConnection(StandInConnection):
+    def __init__(self, conn):
+        super().__init__(conn.raw)
+        self.statements = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor(StandInCursor):
+            def execute(self, sql, params=()):
+                connection.statements += 1
+                return super().execute(sql, params)
+
+        return Cursor(self.raw.cursor())
+
+
+@pytest.fixture
+def db():
+    """60 orders alternating customers 4/5 and sellers 1/2, three items each"""
+    conn = CountingConnection(connect(seed=True))
+    conn.raw.executemany("INSERT INTO products (id, seller_id, category_id, name, sku, price) VALUES (?, 1, 6, ?, ?, 3)",
+                         [(i, f"P{i}", f"SKU-{i}") for i in range(1, 21)])
+    conn.raw.executemany(
+        "INSERT INTO orders (id, order_number, customer_id, seller_id, shipping_address_id, subtotal, total) "
+        "VALUES (?, ?, ?, ?, 1, 9, 9)",
+        [(i, f"ORD-{i}", 4 + i % 2, 1 + i % 2) for i in range(1, 61)])
+    conn.raw.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, price, subtotal) VALUES (?, ?, 1, 3, 3)",
+        [(i, (i + k) % 20 + 1) for i in range(1, 61) for k in range(3)])
+    conn.raw.executemany(
+        "INSERT INTO payments (order_id, amount, payment_method, status) VALUES (?, 9, 'paypal', ?)",
+        [(i, status) for i in range(1, 61, 2) for status in ('failed', 'completed')])
+    conn.raw.commit()
+    return conn
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("limit", [1, 10, 60])
+def test_page_query_count_is_fixed(db, limit):
+    orders = order_history(db, limit=limit)
+    assert len(orders) == limit
+    assert db.statements == 4
+    assert all(len(order['items']) == 3 for order in orders)
+
+@pytest.mark.unit
+def test_orders_carry_items_products_and_payment(db):
+    orders = order_history(db, customer_id=4, limit=5)
+    assert [o['id'] for o in orders] == [60, 58, 56, 54, 52]
+    assert all(o['customer_id'] == 4 for o in orders)
+    assert orders[0]['items'][0]['name'].startswith('P')
+    assert orders[0]['payment'] is None
+
+    seller_orders = order_history(db, seller_id=2, before_id=10, limit=3)
+    assert [o['id'] for o in seller_orders] == [9, 7, 5]
+    assert seller_orders[0]['payment']['status'] == 'completed'
+
+@pytest.mark.unit
+def test_order_detail_respects_owner(db):
+    assert order_detail(db, 3, customer_id=5)['order_number'] == 'ORD-3'
+    assert order_detail(db, 3, customer_id=4) is None
+    assert order_detail(db, 3, seller_id=1) is None
+    assert len(order_detail(db, 3)['items']) == 3
+
+@pytest.mark.unit
+def test_batch_loader_caches_and_chunks():
+    calls = []
+
+    def fetch(keys):
+        calls.append(list(keys))
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = BatchLoader(fetch, default='missing', max_batch_size=2)
+    assert loader.load_many([1, 2, 3, 1]) == {1: 10, 2: 20, 3: 'missing'}
+    assert loader.load(2) == 20
+    assert calls == [[1, 2], [3]]
@@ -0,0 +1,156 @@
+"""
+Test cases for the product detail read-through cache
+Tests LRU/TTL behaviour, the shared tier, single-flight loading and invalidation
+"""
+
+import pytest
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import category_tree
+import utils
+from product_cache import DictBackend, LocalLRU, ProductDetailCache, ReadThroughCache
+from .sqlite_standin import connect
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_local_lru_evicts_and_expires():
+    clock = FakeClock()
+    lru = LocalLRU(max_entries=2, clock=clock)
+    lru.set('a', 1, ttl=10)
+    lru.set('b', 2, ttl=10)
+    assert lru.get('a') == 1
+    lru.set('c', 3, ttl=10)
+    assert lru.get('b') is None and lru.get('a') == 1
+    clock.now += 10
+    assert lru.get('a') is None and len(lru) == 1
+
+@pytest.mark.unit
+def test_shared_tier_is_filled_and_read():
+    clock = FakeClock()
+    backend = DictBackend(clock)
+    first = ReadThroughCache(backend, ttl=60, local_ttl=5, clock=clock)
+    second = ReadThroughCache(backend, ttl=60, local_ttl=5, clock=clock)
+    assert first.get('k', lambda: {'v': 1}) == {'v': 1}
+    assert second.get('k', lambda: pytest.fail("should come from the shared tier")) == {'v': 1}
+    assert second.stats['shared_hits'] == 1
+
+    clock.now += 60
+    assert second.get('k', lambda: {'v': 2}) == {'v': 2}
+    first.invalidate('k')
+    assert backend.get('cache:k') is None
+
+@pytest.mark.unit
+def test_single_flight_loads_once():
+    cache = ReadThroughCache()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('hot', loader)))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    while cache.stats['waits'] < 19:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ['value'] * 20
+
+@pytest.mark.unit
+def test_invalidate_during_load_is_not_overwritten():
+    backend = DictBackend()
+    cache = ReadThroughCache(backend)
+
+    def loader():
+        cache.invalidate('k')  # the product is edited while its old row is being read
+        return 'old'
+
+    assert cache.get('k', loader) == 'old'
+    assert backend.get('cache:k') is None and cache.local.get('k') is None
+    assert cache.get('k', lambda: 'new') == 'new'
+    assert cache.get('k', lambda: pytest.fail("should be cached")) == 'new'
+    assert cache._generations == {}
+
+@pytest.mark.unit
+def test_loader_errors_reach_every_waiter():
+    cache = ReadThroughCache()
+    with pytest.raises(ZeroDivisionError):
+        cache.get('k', lambda: 1 / 0)
+    assert cache.get('k', lambda: 'ok') == 'ok'
+
+@pytest.mark.integration
+def test_product_details_and_invalidation(monkeypatch):
+    db = connect(seed=True)
+    db.raw.execute("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (1, 1, 6, 'Lamp', 10)")
+    db.raw.execute("INSERT INTO inventory (product_id, quantity) VALUES (1, 3)")
+    db.raw.commit()
+    monkeypatch.setattr(category_tree, 'category_tree', category_tree.CategoryTree.load(db))
+    opened = []
+
+    class Borrowed(type(db)):
+        def close(self):
+            pass
+
+    def open_connection():
+        opened.append(1)
+        return Borrowed(db.raw)
+
+    details_cache = ProductDetailCache()
+    details = details_cache.get(1, open_connection)
+    assert details['stock'] == 3 and details['in_stock']
+    assert details['store_name'] is not None
+    assert [crumb['id'] for crumb in details['breadcrumbs']][-1] == 6
+    details_cache.get(1, open_connection)
+    assert len(opened) == 1
+
+    db.raw.execute("UPDATE inventory SET quantity = 0 WHERE product_id = 1")
+    db.raw.commit()
+    details_cache.invalidate(1)
+    assert details_cache.get(1, open_connection)['in_stock'] is False
+    assert details_cache.get(99, open_connection) is None
+
+
+@pytest.mark.integration
+def test_misses_load_from_the_primary(monkeypatch):
+    monkeypatch.setattr(utils, '_db_router', None)
+    monkeypatch.setattr(utils, '_connection_wrapper', None)
+    databases = {}
+    for name, quantity in (('primary', 0), ('replica', 3)):  # the replica lags a sale
+        db = connect(seed=True)
+        db.raw.execute("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (1, 1, 6, 'Lamp', 10)")
+        db.raw.execute("INSERT INTO inventory (product_id, quantity) VALUES (1, ?)", (quantity,))
+        db.raw.commit()
+        databases[name] = db
+    monkeypatch.setattr(category_tree, 'category_tree', category_tree.CategoryTree.load(databases['primary']))
+
+    class Borrowed(type(databases['primary'])):
+        def close(self):
+            pass
+
+    utils.set_db_connection_func(lambda: Borrowed(databases['primary'].raw),
+                                 lambda: Borrowed(databases['replica'].raw))
+
+    assert ProductDetailCache().get(1)['in_stock'] is False
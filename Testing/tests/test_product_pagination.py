@@ -0,0 +1,119 @@
+"""
+Test cases for keyset (cursor) pagination of the product catalog
+Runs the real queries against the SQLite stand-in schema
+"""
+
+import pytest
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from pagination import (
+    InvalidCursor,
+    build_product_page_query,
+    decode_cursor,
+    encode_cursor,
+    fetch_product_page,
+)
+from .sqlite_standin import connect
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    """Seeded stand-in DB with 57 products sharing a handful of prices"""
+    conn = connect(seed=True)
+    rows = []
+    for i in range(57):
+        category_id = 6 if i % 3 else 7
+        price = Decimal(10 + i % 5) + Decimal('0.99')
+        created_at = f"2024-01-{1 + i % 28:02d} 12:00:00"
+        rows.append((1, category_id, f"Product {i}", price, f"SKU-{i}", i % 10 != 0, created_at))
+    conn.cursor().executemany(
+        "INSERT INTO products (seller_id, category_id, name, price, sku, is_active, created_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        rows,
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def walk(conn, **kwargs):
+    """Follow next_cursor until the last page, returning all ids"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = fetch_product_page(conn, cursor=cursor, limit=7, **kwargs)
+        ids.extend(item['id'] for item in page)
+        pages += 1
+        if not page.has_more:
+            return ids, pages
+        cursor = page.next_cursor
+
+
+def expected_ids(conn, column, descending, category_id=None):
+    sql = "SELECT id, " + column + " FROM products WHERE is_active = 1"
+    if category_id is not None:
+        sql += f" AND category_id = {category_id}"
+    rows = conn.raw.execute(sql).fetchall()
+    rows.sort(key=lambda r: (r[1], r[0]), reverse=descending)
+    return [r[0] for r in rows]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("sort, column, descending", [
+    ('newest', 'created_at', True),
+    ('oldest', 'created_at', False),
+    ('price_asc', 'price', False),
+    ('price_desc', 'price', True),
+])
+def test_pages_cover_catalog_in_order(catalog, sort, column, descending):
+    """Walking every page yields each active product once, in sort order"""
+    ids, pages = walk(catalog, sort=sort)
+    assert ids == expected_ids(catalog, column, descending)
+    assert pages == -(-len(ids) // 7)
+
+@pytest.mark.unit
+def test_category_filter(catalog):
+    """Single ids and id lists (subtrees) both filter the listing"""
+    ids, _ = walk(catalog, sort='price_asc', category_ids=7)
+    assert ids == expected_ids(catalog, 'price', False, category_id=7)
+    both, _ = walk(catalog, sort='price_asc', category_ids=[6, 7])
+    assert sorted(both) == sorted(expected_ids(catalog, 'price', False))
+    assert fetch_product_page(catalog, category_ids=[]).items == []
+
+@pytest.mark.unit
+def test_cursor_round_trip():
+    """Cursors are opaque strings that decode back to (value, id)"""
+    token = encode_cursor('price_asc', Decimal('12.50'), 42)
+    assert isinstance(token, str) and '=' not in token
+    assert decode_cursor(token, 'price_asc') == (Decimal('12.50'), 42)
+
+@pytest.mark.unit
+@pytest.mark.parametrize("token", ["not-base64!!", "bm9wZQ", encode_cursor('newest', 'x', 'id')])
+def test_malformed_cursor_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 'newest')
+
+@pytest.mark.unit
+def test_cursor_bound_to_sort_order():
+    """A price cursor cannot be replayed against the date sort"""
+    token = encode_cursor('price_asc', '1.00', 1)
+    with pytest.raises(InvalidCursor):
+        build_product_page_query(sort='newest', cursor=token)
+
+@pytest.mark.unit
+def test_query_uses_seek_predicate_not_offset():
+    """Deep pages are a range seek, never OFFSET"""
+    token = encode_cursor('price_desc', '9.99', 500)
+    sql, params = build_product_page_query(sort='price_desc', category_ids=3, cursor=token, limit=500)
+    assert 'OFFSET' not in sql.upper()
+    assert 'p.price <= %s AND (p.price < %s OR p.id < %s)' in sql
+    assert sql.endswith('LIMIT 101')
+    assert params == [3, Decimal('9.99'), Decimal('9.99'), 500]
+    with pytest.raises(ValueError):
+        build_product_page_query(sort='name')
@@ -0,0 +1,223 @@
+"""
+Test cases for the in-process product search index
+Tests tokenization, BM25 ranking, prefix matching and incremental updates
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import search
+from flask import Flask
+from search import ProductSearchIndex, build_index_from_db, tokenize
+from .sqlite_standin import connect
+
+
+PRODUCTS = [
+    {'id': 1, 'name': 'Wireless Mouse', 'description': 'Ergonomic mouse with USB receiver',
+     'sku': 'WM-100', 'category_path': ['Electronics', 'Accessories']},
+    {'id': 2, 'name': 'Wired Keyboard', 'description': 'Mechanical keyboard, wireless-free',
+     'sku': 'KB-200', 'category_path': ['Electronics', 'Accessories']},
+    {'id': 3, 'name': 'Gaming Laptop', 'description': 'Laptop with a wireless mouse bundle',
+     'sku': 'LP-300', 'category_path': ['Electronics', 'Laptops']},
+    {'id': 4, 'name': 'Cotton T-Shirt', 'description': 'Plain tee',
+     'sku': 'TS-400', 'category_path': "Clothing Men's Clothing"},
+]
+
+
+@pytest.fixture
+def index():
+    index = ProductSearchIndex()
+    index.add_products(PRODUCTS)
+    return index
+
+
+def ids(results):
+    return [product_id for product_id, _ in results]
+
+
+@pytest.mark.unit
+def test_tokenize():
+    assert tokenize("The USB-C Cable, 2m!") == ['usb', 'c', 'cable', '2m']
+    assert tokenize(None) == []
+
+@pytest.mark.unit
+def test_name_matches_rank_above_description_matches(index):
+    """BM25 with field weights ranks the name match first"""
+    assert ids(index.search("wireless mouse", prefix=False)) == [1, 3]
+
+@pytest.mark.unit
+def test_all_terms_required(index):
+    assert ids(index.search("wireless laptop", prefix=False)) == [3]
+    assert index.search("wireless sofa", prefix=False) == []
+
+@pytest.mark.unit
+def test_prefix_matching_for_autocomplete(index):
+    """The last, partially typed term matches as a prefix"""
+    assert set(ids(index.search("wire"))) == {1, 2, 3}
+    assert index.search("wire", prefix=False) == []
+    assert ids(index.search("gaming lap")) == [3]
+    assert index.suggest("wi") == ['wireless', 'wired']
+
+@pytest.mark.unit
+def test_sku_and_category_path(index):
+    assert ids(index.search("ts-400", prefix=False)) == [4]
+    assert ids(index.search("ts400", prefix=False)) == [4]
+    assert set(ids(index.search("clothing"))) == {4}
+    assert set(ids(index.search("accessories"))) == {1, 2}
+
+@pytest.mark.unit
+def test_incremental_update_and_remove(index):
+    """Edits replace old terms; removals drop the product and unused terms"""
+    index.add_product({'id': 4, 'name': 'Linen Shirt', 'sku': 'TS-400'})
+    assert index.search("cotton") == []
+    assert ids(index.search("linen")) == [4]
+
+    index.remove_product(4)
+    assert 4 not in index
+    assert index.suggest("lin") == []
+    assert len(index) == 3
+
+    index.add_product({'id': 3, 'name': 'Gaming Laptop', 'is_active': False})
+    assert index.search("gaming") == []
+
+@pytest.mark.unit
+def test_build_index_from_db():
+    """The index loads products with their category path from the DB"""
+    conn = connect(seed=True)
+    conn.cursor().executemany(
+        "INSERT INTO products (seller_id, category_id, name, description, price, sku, is_active) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        [
+            (1, 6, 'Ultrabook 13', 'Thin and light', 999, 'UB-13', True),
+            (1, 7, 'Phone X', 'Flagship phone', 799, 'PX-1', True),
+            (1, 7, 'Old Phone', 'Discontinued', 99, 'OP-1', False),
+        ],
+    )
+    index = build_index_from_db(conn)
+    assert len(index) == 2
+    assert ids(index.search("electronics laptops")) == [1]
+    assert ids(index.search("phone")) == [2]
+
+@pytest.mark.integration
+def test_failed_build_is_retried_on_a_later_request(monkeypatch):
+    index = ProductSearchIndex()
+    monkeypatch.setattr(search, 'product_index', index)
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database not up yet")
+        conn = connect(seed=True)
+        conn.cursor().execute(
+            "INSERT INTO products (seller_id, category_id, name, price, sku) VALUES (1, 6, 'Ultrabook 13', 999, 'UB-13')")
+        return conn
+
+    app = Flask(__name__)
+    app.config['SEARCH_INDEX_RETRY_SECONDS'] = 0
+    app.add_url_rule('/', 'index', lambda: 'ok')
+    search.init_search(app, connect=flaky_connect).join()
+    assert len(index) == 0
+
+    app.test_client().get('/')
+    app.extensions['search_index_build'].thread.join()
+    assert len(attempts) == 2
+    assert ids(index.search("ultrabook")) == [1]
+
+@pytest.mark.unit
+def test_threshold_algorithm_matches_exhaustive_scoring():
+    """Early-terminating top-k returns the same results as scoring everything"""
+    import random
+    rng = random.Random(3)
+    words = ['red', 'blue', 'green', 'shirt', 'shoe', 'sock', 'hat', 'wool', 'silk', 'linen']
+    index = ProductSearchIndex()
+    index.add_products(
+        {'id': i, 'name': ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))),
+         'description': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 12)))}
+        for i in range(1, 3001)
+    )
+    for query in ['red shirt', 'blue wool sock', 'silk h', 'green li', 'hat hat']:
+        index.DIRECT_INTERSECT_LIMIT = 0
+        threshold = index.search(query, limit=15)
+        index.DIRECT_INTERSECT_LIMIT = 10 ** 9
+        exhaustive = index.search(query, limit=15)
+        assert threshold == exhaustive
+        assert threshold
+
+@pytest.mark.unit
+def test_cached_scores_follow_incremental_updates(index):
+    """Edits after a query update the warm score cache in place"""
+    index.search("wireless", prefix=False)
+    index.add_product({'id': 5, 'name': 'Wireless Wireless Headset', 'sku': 'WH-500'})
+    index.remove_product(1)
+
+    fresh = ProductSearchIndex()
+    fresh.add_products(p for p in PRODUCTS if p['id'] != 1)
+    fresh.add_product({'id': 5, 'name': 'Wireless Wireless Headset', 'sku': 'WH-500'})
+
+    assert ids(index.search("wireless", prefix=False)) == ids(fresh.search("wireless", prefix=False))
+    assert ids(index.search("wireless", prefix=False))[0] == 5
+
+@pytest.mark.unit
+def test_searches_read_snapshots_without_the_writer_lock(index):
+    """Writers publish new snapshots; queries never wait for them"""
+    import threading
+    index.search("wireless", prefix=False)
+    before = index._snapshot
+    postings = {term: dict(p) for term, p in before.main.postings.items()}
+    ranked = list(before.cache['wireless'].ranked)
+
+    index.add_product({'id': 5, 'name': 'Wireless Speaker'})  # into the delta
+    index.remove_product(1)
+    index._fold_pending()  # into a new main segment
+    assert index._snapshot.main is not before.main
+    assert before.main.postings == postings and before.cache['wireless'].ranked == ranked
+    assert 1 in before.main.doc_len and 5 not in before.main.doc_len
+
+    expected = index.search("wireless", prefix=False)
+    results = []
+    with index._lock:
+        reader = threading.Thread(target=lambda: results.append(index.search("wireless", prefix=False)))
+        reader.start()
+        reader.join(5)
+    assert results == [expected] and ids(expected)[0] == 5
+
+@pytest.mark.unit
+def test_delta_edits_match_a_rebuilt_index():
+    """Single edits layered over the main segment, folded in the background, give the same matches"""
+    import random
+    rng = random.Random(5)
+    words = ['red', 'blue', 'green', 'shirt', 'shoe', 'sock', 'hat', 'wool']
+    index = ProductSearchIndex()
+    index.DELTA_LIMIT = 8
+    index.DIRECT_INTERSECT_LIMIT = 0  # exercise the threshold walk over overlays
+    catalog = {}
+    for step in range(200):
+        product_id = rng.randint(1, 40)
+        if step % 7 == 3:
+            catalog.pop(product_id, None)
+            index.remove_product(product_id)
+        else:
+            catalog[product_id] = {'id': product_id,
+                                   'name': ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3)))}
+            index.add_product(catalog[product_id])
+
+        rebuilt = ProductSearchIndex()
+        rebuilt.add_products(catalog.values())
+        assert len(index) == len(rebuilt) == len(catalog)
+        assert index.suggest("s") == rebuilt.suggest("s")
+        for query in ['red', 'blue shoe', 'wool s', 'hat']:
+            assert set(ids(index.search(query, limit=100))) == set(ids(rebuilt.search(query, limit=100)))
+
+    thread = index._fold_thread
+    if thread is not None:
+        thread.join(5)
+    index._fold_pending()
+    assert index._pending == {} and len(index._snapshot.main.doc_len) == len(catalog)
+    assert index.suggest("s") == rebuilt.suggest("s")
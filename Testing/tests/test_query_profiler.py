@@ -0,0 +1,128 @@
+"""
+Test cases for the SQL query profiler
+Tests per-endpoint counts, N+1 detection, SQL budgets, slow-query log and /admin/metrics
+"""
+
+import logging
+import pytest
+import sys
+from pathlib import Path
+
+from flask import Flask, jsonify
+from flask_login import LoginManager, UserMixin, login_user
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import utils
+from query_profiler import SQLBudgetExceeded, init_query_profiler, normalize_sql
+from .sqlite_standin import StandInConnection, connect
+
+
+class User(UserMixin):
+    def __init__(self, id, role):
+        self.id = id
+        self.role = role
+
+
+USERS = {1: User(1, 'admin'), 4: User(4, 'customer')}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    db = connect(seed=True)
+    db.raw.executemany("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, 1, 6, ?, 5)",
+                       [(i, f"P{i}") for i in range(1, 11)])
+    db.raw.commit()
+    monkeypatch.setattr(utils, '_db_router', None)
+    monkeypatch.setattr(utils, '_connection_wrapper', None)
+    utils.set_db_connection_func(lambda: StandInConnection(db.raw))
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: USERS.get(int(user_id)))
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        login_user(USERS[user_id])
+        return 'ok'
+
+    @app.route('/product/<int:product_id>')
+    def product(product_id):
+        cursor = utils.get_db_connection().cursor()
+        cursor.execute("SELECT name FROM products WHERE id = %s", (product_id,))
+        return cursor.fetchone()[0]
+
+    @app.route('/products')
+    def products():
+        conn = utils.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM products ORDER BY id")
+        names = []
+        for (product_id,) in cursor.fetchall():
+            item = conn.cursor()
+            item.execute("SELECT name FROM products WHERE id = %s", (product_id,))
+            names.append(item.fetchone()[0])
+        return jsonify(names)
+
+    app.profiler = init_query_profiler(app)
+    return app
+
+
+@pytest.mark.unit
+def test_normalize_sql_collapses_in_lists():
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (%s, %s,%s)") == \
+        normalize_sql("SELECT * FROM t WHERE id IN (%s, %s)") == "SELECT * FROM t WHERE id IN (%s, ...)"
+
+@pytest.mark.unit
+def test_counts_per_endpoint_and_n_plus_one(app):
+    client = app.test_client()
+    client.get('/product/1')
+    client.get('/product/2')
+    client.get('/products')
+    stats = app.profiler.snapshot()['endpoints']
+    assert stats['product']['requests'] == 2
+    assert stats['product']['statements'] == 2
+    assert stats['product']['n_plus_one_requests'] == 0
+    assert stats['products']['max_statements'] == 11
+    assert stats['products']['n_plus_one_requests'] == 1
+    assert app.profiler.last_request.duplicates == {"SELECT name FROM products WHERE id = %s": 10}
+
+@pytest.mark.unit
+def test_sql_budget(app):
+    client = app.test_client()
+    with app.profiler.budget(1):
+        client.get('/product/3')
+    with pytest.raises(SQLBudgetExceeded):
+        with app.profiler.budget(5):
+            client.get('/products')
+    with pytest.raises(SQLBudgetExceeded):
+        with app.profiler.budget(50, max_duplicates=2):
+            client.get('/products')
+
+@pytest.mark.unit
+def test_slow_queries_are_logged_with_plan(app, caplog):
+    app.profiler.slow_query_ms = 0
+    with caplog.at_level(logging.WARNING, logger='query_profiler'):
+        app.test_client().get('/product/1')
+    slow = app.profiler.snapshot()['slow_queries']
+    assert slow[0]['endpoint'] == 'product'
+    assert 'USING INTEGER PRIMARY KEY' in slow[0]['plan'][0]['detail']
+    assert 'slow query' in caplog.text
+
+@pytest.mark.integration
+def test_metrics_view_requires_manage_settings(app):
+    client = app.test_client()
+    client.get('/product/1')
+    assert client.get('/no-such-page').status_code == 404
+    client.get('/login/4')
+    assert client.get('/admin/metrics').status_code == 403
+    client.get('/login/1')
+    response = client.get('/admin/metrics')
+    assert response.status_code == 200
+    endpoints = response.get_json()['endpoints']
+    assert endpoints['product']['requests'] == 1
+    assert endpoints['<unmatched>']['requests'] == 1
@@ -0,0 +1,104 @@
+"""
+Test cases for the per-request RBAC access cache
+Tests that decorators share one resolved AccessContext per request
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from flask import Flask, render_template_string
+from unittest.mock import patch
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from rbac import (
+    access_cache_stats,
+    current_access,
+    permission_required,
+    register_template_helpers,
+    seller_required,
+)
+
+
+@pytest.fixture
+def app():
+    """Minimal Flask app; the cache only needs flask.g"""
+    flask_app = Flask(__name__)
+    flask_app.config['TESTING'] = True
+    register_template_helpers(flask_app)
+    access_cache_stats.reset()
+    return flask_app
+
+
+@pytest.mark.unit
+@patch('rbac.current_user')
+def test_access_resolved_once_per_request(mock_user, app):
+    """Nested guarded helpers reuse the cached access context"""
+    mock_user.is_authenticated = True
+    mock_user.role = 'seller'
+
+    @seller_required
+    @permission_required('manage_inventory')
+    @permission_required('manage_products')
+    def view():
+        return "ok"
+
+    with app.test_request_context():
+        assert view() == "ok"
+        assert current_access() is current_access()
+
+    stats = access_cache_stats.snapshot()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 4
+    assert stats['hit_rate'] == 0.8
+
+@pytest.mark.unit
+@patch('rbac.current_user')
+def test_cache_is_request_scoped(mock_user, app):
+    """A new request recomputes access"""
+    mock_user.is_authenticated = True
+    mock_user.role = 'customer'
+
+    with app.test_request_context():
+        current_access()
+    with app.test_request_context():
+        current_access()
+
+    assert access_cache_stats.snapshot()['misses'] == 2
+
+@pytest.mark.unit
+@patch('rbac.current_user')
+def test_cache_rebuilt_on_role_change(mock_user, app):
+    """Changing role mid-request (e.g. login) invalidates the cached context"""
+    mock_user.is_authenticated = True
+    mock_user.role = 'customer'
+
+    with app.test_request_context():
+        assert current_access().has_permission('manage_cart') is True
+        mock_user.role = 'admin'
+        access = current_access()
+        assert access.role == 'admin'
+        assert access.has_permission('manage_cart') is False
+        assert access.has_permission('manage_cart', inherited=True) is True
+
+@pytest.mark.unit
+@patch('rbac.current_user')
+def test_template_helpers_use_cache(mock_user, app):
+    """has_permission/has_role in templates read the cached context"""
+    mock_user.is_authenticated = True
+    mock_user.role = 'admin'
+
+    template = (
+        "{{ has_role('admin') }} "
+        "{{ has_permission('manage_sellers') }} "
+        "{{ has_permission('manage_cart') }}"
+    )
+    with app.test_request_context():
+        assert render_template_string(template) == "True True False"
+
+    stats = access_cache_stats.snapshot()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 2
@@ -0,0 +1,166 @@
+"""
+Test cases for the compiled RBAC permission engine
+Tests bitmask checks, batch checks and inherited permissions
+"""
+
+import pytest
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from rbac import (
+    RBAC,
+    PermissionEngine,
+    RoleRegistry,
+    get_registry,
+    reload_roles_from_db,
+    swap_registry,
+)
+
+
+@pytest.mark.unit
+def test_engine_matches_permission_table():
+    """Every (role, permission) pair agrees with the PERMISSIONS lists"""
+    all_permissions = {p for perms in RBAC.PERMISSIONS.values() for p in perms}
+    for role, perms in RBAC.PERMISSIONS.items():
+        for permission in all_permissions:
+            assert RBAC.has_permission(role, permission) is (permission in perms)
+
+@pytest.mark.unit
+def test_has_permissions_batch():
+    """Test RBAC.has_permissions returns one result per permission"""
+    result = RBAC.has_permissions('seller', ['manage_products', 'manage_sellers', 'no_such_perm'])
+    assert result == {
+        'manage_products': True,
+        'manage_sellers': False,
+        'no_such_perm': False,
+    }
+    assert RBAC.has_permissions(None, ['manage_cart']) == {'manage_cart': False}
+
+@pytest.mark.unit
+def test_has_all_and_any_permissions():
+    """Test all/any batch checks"""
+    assert RBAC.has_all_permissions('admin', ['manage_sellers', 'view_reports']) is True
+    assert RBAC.has_all_permissions('admin', ['manage_sellers', 'manage_cart']) is False
+    assert RBAC.has_all_permissions('admin', ['manage_sellers', 'unknown']) is False
+    assert RBAC.has_any_permission('customer', ['manage_sellers', 'manage_cart']) is True
+    assert RBAC.has_any_permission('customer', ['manage_sellers']) is False
+    assert RBAC.has_any_permission('hacker', ['manage_cart']) is False
+
+@pytest.mark.unit
+def test_inherited_permissions_folded_in():
+    """Admin inherits seller and customer permissions through the hierarchy"""
+    assert RBAC.has_all_permissions('admin', ['manage_inventory', 'place_orders'], inherited=True) is True
+    assert RBAC.has_all_permissions('seller', ['place_orders'], inherited=True) is False
+    # Direct checks are unchanged
+    assert RBAC.has_permission('admin', 'place_orders') is False
+
+@pytest.mark.unit
+def test_get_user_permissions_returns_copy():
+    """Mutating the returned list must not change the RBAC tables"""
+    perms = RBAC.get_user_permissions('customer')
+    assert perms == RBAC.PERMISSIONS['customer']
+    perms.append('manage_sellers')
+    assert RBAC.has_permission('customer', 'manage_sellers') is False
+    assert 'manage_sellers' not in RBAC.get_user_permissions('customer')
+
+@pytest.mark.unit
+def test_engine_unhashable_role():
+    """Unhashable role values are treated as unknown roles"""
+    engine = PermissionEngine({'a': ['x']}, {'a': ['a']})
+    assert engine.has(['a'], 'x') is False
+    assert engine.has('a', 'x') is True
+
+
+# --- Role registry ---
+
+
+@pytest.mark.unit
+def test_registry_is_frozen():
+    """Registry tables are frozensets/read-only mappings"""
+    registry = get_registry()
+    assert isinstance(registry.permissions['seller'], frozenset)
+    with pytest.raises(TypeError):
+        registry.permissions['seller'] = frozenset()
+    with pytest.raises(AttributeError):
+        registry.roles = ()
+    assert registry == RoleRegistry(RBAC.PERMISSIONS, RBAC.ROLE_HIERARCHY)
+    assert hash(registry) == hash(RoleRegistry(RBAC.PERMISSIONS, RBAC.ROLE_HIERARCHY))
+
+@pytest.mark.unit
+def test_registry_transitive_closure():
+    """Multi-level hierarchies are resolved at build time"""
+    registry = RoleRegistry(
+        {'a': ['pa'], 'b': ['pb'], 'c': ['pc']},
+        {'a': ['b'], 'b': ['c'], 'c': ['a']},  # cycle is tolerated
+    )
+    assert registry.hierarchy['a'] == frozenset({'a', 'b', 'c'})
+    assert registry.includes_role('a', 'c') is True
+    assert registry.engine.has_all('a', ['pa', 'pb', 'pc'], inherited=True) is True
+    assert registry.includes_role('unknown', 'a') is False
+
+@pytest.mark.unit
+def test_reload_roles_from_db_swaps_atomically():
+    """Reloading from the DB replaces the registry in one step"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE role_permissions (role TEXT, permission TEXT)")
+    conn.execute("CREATE TABLE role_hierarchy (role TEXT, inherits_role TEXT)")
+    conn.executemany("INSERT INTO role_permissions VALUES (?, ?)", [
+        ('admin', 'manage_sellers'),
+        ('customer', 'manage_cart'),
+        ('customer', 'write_reviews'),
+    ])
+    conn.execute("INSERT INTO role_hierarchy VALUES ('admin', 'customer')")
+
+    original = get_registry()
+    try:
+        registry = reload_roles_from_db(conn)
+        assert get_registry() is registry
+        assert RBAC.has_permission('customer', 'write_reviews') is True
+        assert RBAC.has_permission('seller', 'manage_inventory') is False
+        assert registry.includes_role('admin', 'customer') is True
+    finally:
+        swap_registry(original)
+    assert RBAC.has_permission('seller', 'manage_inventory') is True
+
+@pytest.mark.unit
+def test_reload_failure_keeps_current_registry():
+    """A failing reload query leaves the active registry untouched"""
+    conn = sqlite3.connect(':memory:')
+    original = get_registry()
+    with pytest.raises(sqlite3.OperationalError):
+        reload_roles_from_db(conn)
+    assert get_registry() is original
+
+@pytest.mark.unit
+def test_concurrent_readers_see_complete_registries():
+    """Readers racing a reload only ever see one of two complete registries"""
+    original = get_registry()
+    alternate = RoleRegistry({'seller': ['manage_products', 'manage_inventory']}, {})
+    errors = []
+
+    def reader():
+        for _ in range(2000):
+            registry = get_registry()
+            result = registry.engine.has_all('seller', ['manage_products', 'manage_inventory'])
+            if not result:
+                errors.append(registry)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(200):
+            swap_registry(alternate)
+            swap_registry(original)
+    finally:
+        for t in threads:
+            t.join()
+        swap_registry(original)
+    assert errors == []
@@ -0,0 +1,142 @@
+"""
+Test cases for the incremental sales rollups
+Rollup answers are compared against direct aggregate queries
+"""
+
+import pytest
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import sales_rollup
+from checkout_pipeline import place_orders
+from flask import Flask
+from sales_rollup import SalesRollup
+from .sqlite_standin import connect
+
+
+@pytest.fixture
+def shop():
+    """Products 1-6 (sellers 1/2, categories 6/7) and a few days of orders"""
+    conn = connect(seed=True)
+    conn.raw.executemany(
+        "INSERT INTO products (id, seller_id, category_id, name, price) VALUES (?, ?, ?, ?, ?)",
+        [(i, 1 + i % 2, 6 + i % 3 // 2, f"P{i}", 10 * i) for i in range(1, 7)])
+    conn.raw.executemany("INSERT INTO inventory (product_id, quantity) VALUES (?, 1000)",
+                         [(i,) for i in range(1, 7)])
+    conn.raw.commit()
+    for day, lines in [('2024-03-01', [(1, 1), (2, 2)]), ('2024-03-01', [(3, 1)]),
+                       ('2024-03-02', [(4, 3), (5, 1)]), ('2024-03-05', [(6, 2), (1, 1)])]:
+        orders = place_orders(conn, 4, 1, lines=lines)
+        conn.raw.executemany("UPDATE orders SET created_at = ?, updated_at = ? WHERE id = ?",
+                             [(f"{day} 10:00:00", f"{day} 10:00:00", o['id']) for o in orders])
+    conn.raw.commit()
+    return conn
+
+
+def expected_sales(conn, seller_id=None):
+    sql = "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM orders WHERE status <> 'cancelled'"
+    if seller_id is not None:
+        sql += f" AND seller_id = {seller_id}"
+    count, total = conn.raw.execute(sql).fetchone()
+    return Decimal(str(total)).quantize(Decimal('0.01'))
+
+
+@pytest.mark.unit
+def test_backfill_matches_direct_aggregates(shop):
+    rollup = SalesRollup()
+    assert rollup.backfill(shop) == 3
+    assert rollup.totals() == {'orders': 7, 'sales': expected_sales(shop)}
+    assert rollup.totals(seller_id=1)['sales'] == expected_sales(shop, 1)
+    assert rollup.orders_by_status() == {'placed': 7}
+    assert [day for day, _, _ in rollup.daily_sales()] == [
+        date(2024, 3, 1), date(2024, 3, 2), date(2024, 3, 5)]
+    assert rollup.totals(start=date(2024, 3, 2), end=date(2024, 3, 2))['orders'] == 2
+    assert rollup.top_sellers() == sorted(
+        [(1, expected_sales(shop, 1)), (2, expected_sales(shop, 2))], key=lambda s: -s[1])
+    category, units, revenue = shop.raw.execute(
+        "SELECT p.category_id, SUM(oi.quantity), SUM(oi.subtotal) FROM order_items oi "
+        "JOIN products p ON p.id = oi.product_id GROUP BY p.category_id "
+        "ORDER BY SUM(oi.subtotal) DESC LIMIT 1").fetchone()
+    assert rollup.top_categories(limit=1) == [(category, units, Decimal(str(revenue)))]
+
+@pytest.mark.unit
+def test_incremental_updates(shop):
+    rollup = SalesRollup()
+    rollup.backfill(shop)
+    orders = place_orders(shop, 5, 2, lines=[(2, 1), (3, 1)])
+    rollup.on_orders_placed(shop, [o['id'] for o in orders])
+    assert rollup.totals() == {'orders': 9, 'sales': expected_sales(shop)}
+
+    order = orders[0]
+    shop.raw.execute("UPDATE orders SET status = 'cancelled' WHERE id = ?", (order['id'],))
+    shop.raw.commit()
+    rollup.on_order_status_changed(shop, order['id'], 'placed')
+    assert rollup.orders_by_status() == {'placed': 8, 'cancelled': 1}
+    assert rollup.totals()['sales'] == expected_sales(shop)
+
+    fresh = SalesRollup()
+    fresh.backfill(shop)
+    assert fresh.top_categories() == rollup.top_categories()
+    assert fresh.daily_sales() == rollup.daily_sales()
+
+@pytest.mark.unit
+def test_refresh_picks_up_other_writers(shop):
+    rollup = SalesRollup()
+    rollup.backfill(shop)
+    shop.raw.execute("UPDATE orders SET status = 'delivered', updated_at = CURRENT_TIMESTAMP "
+                     "WHERE created_at >= '2024-03-05'")
+    shop.raw.execute("INSERT INTO orders (order_number, customer_id, seller_id, shipping_address_id, "
+                     "status, subtotal, total, created_at) "
+                     "VALUES ('ORD-X', 5, 2, 2, 'shipped', 5, 5, '2024-03-05 09:00:00')")
+    shop.raw.commit()
+    # Only the days that own changed orders are recomputed
+    rollup._status[date(2024, 3, 1)] = {}
+    rollup.refresh(shop)
+    assert rollup.orders_by_status(start=date(2024, 3, 2)) == {'placed': 2, 'delivered': 2, 'shipped': 1}
+    assert rollup.orders_by_status(end=date(2024, 3, 1)) == {}
+    assert rollup.totals(start=date(2024, 3, 5))['sales'] == Decimal(str(shop.raw.execute(
+        "SELECT SUM(total) FROM orders WHERE created_at >= '2024-03-05'").fetchone()[0]))
+
+@pytest.mark.unit
+def test_refresh_recomputes_only_changed_days(shop):
+    rollup = SalesRollup()
+    rollup.backfill(shop)
+    shop.raw.execute("UPDATE orders SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP "
+                     "WHERE id = (SELECT MIN(id) FROM orders)")
+    shop.raw.commit()
+    untouched = rollup._status[date(2024, 3, 2)] = {}
+    assert rollup.refresh(shop) == 1
+    assert rollup._status[date(2024, 3, 2)] is untouched
+    assert rollup.orders_by_status(end=date(2024, 3, 1)) == {'placed': 2, 'cancelled': 1}
+
+
+@pytest.mark.unit
+def test_failed_backfill_is_retried(shop, monkeypatch):
+    rollup = SalesRollup()
+    monkeypatch.setattr(sales_rollup, 'sales_rollup', rollup)
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database not up yet")
+        return shop
+
+    app = Flask(__name__)
+    app.config['SALES_ROLLUP_REFRESH_SECONDS'] = 0
+    app.add_url_rule('/', 'index', lambda: 'ok')
+    sales_rollup.init_sales_rollup(app, connect=flaky_connect).join()
+    assert rollup.watermark is None
+
+    monkeypatch.setattr(shop, 'close', lambda: None)
+    app.test_client().get('/')
+    app.extensions['sales_rollup_backfill'].thread.join()
+    assert len(attempts) == 2
+    assert rollup.totals() == {'orders': 7, 'sales': expected_sales(shop)}
@@ -0,0 +1,126 @@
+"""
+Test cases for the seller-scoped query layer
+Tests data isolation between sellers and that every query is index-driven
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from flask import Flask
+from flask_login import LoginManager, UserMixin, login_user
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from query_profiler import full_scans
+from seller_scope import NotASeller, SellerScope, current_seller_scope
+from .sqlite_standin import connect
+
+
+def populate(conn, owner):
+    """200 products and 300 orders; owner(i) is the seller of product/order i"""
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "INSERT INTO products (id, seller_id, category_id, name, price, is_active) VALUES (%s, %s, 6, %s, 10, %s)",
+            [(i, owner(i), f"P{i}", i % 5 != 0) for i in range(1, 201)])
+        cursor.executemany("INSERT INTO inventory (product_id, quantity) VALUES (%s, %s)",
+                           [(i, i % 15) for i in range(1, 201)])
+        cursor.executemany(
+            "INSERT INTO orders (id, order_number, customer_id, seller_id, shipping_address_id, "
+            "status, subtotal, total) VALUES (%s, %s, 4, %s, 1, %s, 10, 10)",
+            [(i, f"ORD-{i}", owner(i), 'placed' if i % 3 else 'shipped') for i in range(1, 301)])
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price, subtotal) VALUES (%s, %s, 1, 10, 10)",
+            [(i, i % 200 + 1) for i in range(1, 301)])
+    finally:
+        cursor.close()
+    conn.commit()
+
+
+@pytest.fixture
+def db():
+    """Seller 1 owns odd product/order ids, seller 2 even ones"""
+    conn = connect(seed=True)
+    populate(conn, lambda i: 2 - i % 2)
+    conn.raw.execute("ANALYZE")
+    return conn
+
+
+@pytest.mark.unit
+def test_reads_only_return_own_rows(db):
+    scope = SellerScope.for_user(db, 2)
+    assert scope.seller_id == 1
+    assert all(row[0] % 2 == 1 for row in scope.products(limit=500))
+    assert len(scope.products(limit=500)) == 100
+    page = scope.products(limit=10)
+    assert scope.products(after_id=page[-1][0], limit=1)[0][0] == 21
+    assert scope.product(2) is None and scope.product(3) is not None
+    assert all(row[0] % 2 == 1 for row in scope.orders(limit=500))
+    assert [row[3] for row in scope.orders(status='shipped', limit=3)] == ['shipped'] * 3
+    assert scope.order(4) is None and scope.order_items(4) == []
+    assert len(scope.order_items(5)) == 1
+    assert all(row[2] <= 10 for row in scope.inventory(low_stock_only=True))
+
+@pytest.mark.unit
+def test_writes_cannot_touch_other_sellers(db):
+    scope = SellerScope(db, 1)
+    assert scope.update_product(2, name='hijacked') == 0
+    assert scope.update_product(3, name='renamed', price=12) == 1
+    assert scope.set_stock(2, 0) == 0
+    assert scope.set_stock(3, 99) == 1
+    assert scope.update_order_status(2, 'cancelled') == 0
+    assert scope.update_order_status(1, 'confirmed') == 1
+    assert db.raw.execute("SELECT name FROM products WHERE id = 2").fetchone()[0] == 'P2'
+    with pytest.raises(ValueError):
+        scope.update_product(3, seller_id=2)
+    with pytest.raises(ValueError):
+        scope.select('users')
+
+@pytest.mark.unit
+def test_every_seller_query_uses_an_index(db):
+    scope = SellerScope(db, 1)
+    for sql, params in scope.query_plans():
+        assert full_scans(db, sql, params) == [], sql
+    # Sanity check: an unscoped query is reported
+    assert full_scans(db, "SELECT id FROM products WHERE name = %s", ['P1'])
+
+@pytest.mark.integration
+def test_every_seller_query_uses_an_index_on_mysql(mysql_db):
+    # Seller 1 owns one row in twenty, so its index lookups beat a scan
+    populate(mysql_db, lambda i: 1 if i % 20 == 1 else 2)
+    scope = SellerScope(mysql_db, 1)
+    for sql, params in scope.query_plans():
+        assert full_scans(mysql_db, sql, params) == [], sql
+
+@pytest.mark.unit
+def test_order_by_is_whitelisted(db):
+    scope = SellerScope(db, 1)
+    assert scope.select_sql('orders', "id", order_by="created_at DESC")[0].endswith(
+        "ORDER BY created_at DESC")
+    for order_by in ("password_hash", "id; DROP TABLE users", "(SELECT 1)", "id DESC, name"):
+        with pytest.raises(ValueError):
+            scope.select('products', "id", order_by=order_by)
+
+@pytest.mark.integration
+def test_current_seller_scope_is_bound_to_current_user(db):
+    class User(UserMixin):
+        def __init__(self, id, role):
+            self.id = id
+            self.role = role
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    LoginManager(app)
+    with app.test_request_context():
+        login_user(User(3, 'seller'))
+        scope = current_seller_scope(connect=lambda: db)
+        assert scope.seller_id == 2
+        assert current_seller_scope() is scope
+    with app.test_request_context():
+        login_user(User(4, 'customer'))
+        with pytest.raises(NotASeller):
+            current_seller_scope(connect=lambda: db)
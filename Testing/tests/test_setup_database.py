@@ -0,0 +1,124 @@
+"""
+Test cases for the synthetic dataset generator in setup_database
+Tests referential consistency, determinism, CSV encoding and load progress
+"""
+
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+from setup_database import (LoadProgress, SyntheticDataset, bulk_load, generate_dataset, leaf_category_ids,
+                            local_infile_disabled, write_csv)
+from .sqlite_standin import connect
+
+COUNTS = {'sellers': 5, 'products': 60, 'customers': 20, 'orders': 200}
+
+
+@pytest.fixture
+def db():
+    conn = connect(seed=True)
+    conn.raw.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _one(conn, sql):
+    return conn.raw.execute(sql).fetchone()[0]
+
+
+@pytest.mark.unit
+def test_generated_rows_are_consistent(db):
+    inserted = generate_dataset(db, **COUNTS)
+    assert inserted['users'] == 25 and inserted['orders'] == inserted['payments'] == 200
+    assert inserted['order_items'] == _one(db, "SELECT COUNT(*) FROM order_items")
+
+    assert db.raw.execute("PRAGMA foreign_key_check").fetchall() == []
+    # Orders only contain their seller's products and ship to the customer's address
+    assert _one(db, "SELECT COUNT(*) FROM order_items oi JOIN orders o ON o.id = oi.order_id "
+                    "JOIN products p ON p.id = oi.product_id WHERE p.seller_id != o.seller_id") == 0
+    assert _one(db, "SELECT COUNT(*) FROM orders o JOIN addresses a ON a.id = o.shipping_address_id "
+                    "WHERE a.user_id != o.customer_id") == 0
+    assert _one(db, "SELECT COUNT(*) FROM orders o WHERE ABS(o.total - o.tax - "
+                    "(SELECT SUM(subtotal) FROM order_items WHERE order_id = o.id)) > 0.005") == 0
+    assert _one(db, "SELECT COUNT(*) FROM payments p JOIN orders o ON o.id = p.order_id "
+                    "WHERE ABS(p.amount - o.total) > 0.005") == 0
+    leaves = set(leaf_category_ids(db))
+    assert {row[0] for row in db.raw.execute("SELECT DISTINCT category_id FROM products")} <= leaves
+
+
+@pytest.mark.unit
+def test_generated_rows_go_after_existing_data(db):
+    generate_dataset(db, **COUNTS)
+    generate_dataset(db, seed=8, **COUNTS)
+    assert _one(db, "SELECT COUNT(*) FROM users WHERE role = 'seller'") == 2 + 10
+    assert _one(db, "SELECT COUNT(*) FROM orders") == 400
+    assert db.raw.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+@pytest.mark.unit
+def test_same_seed_same_data():
+    def rows(seed):
+        dataset = SyntheticDataset(category_ids=[6, 7], seed=seed, now=datetime(2026, 1, 1), **COUNTS)
+        return [list(table_rows) for _, _, table_rows in dataset.tables()]
+
+    assert rows(1) == rows(1)
+    assert rows(1) != rows(2)
+
+
+@pytest.mark.unit
+def test_csv_encoding_for_load_data(tmp_path):
+    path = tmp_path / 'users.csv'
+    seen = []
+    count = write_csv(path, ('id', 'name', 'phone', 'is_active'),
+                      [(1, 'Mug, "large"', None, True), (2, 'C:\\temp', '', False)],
+                      progress=lambda table, rows: seen.append((table, rows)), table='users')
+    assert count == 2 and seen == [('users', 2)]
+    assert path.read_text().splitlines() == [
+        'id,name,phone,is_active',
+        '1,"Mug, ""large""",\\N,1',
+        '2,C:\\\\temp,,0',
+    ]
+
+
+@pytest.mark.unit
+def test_load_progress_reports_rows_per_second():
+    lines, now = [], [0.0]
+    progress = LoadProgress(out=lines.append, interval=1.0, clock=lambda: now[0])
+    progress('users', 0)
+    now[0] = 0.5
+    progress('users', 500)
+    now[0] = 2.0
+    progress('users', 4000)
+    progress('orders', 0)
+    now[0] = 6.0
+    progress('orders', 8000)
+    assert progress.finish() == (12000, 6.0)
+    assert lines == [
+        '  users: 4,000 rows (2,000 rows/s)',
+        '  users: 4,000 rows in 2.0s (2,000 rows/s)',
+        '  orders: 8,000 rows (2,000 rows/s)',
+        '  orders: 8,000 rows in 4.0s (2,000 rows/s)',
+    ]
+
+
+@pytest.mark.unit
+def test_bulk_load_on_standin(db):
+    dataset = SyntheticDataset(category_ids=leaf_category_ids(db), start_ids={'users': 6, 'sellers': 3,
+                               'addresses': 3}, **COUNTS)
+    with pytest.raises(ValueError):
+        bulk_load(db, dataset, mode='infile')
+    inserted = bulk_load(db, dataset, batch_size=64, defer_indexes=True)
+    assert inserted['products'] == 60
+    assert db.raw.execute("PRAGMA foreign_key_check").fetchall() == []
+
+@pytest.mark.unit
+def test_local_infile_disabled_errors_are_recognized():
+    assert local_infile_disabled(Exception(3948, "Loading local data is disabled"))
+    assert local_infile_disabled(Exception(2068, "LOAD DATA LOCAL INFILE file request rejected"))
+    assert not local_infile_disabled(Exception(1062, "Duplicate entry"))
+    assert not local_infile_disabled(Exception())
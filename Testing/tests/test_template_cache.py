@@ -0,0 +1,133 @@
+"""
+Test cases for the Jinja2 fragment cache extension
+Tests hits, role/locale variation, version invalidation and TTL expiry
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from flask import Flask, render_template_string
+from jinja2 import Environment
+
+# Add Development directory to path
+project_root = Path(__file__).parent.parent.parent
+development_dir = project_root / "Development"
+sys.path.insert(0, str(development_dir))
+
+import category_tree
+import product_cache
+from inventory import restock
+from product_cache import LocalLRU
+from seller_scope import SellerScope
+from template_cache import FragmentCacheExtension, category_version, init_fragment_cache, product_version
+from .sqlite_standin import connect
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def env():
+    environment = Environment(extensions=[FragmentCacheExtension], autoescape=True)
+    environment.vary = ('customer', 'en')
+    environment.fragment_cache_vary = lambda: environment.vary
+    environment.calls = []
+
+    def render_count(name):
+        environment.calls.append(name)
+        return name
+
+    environment.globals['work'] = render_count
+    return environment
+
+
+@pytest.mark.unit
+def test_fragment_is_rendered_once(env):
+    template = env.from_string("{% cache 'nav', 60 %}<b>{{ work('nav') }}</b>{% endcache %}")
+    assert template.render() == "<b>nav</b>"
+    assert template.render() == "<b>nav</b>"
+    assert env.calls == ['nav']
+
+@pytest.mark.unit
+def test_key_varies_by_role_locale_and_version(env):
+    template = env.from_string("{% cache ('card', id, version) %}{{ work(id) }}{% endcache %}")
+    template.render(id=1, version=1)
+    env.vary = ('seller', 'en')
+    template.render(id=1, version=1)
+    env.vary = ('seller', 'fr')
+    template.render(id=1, version=1)
+    template.render(id=1, version=2)
+    template.render(id=1, version=2)
+    assert env.calls == [1, 1, 1, 1]
+
+@pytest.mark.unit
+def test_ttl_expiry_and_disable(env):
+    clock = FakeClock()
+    env.fragment_cache = LocalLRU(clock=clock)
+    template = env.from_string("{% cache 'menu', 30 %}{{ work('menu') }}{% endcache %}")
+    template.render()
+    clock.now += 29
+    template.render()
+    clock.now += 1
+    template.render()
+    env.fragment_cache_enabled = False
+    template.render()
+    assert env.calls == ['menu'] * 3
+
+@pytest.mark.unit
+def test_cached_markup_stays_escaped(env):
+    template = env.from_string("{% cache 'x' %}{{ value }}{% endcache %}")
+    assert template.render(value='<i>') == "&lt;i&gt;"
+    assert template.render(value='other') == "&lt;i&gt;"
+
+@pytest.mark.integration
+def test_flask_app_varies_by_request_locale(monkeypatch):
+    tree = category_tree.CategoryTree.from_rows([(1, None, 'Books', 'books')])
+    monkeypatch.setattr(category_tree, 'category_tree', tree)
+    app = Flask(__name__)
+    app.config['SUPPORTED_LOCALES'] = ('en', 'de')
+    init_fragment_cache(app)
+    source = "{% cache ('menu', category_version()) %}{{ label }}{% endcache %}"
+
+    with app.test_request_context(headers={'Accept-Language': 'en'}):
+        assert render_template_string(source, label='one') == 'one'
+        assert render_template_string(source, label='two') == 'one'
+    with app.test_request_context(headers={'Accept-Language': 'de'}):
+        assert render_template_string(source, label='three') == 'three'
+        before = category_version()
+        tree.adjust_product_count(1, 1)
+        assert category_version() != before
+        assert render_template_string(source, label='four') == 'four'
+    # Unsupported tags share the default locale's entry instead of adding keys
+    for header in ('x-random-1', 'zz;q=0.9, qq;q=0.8', ''):
+        with app.test_request_context(headers={'Accept-Language': header}):
+            assert render_template_string(source, label='five') == 'five'
+    # en and de before the edit, de and the default (en) after it
+    assert len(app.jinja_env.fragment_cache) == 4
+
+
+@pytest.mark.integration
+def test_stock_and_product_edits_bump_the_version_and_drop_cached_details(monkeypatch):
+    db = connect(seed=True)
+    db.raw.execute("INSERT INTO products (id, seller_id, category_id, name, price) VALUES (1, 1, 6, 'Lamp', 10)")
+    db.raw.execute("INSERT INTO inventory (product_id, quantity) VALUES (1, 3)")
+    db.raw.commit()
+    dropped = []
+    monkeypatch.setattr(product_cache.product_cache, 'invalidate', dropped.append)
+    scope = SellerScope(db, 1)
+
+    versions = [product_version(1)]
+    for change in (lambda: scope.set_stock(1, 0), lambda: restock(db, [(1, 2)]),
+                   lambda: scope.update_product(1, price=12)):
+        change()
+        versions.append(product_version(1))
+    assert len(set(versions)) == 4
+    assert dropped == [1, 1, 1]
+    scope.update_product(2, price=1)  # not this seller's product: nothing changes
+    assert product_version(1) == versions[-1] and dropped == [1, 1, 1]
@@ -0,0 +1,74 @@
+"""
+Test cases for template-cloned test databases
+Tests stand-in cloning, per-test savepoint rollback and worker database naming
+"""
+
+import pytest
+
+from .sqlite_standin import connect
+from .template_db import (SavepointConnection, clone_database, standin_db, standin_module_db,
+                          test_database_name)
+
+
+def _count(conn, table):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+@pytest.mark.unit
+def test_clones_are_independent():
+    first, second = connect(seed=True), connect(seed=True)
+    first.raw.execute("DELETE FROM cart")
+    first.raw.execute("DELETE FROM categories WHERE parent_id IS NOT NULL")
+    assert _count(second, 'categories') == 11
+    assert _count(connect(seed=True), 'categories') == 11
+    assert _count(connect(), 'categories') == 0
+
+
+@pytest.mark.unit
+def test_file_databases_still_load_schema(tmp_path):
+    conn = connect(str(tmp_path / 'shop.db'), seed=True)
+    assert _count(conn, 'users') == 5
+
+
+@pytest.mark.unit
+def test_commit_inside_savepoint_is_undone(standin_module_db):
+    conn = SavepointConnection(standin_module_db)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO cart (customer_id) VALUES (%s)", (4,))
+    conn.commit()
+    cursor.execute("INSERT INTO cart (customer_id) VALUES (%s)", (5,))
+    conn.rollback()
+    assert _count(conn, 'cart') == 1
+    conn.discard()
+    assert _count(standin_module_db, 'cart') == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize('run', [1, 2])
+def test_each_test_starts_from_seed(standin_db, run):
+    assert _count(standin_db, 'addresses') == 2
+    cursor = standin_db.cursor()
+    cursor.execute("DELETE FROM addresses")
+    standin_db.commit()
+    assert _count(standin_db, 'addresses') == 0
+
+
+@pytest.mark.unit
+def test_worker_database_name(monkeypatch):
+    monkeypatch.delenv('TEST_WORKER_ID', raising=False)
+    monkeypatch.delenv('PYTEST_XDIST_WORKER', raising=False)
+    monkeypatch.delenv('MYSQL_TEST_DB', raising=False)
+    assert test_database_name() == 'ecommerce_test_db'
+    monkeypatch.setenv('PYTEST_XDIST_WORKER', 'gw3')
+    assert test_database_name() == 'ecommerce_test_db_gw3'
+    monkeypatch.setenv('TEST_WORKER_ID', '1')
+    monkeypatch.setenv('MYSQL_DB', 'ecommerce_test_db_w1')
+    assert test_database_name() == 'ecommerce_test_db_w1_gw3'
+
+
+@pytest.mark.unit
+def test_clone_refuses_non_test_databases():
+    with pytest.raises(ValueError):
+        clone_database(None, 'ecommerce_template_abc', 'ecommerce_db')